@@ -1,9 +1,16 @@
+import copy
+import threading
+from collections import OrderedDict
+
 import requests
 from flask import current_app, json, session
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
 from app.utils.api_response import APIResponse
 
+# Maximum number of GET responses kept for conditional requests (If-None-Match)
+ETAG_CACHE_SIZE = 256
+
 
 class APIClient:
     """Base API client for communicating with the server"""
@@ -11,6 +18,12 @@ class APIClient:
     def __init__(self):
         self.base_url = None
         self.session = requests.Session()
+        # Accept compressed responses (gzip/deflate, plus br when brotli is installed);
+        # requests decodes them transparently
+        self.session.headers["Accept-Encoding"] = requests.utils.DEFAULT_ACCEPT_ENCODING
+        # (access token, URL) -> (ETag, response data) of the latest 200 GET responses
+        self._etag_cache: "OrderedDict[Tuple[str, str], Tuple[str, Dict[str, Any]]]" = OrderedDict()
+        self._etag_lock = threading.Lock()
 
     def _get_base_url(self) -> str:
         """Get the API base URL from config"""
@@ -26,11 +39,19 @@ class APIClient:
         if "access_token" in session:
             headers["Authorization"] = f"Bearer {session['access_token']}"
 
+        # Read from the primary database for a short while after a write (read replica)
+        if "db_primary_until" in session:
+            headers["X-DB-Primary-Until"] = session["db_primary_until"]
+
         return headers
 
     def _handle_response(self, response: requests.Response) -> Dict[str, Any]:
         """Handle API response and return backend's standardized JSON data"""
         try:
+            primary_until = response.headers.get("X-DB-Primary-Until")
+            if primary_until:
+                session["db_primary_until"] = primary_until
+
             data = response.json()
             # If token expired, clear session
             if response.status_code == 401:
@@ -48,15 +69,48 @@ class APIClient:
                 "status_code": response.status_code,
             }
 
+    def _etag_key(self, url: str, params: Optional[Dict]) -> Tuple[str, str]:
+        """Cache key of a GET request: responses differ per user, so the token is part of it"""
+        full_url = requests.Request("GET", url, params=params).prepare().url
+        return session.get("access_token", ""), full_url
+
+    def _get_cached(self, key: Tuple[str, str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        with self._etag_lock:
+            entry = self._etag_cache.get(key)
+            if entry is not None:
+                self._etag_cache.move_to_end(key)
+            return entry
+
+    def _store_cached(self, key: Tuple[str, str], etag: str, data: Dict[str, Any]) -> None:
+        with self._etag_lock:
+            self._etag_cache[key] = (etag, copy.deepcopy(data))
+            self._etag_cache.move_to_end(key)
+            while len(self._etag_cache) > ETAG_CACHE_SIZE:
+                self._etag_cache.popitem(last=False)
+
     def get(self, endpoint: str, params: Optional[Dict] = None) -> Dict[str, Any]:
-        """Make GET request to API"""
+        """Make GET request to API (conditional when a previous response had an ETag)"""
         url = f"{self._get_base_url()}{endpoint}"
+        key = self._etag_key(url, params)
+        cached = self._get_cached(key)
+
+        headers = self._get_headers()
+        if cached:
+            headers["If-None-Match"] = cached[0]
 
         try:
             response = self.session.get(
-                url, headers=self._get_headers(), params=params, timeout=30
+                url, headers=headers, params=params, timeout=30
             )
-            return self._handle_response(response)
+            if response.status_code == 304 and cached:
+                # Unchanged on the server: reuse the stored body
+                return copy.deepcopy(cached[1])
+
+            data = self._handle_response(response)
+            etag = response.headers.get("ETag")
+            if response.status_code == 200 and etag:
+                self._store_cached(key, etag, data)
+            return data
         except requests.exceptions.RequestException as e:
             return {
                 "success": False,
@@ -6,19 +6,33 @@ from app.blueprints import (
     maintenance_bp,
     payments_bp,
     registrations_bp,
+    reports_bp,
     room_types_bp,
     rooms_bp,
     users_bp,
 )
+from app.commands import register_commands
 from app.config import DevelopmentConfig, ProductionConfig
+from app.db_routing import configure_replica, register_routing
 from app.extensions import db, jwt, migrate
+from app.services.counter_service import CounterService
+from app.services.table_version_service import TableVersionService
+from app.utils.cache import response_cache
+from app.utils.compression import register_compression
+from app.utils.db_pool import configure_pool
+from app.utils.json_provider import OrjsonProvider
 from flask import Flask, request
 
 
-def create_app():
+def create_app(config_object=None):
     app = Flask(__name__)
     # Chọn config theo environment
-    app.config.from_object(DevelopmentConfig)
+    app.config.from_object(config_object or DevelopmentConfig)
+    # jsonify/APIResponse serialize bằng orjson (Decimal, date, datetime trực tiếp)
+    app.json = OrjsonProvider(app)
+
+    # Nén response: đăng ký đầu tiên để chạy sau mọi after_request khác
+    register_compression(app)
 
     # Enable CORS for cross-origin requests from client (port 5001 to port 5000)
     @app.after_request
@@ -48,9 +62,19 @@ def create_app():
             return response
 
     # Khởi tạo extension
+    configure_pool(app)
+    configure_replica(app)
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    response_cache.init_app(app)
+
+    # Bộ đếm dashboard được cập nhật theo từng lần flush
+    CounterService.register_events()
+    # Phiên bản bảng (ETag) được tăng trong transaction ghi, ngay trước khi commit
+    TableVersionService.register_events()
+    register_commands(app)
+    register_routing(app, db)
 
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
@@ -63,6 +87,7 @@ def create_app():
     app.register_blueprint(payments_bp, url_prefix="/api/payments")
     app.register_blueprint(maintenance_bp, url_prefix="/api/maintenance")
     app.register_blueprint(dashboard_bp, url_prefix="/api/dashboard")
+    app.register_blueprint(reports_bp, url_prefix="/api/reports")
 
     # Home page route to display all API endpoints
     @app.route("/")
@@ -5,6 +5,7 @@ from app.blueprints.dashboard import dashboard_bp
 from app.blueprints.maintenance import maintenance_bp
 from app.blueprints.payments import payments_bp
 from app.blueprints.registrations import registrations_bp
+from app.blueprints.reports import reports_bp
 from app.blueprints.room_types import room_types_bp
 from app.blueprints.rooms import rooms_bp
 from app.blueprints.users import users_bp
@@ -20,4 +21,5 @@ __all__ = [
     "payments_bp",
     "maintenance_bp",
     "dashboard_bp",
+    "reports_bp",
 ]
@@ -1,9 +1,15 @@
 from app.extensions import db
 from app.models import Role, User
 from app.utils.api_response import APIResponse
-from flask import Blueprint, json, jsonify, request
+from app.utils.auth import build_token_claims
+from app.utils.password_hashing import (
+    PasswordHashingBusy,
+    hash_password,
+    needs_rehash,
+    verify_password,
+)
+from flask import Blueprint, current_app, json, jsonify, request
 from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required
-from werkzeug.security import check_password_hash, generate_password_hash
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -58,13 +64,24 @@ def login():
 
         # Tìm user
         user = User.query.filter_by(email=email, is_active=True).first()
-        if not user or not check_password_hash(user.password_hash, password):
+        if not user or not verify_password(user.password_hash, password):
             return APIResponse.error(
                 message="Email hoặc password không đúng", status_code=401
             )
 
+        # Hash tạo bằng method/chi phí cũ: băm lại theo PASSWORD_HASH_METHOD hiện tại
+        if needs_rehash(user.password_hash):
+            try:
+                user.password_hash = hash_password(password)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning("Không băm lại được mật khẩu user %s: %s", user.user_id, e)
+
         # Tạo access token
-        access_token = create_access_token(identity=str(user.user_id))
+        access_token = create_access_token(
+            identity=str(user.user_id), additional_claims=build_token_claims(user)
+        )
 
         login_data = {
             "access_token": access_token,
@@ -79,6 +96,9 @@ def login():
 
         return APIResponse.success(data=login_data, message="Đăng nhập thành công")
 
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return APIResponse.error(message=str(e), status_code=503)
     except Exception as e:
         return APIResponse.error(message=str(e), status_code=500)
 
@@ -143,7 +163,7 @@ def get_current_user():
                 "student_id": user.student_id,
                 "gender": user.gender,
                 "role": user.role.role_name,
-                "created_at": user.created_at.isoformat(),
+                "created_at": user.created_at,
                 "is_active": user.is_active,
             }
         }
@@ -231,7 +251,7 @@ def register():
             role_id=student_role.role_id,
             full_name=data["full_name"],
             email=data["email"],
-            password_hash=generate_password_hash(data["password"]),
+            password_hash=hash_password(data["password"]),
             phone_number=data.get("phone_number"),
             student_id=data["student_id"],
             gender=data.get("gender", "other"),
@@ -254,6 +274,9 @@ def register():
             data=user_data, message="Đăng ký thành công", status_code=201
         )
 
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return APIResponse.error(message=str(e), status_code=503)
     except Exception as e:
         db.session.rollback()
         return APIResponse.error(message=str(e), status_code=500)
@@ -323,7 +346,7 @@ def change_password():
                 )
 
         # Kiểm tra mật khẩu hiện tại
-        if not check_password_hash(user.password_hash, data['current_password']):
+        if not verify_password(user.password_hash, data['current_password']):
             return APIResponse.error(
                 message="Mật khẩu hiện tại không đúng", status_code=400
             )
@@ -340,21 +363,24 @@ def change_password():
                 message="Mật khẩu mới phải có ít nhất 6 ký tự", status_code=400
             )
 
-        # Kiểm tra mật khẩu mới không giống mật khẩu cũ
-        if check_password_hash(user.password_hash, data['new_password']):
+        # Kiểm tra mật khẩu mới không giống mật khẩu cũ (mật khẩu hiện tại đã đúng,
+        # so sánh trực tiếp thay vì băm thêm một lần)
+        if data['new_password'] == data['current_password']:
             return APIResponse.error(
                 message="Mật khẩu mới phải khác mật khẩu hiện tại", status_code=400
             )
 
         # Cập nhật mật khẩu
-        from werkzeug.security import generate_password_hash
-        user.password_hash = generate_password_hash(data['new_password'])
+        user.password_hash = hash_password(data['new_password'])
         user.updated_at = db.func.now()
 
         db.session.commit()
 
         return APIResponse.success(message="Đổi mật khẩu thành công")
 
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return APIResponse.error(message=str(e), status_code=503)
     except Exception as e:
         db.session.rollback()
         return APIResponse.error(message=str(e), status_code=500)
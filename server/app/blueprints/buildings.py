@@ -1,7 +1,11 @@
 from app.extensions import db
 from app.models import Building, Room
 from app.utils.api_response import APIResponse
+from app.utils.cache import cached, invalidates
+from app.utils.etag import etag
+from app.utils.pagination import MAX_PER_PAGE
 from app.utils.decorators import require_role
+from app.services.statistics_service import StatisticsService
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required
 from sqlalchemy.exc import IntegrityError
@@ -11,6 +15,7 @@ buildings_bp = Blueprint('buildings', __name__)
 
 @buildings_bp.route('/', methods=['GET'])
 @jwt_required()
+@etag("buildings", "rooms")
 def get_buildings():
     """
     Lấy danh sách tòa nhà với phân trang và tìm kiếm
@@ -59,8 +64,8 @@ def get_buildings():
         per_page = min(request.args.get('per_page', 20, type=int), 100)  # Giới hạn tối đa 100
         search = request.args.get('search', '').strip()
 
-        # Tạo query cơ bản
-        query = Building.query
+        # Tạo query cơ bản (kèm số phòng tính bằng subquery GROUP BY)
+        query = StatisticsService.with_room_counts(Building, Room.building_id)
 
         # Áp dụng tìm kiếm nếu có
         if search:
@@ -70,11 +75,14 @@ def get_buildings():
         pagination = query.paginate(
             page=page,
             per_page=per_page,
+            max_per_page=MAX_PER_PAGE,
             error_out=False
         )
 
         # Chuyển đổi dữ liệu
-        buildings = [building.to_dict() for building in pagination.items]
+        buildings = [
+            row.Building.to_dict(room_counts=row._mapping) for row in pagination.items
+        ]
 
         return APIResponse.success(
             data={
@@ -95,6 +103,7 @@ def get_buildings():
 
 @buildings_bp.route('/<int:building_id>', methods=['GET'])
 @jwt_required()
+@etag("buildings", "rooms")
 def get_building(building_id):
     """
     Lấy thông tin chi tiết một tòa nhà
@@ -142,6 +151,7 @@ def get_building(building_id):
 @buildings_bp.route('/', methods=['POST'])
 @jwt_required()
 @require_role(['admin'])
+@invalidates("buildings")
 def create_building():
     """
     Tạo tòa nhà mới
@@ -209,6 +219,7 @@ def create_building():
 @buildings_bp.route('/<int:building_id>', methods=['PUT'])
 @jwt_required()
 @require_role(['admin'])
+@invalidates("buildings")
 def update_building(building_id):
     """
     Cập nhật thông tin tòa nhà
@@ -278,6 +289,7 @@ def update_building(building_id):
 @buildings_bp.route('/<int:building_id>', methods=['DELETE'])
 @jwt_required()
 @require_role(['admin'])
+@invalidates("buildings")
 def delete_building(building_id):
     """
     Xóa tòa nhà
@@ -325,6 +337,8 @@ def delete_building(building_id):
 
 @buildings_bp.route('/dropdown', methods=['GET'])
 @jwt_required()
+@etag("buildings")
+@cached(tags=("buildings",))
 def get_buildings_dropdown():
     """
     Lấy danh sách tòa nhà cho dropdown (chỉ ID và tên)
@@ -364,6 +378,7 @@ def get_buildings_dropdown():
 
 @buildings_bp.route('/<int:building_id>/rooms', methods=['GET'])
 @jwt_required()
+@etag("buildings", "rooms", "room_types")
 def get_building_rooms(building_id):
     """
     Lấy danh sách phòng của một tòa nhà
@@ -427,7 +442,7 @@ def get_building_rooms(building_id):
                     'room_type_id': room.room_type.room_type_id,
                     'type_name': room.room_type.type_name,
                     'capacity': room.room_type.capacity,
-                    'price': float(room.room_type.price)
+                    'price': room.room_type.price
                 } if room.room_type else None
             }
             rooms_data.append(room_data)
@@ -1,36 +1,102 @@
 from datetime import datetime
 
 from app.extensions import db
-from app.models import Contract, Payment, Registration, User
+from app.models import Contract, Payment, Registration
 from app.utils.api_response import APIResponse
+from app.utils.cache import cached, invalidates
+from app.utils.etag import etag
+from app.utils.auth import get_current_role, get_current_user_id
 from app.utils.decorators import require_role
+from app.utils.pagination import (
+    MAX_PER_PAGE,
+    CursorError,
+    cursor_requested,
+    keyset_paginate,
+    with_total_requested,
+)
+from app.utils.query_options import with_loader_options
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_jwt_extended import jwt_required
 
 contracts_bp = Blueprint('contracts', __name__)
 
+# Bộ lọc ?status= cho danh sách hợp đồng (biểu thức SQL từ các hybrid property của Contract)
+CONTRACT_STATUS_FILTERS = {
+    'active': lambda: Contract.is_active,
+    'expired': lambda: Contract.is_expired,
+    'expiring': lambda: Contract.expiring_within(30),
+    'expiring_soon': lambda: Contract.expiring_within(30),
+    'pending': lambda: Contract.payments.any(Payment.status == 'pending'),
+}
+
+# Các cột cho phép sắp xếp qua ?sort=
+CONTRACT_SORT_COLUMNS = {
+    'created_at': lambda: Contract.created_at,
+    'start_date': lambda: Contract.start_date,
+    'end_date': lambda: Contract.end_date,
+    'days_remaining': lambda: Contract.days_remaining,
+    'total_paid': lambda: Contract.total_paid,
+}
+
+
+# Các bảng mà dữ liệu hợp đồng trả về phụ thuộc (ETag)
+CONTRACT_TABLES = ("contracts", "registrations", "users", "rooms", "buildings", "room_types", "payments")
 
 @contracts_bp.route('/', methods=['GET'])
 @jwt_required()
+@etag(*CONTRACT_TABLES, daily=True)
 def get_contracts():
     """Lấy danh sách hợp đồng"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_role = get_current_role()
 
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
+        status = request.args.get('status')
+        sort = request.args.get('sort', 'created_at')
+        order = request.args.get('order', 'desc')
+
+        if status and status not in CONTRACT_STATUS_FILTERS:
+            return APIResponse.error(message="Trạng thái lọc không hợp lệ", status_code=400)
+        if sort not in CONTRACT_SORT_COLUMNS or order not in ('asc', 'desc'):
+            return APIResponse.error(message="Tham số sắp xếp không hợp lệ", status_code=400)
 
         # Student chỉ xem được hợp đồng của mình
-        if current_user.role.role_name == 'student':
+        if current_role == 'student':
             query = Contract.query.join(Registration).filter_by(student_id=current_user_id)
         else:
             # Admin/Management xem tất cả
             query = Contract.query
 
-        contracts = query.order_by(Contract.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        # Lọc và sắp xếp trong SQL để phân trang đúng trên toàn bộ kết quả
+        if status:
+            query = query.filter(CONTRACT_STATUS_FILTERS[status]())
+
+        sort_column = CONTRACT_SORT_COLUMNS[sort]()
+
+        query = with_loader_options(query, "contract_list")
+
+        if cursor_requested():
+            contracts = keyset_paginate(
+                query, sort_column, Contract.contract_id, sort,
+                cursor=request.args.get('cursor'), per_page=per_page,
+                descending=order == 'desc', with_total=with_total_requested(),
+            )
+            pagination = contracts.to_dict()
+        else:
+            ordering = sort_column.asc() if order == 'asc' else sort_column.desc()
+            contracts = query.order_by(ordering, Contract.contract_id.desc()).paginate(
+                page=page, per_page=per_page, max_per_page=MAX_PER_PAGE, error_out=False
+            )
+            pagination = {
+                "page": contracts.page,
+                "pages": contracts.pages,
+                "per_page": contracts.per_page,
+                "total": contracts.total,
+                "has_next": contracts.has_next,
+                "has_prev": contracts.has_prev,
+            }
 
         contracts_data = {
             "contracts": [
@@ -48,11 +114,11 @@ def get_contracts():
                         "room_number": contract.registration.room.room_number,
                         "building_name": contract.registration.room.building.building_name,
                         "room_type": contract.registration.room.room_type.type_name,
-                        "price": float(contract.registration.room.room_type.price),
+                        "price": contract.registration.room.room_type.price,
                     },
-                    "start_date": contract.start_date.isoformat(),
-                    "end_date": contract.end_date.isoformat(),
-                    "created_at": contract.created_at.isoformat(),
+                    "start_date": contract.start_date,
+                    "end_date": contract.end_date,
+                    "created_at": contract.created_at,
                     "is_active": contract.is_active,
                     "is_expired": contract.is_expired,
                     "days_remaining": contract.days_remaining,
@@ -63,37 +129,33 @@ def get_contracts():
                 }
                 for contract in contracts.items
             ],
-            "pagination": {
-                "page": contracts.page,
-                "pages": contracts.pages,
-                "per_page": contracts.per_page,
-                "total": contracts.total,
-                "has_next": contracts.has_next,
-                "has_prev": contracts.has_prev,
-            },
+            "pagination": pagination,
         }
 
         return APIResponse.success(
             data=contracts_data, message="Lấy danh sách hợp đồng thành công"
         )
 
+    except CursorError as e:
+        return APIResponse.error(message=str(e), status_code=400)
     except Exception as e:
         return APIResponse.error(message=str(e), status_code=500)
 
 @contracts_bp.route('/<int:contract_id>', methods=['GET'])
 @jwt_required()
+@etag(*CONTRACT_TABLES, daily=True)
 def get_contract(contract_id):
     """Lấy thông tin chi tiết hợp đồng"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_role = get_current_role()
 
-        contract = Contract.query.get(contract_id)
+        contract = with_loader_options(Contract.query, "contract_detail").get(contract_id)
         if not contract:
             return APIResponse.error(message="Hợp đồng không tồn tại", status_code=404)
 
         # Student chỉ xem được hợp đồng của mình
-        if (current_user.role.role_name == 'student' and 
+        if (current_role == 'student' and 
             contract.registration.student_id != current_user_id):
             return APIResponse.error(message="Không có quyền truy cập", status_code=403)
 
@@ -115,11 +177,11 @@ def get_contract(contract_id):
                     "building_name": contract.registration.room.building.building_name,
                     "room_type": contract.registration.room.room_type.type_name,
                     "capacity": contract.registration.room.room_type.capacity,
-                    "price": float(contract.registration.room.room_type.price),
+                    "price": contract.registration.room.room_type.price,
                 },
-                "start_date": contract.start_date.isoformat(),
-                "end_date": contract.end_date.isoformat(),
-                "created_at": contract.created_at.isoformat(),
+                "start_date": contract.start_date,
+                "end_date": contract.end_date,
+                "created_at": contract.created_at,
                 "is_active": contract.is_active,
                 "is_expired": contract.is_expired,
                 "days_remaining": contract.days_remaining,
@@ -128,8 +190,8 @@ def get_contract(contract_id):
                 "payments": [
                     {
                         "payment_id": payment.payment_id,
-                        "amount": float(payment.amount),
-                        "payment_date": payment.payment_date.isoformat(),
+                        "amount": payment.amount,
+                        "payment_date": payment.payment_date,
                         "payment_method": payment.payment_method,
                         "payment_method_display": payment.payment_method_display,
                         "status": payment.status,
@@ -158,6 +220,7 @@ def get_contract(contract_id):
 @contracts_bp.route('/<int:contract_id>', methods=['PUT'])
 @jwt_required()
 @require_role(['admin', 'management'])
+@invalidates("contracts")
 def update_contract(contract_id):
     """Cập nhật hợp đồng"""
     try:
@@ -186,7 +249,7 @@ def update_contract(contract_id):
             "contract": {
                 "contract_id": contract.contract_id,
                 "contract_code": contract.contract_code,
-                "end_date": contract.end_date.isoformat(),
+                "end_date": contract.end_date,
                 "is_active": contract.is_active,
                 "days_remaining": contract.days_remaining,
             }
@@ -204,6 +267,7 @@ def update_contract(contract_id):
 @contracts_bp.route("/<int:contract_id>/renew", methods=["POST"])
 @jwt_required()
 @require_role(["admin", "management"])
+@invalidates("contracts")
 def renew_contract(contract_id):
     """Gia hạn hợp đồng"""
     try:
@@ -264,8 +328,8 @@ def renew_contract(contract_id):
             "contract": {
                 "contract_id": contract.contract_id,
                 "contract_code": contract.contract_code,
-                "old_end_date": old_end_date.isoformat(),
-                "new_end_date": contract.end_date.isoformat(),
+                "old_end_date": old_end_date,
+                "new_end_date": contract.end_date,
                 "renewal_months": renewal_months,
                 "is_active": contract.is_active,
                 "days_remaining": contract.days_remaining,
@@ -285,6 +349,7 @@ def renew_contract(contract_id):
 @contracts_bp.route("/<int:contract_id>/terminate", methods=["POST"])
 @jwt_required()
 @require_role(["admin", "management"])
+@invalidates("contracts")
 def terminate_contract(contract_id):
     """Chấm dứt hợp đồng trước thời hạn"""
     try:
@@ -317,8 +382,8 @@ def terminate_contract(contract_id):
             "contract": {
                 "contract_id": contract.contract_id,
                 "contract_code": contract.contract_code,
-                "old_end_date": old_end_date.isoformat(),
-                "terminated_date": contract.end_date.isoformat(),
+                "old_end_date": old_end_date,
+                "terminated_date": contract.end_date,
                 "termination_reason": termination_reason,
                 "is_active": contract.is_active,
             }
@@ -336,18 +401,15 @@ def terminate_contract(contract_id):
 @contracts_bp.route("/expiring-soon", methods=["GET"])
 @jwt_required()
 @require_role(["admin", "management"])
+@etag(*CONTRACT_TABLES, daily=True)
 def get_expiring_contracts():
     """Lấy danh sách hợp đồng sắp hết hạn"""
     try:
-        from datetime import date, timedelta
-
         days_threshold = request.args.get("days", 30, type=int)
-        threshold_date = date.today() + timedelta(days=days_threshold)
 
         contracts = (
-            Contract.query.filter(
-                Contract.end_date <= threshold_date, Contract.end_date >= date.today()
-            )
+            with_loader_options(Contract.query, "contract_list")
+            .filter(Contract.expiring_within(days_threshold))
             .order_by(Contract.end_date.asc())
             .all()
         )
@@ -369,7 +431,7 @@ def get_expiring_contracts():
                         "room_number": contract.registration.room.room_number,
                         "building_name": contract.registration.room.building.building_name,
                     },
-                    "end_date": contract.end_date.isoformat(),
+                    "end_date": contract.end_date,
                     "days_remaining": contract.days_remaining,
                 }
                 for contract in contracts
@@ -412,28 +474,61 @@ def export_contracts():
         )
 
 
+@contracts_bp.route("/export", methods=["POST"])
+@jwt_required()
+@require_role(["admin", "management"])
+def request_contracts_export():
+    """
+    Yêu cầu xuất báo cáo hợp đồng chạy nền
+
+    Trả về job ngay lập tức; theo dõi tiến độ qua GET /api/reports/<job_id>
+    và tải file qua GET /api/reports/<job_id>/download khi status = 'completed'.
+    Yêu cầu giống nhau trong thời gian ngắn sẽ dùng lại job/file đã có.
+    """
+    try:
+        from app.services.contract_report_service import XLSXWRITER_AVAILABLE
+        from app.services.report_job_service import ReportJobService
+
+        if not XLSXWRITER_AVAILABLE:
+            return APIResponse.error(
+                message="Tính năng xuất Excel chưa được cài đặt. Vui lòng liên hệ quản trị viên.",
+                status_code=503,
+            )
+
+        job, reused = ReportJobService.request_job(
+            "contracts_excel", user_id=get_current_user_id()
+        )
+
+        return APIResponse.success(
+            data={
+                "job": job.to_dict(),
+                "reused": reused,
+                "status_url": f"/api/reports/{job.job_id}",
+                "download_url": f"/api/reports/{job.job_id}/download",
+            },
+            message="Đã tiếp nhận yêu cầu xuất báo cáo",
+            status_code=200 if job.status == "completed" else 202,
+        )
+
+    except Exception as e:
+        db.session.rollback()
+        return APIResponse.error(
+            message=f"Lỗi khi tạo yêu cầu xuất báo cáo: {str(e)}", status_code=500
+        )
+
+
 @contracts_bp.route('/statistics', methods=['GET'])
 @jwt_required()
 @require_role(['admin', 'management'])
+@etag("contracts", "payments", daily=True)
+@cached(tags=("contracts", "payments"), timeout=60)
 def get_contract_statistics():
     """Thống kê hợp đồng"""
     try:
-        from datetime import date, timedelta
-
-        total_contracts = Contract.query.count()
-        active_contracts = Contract.query.filter(
-            Contract.start_date <= date.today(),
-            Contract.end_date >= date.today()
-        ).count()
-        expired_contracts = Contract.query.filter(
-            Contract.end_date < date.today()
-        ).count()
-
-        # Hợp đồng sắp hết hạn (trong 30 ngày)
-        expiring_soon = Contract.query.filter(
-            Contract.end_date <= date.today() + timedelta(days=30),
-            Contract.end_date >= date.today(),
-        ).count()
+        from app.services.statistics_service import StatisticsService
+
+        # Hợp đồng sắp hết hạn tính trong 30 ngày
+        contract_stats = StatisticsService.contract_stats(expiring_days=30)
 
         # Tính tổng doanh thu từ các thanh toán đã xác nhận
         total_revenue = (
@@ -445,10 +540,10 @@ def get_contract_statistics():
 
         statistics_data = {
             "statistics": {
-                "total_contracts": total_contracts,
-                "active_contracts": active_contracts,
-                "expired_contracts": expired_contracts,
-                "expiring_soon": expiring_soon,
+                "total_contracts": contract_stats["total"],
+                "active_contracts": contract_stats["active"],
+                "expired_contracts": contract_stats["expired"],
+                "expiring_soon": contract_stats["expiring_soon"],
                 "total_revenue": float(total_revenue),
             }
         }
@@ -463,14 +558,15 @@ def get_contract_statistics():
 
 @contracts_bp.route("/<int:contract_id>/pay", methods=["POST"])
 @jwt_required()
+@invalidates("contracts", "payments")
 def pay_contract(contract_id):
     """Thanh toán ngay hợp đồng (sinh viên)"""
     try:
-        current_user_id = int(get_jwt_identity())
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_role = get_current_role()
 
         # Chỉ sinh viên mới được thanh toán
-        if current_user.role.role_name != "student":
+        if current_role != "student":
             return APIResponse.error(
                 message="Chỉ sinh viên mới được thanh toán", status_code=403
             )
@@ -515,10 +611,10 @@ def pay_contract(contract_id):
 
         payment_data = {
             "payment_id": pending_payment.payment_id,
-            "amount": float(pending_payment.amount),
+            "amount": pending_payment.amount,
             "payment_method": pending_payment.payment_method,
             "status": pending_payment.status,
-            "payment_date": pending_payment.payment_date.isoformat(),
+            "payment_date": pending_payment.payment_date,
             "contract_code": contract.contract_code,
         }
 
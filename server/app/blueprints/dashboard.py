@@ -6,12 +6,13 @@ from app.models import (
     MaintenanceRequest,
     Payment,
     Registration,
-    Role,
     Room,
     RoomType,
-    User,
 )
+from app.services.counter_service import CounterService
+from app.services.statistics_service import StatisticsService
 from app.utils.api_response import APIResponse
+from app.utils.db_pool import POOL_METRICS
 from app.utils.decorators import require_role
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
@@ -25,87 +26,51 @@ dashboard_bp = Blueprint('dashboard', __name__)
 def get_admin_dashboard_stats():
     """Get comprehensive dashboard statistics for admin"""
     try:
+        # Các số đếm được duy trì tăng dần trong bảng dashboard_counters
+        counters = CounterService.get_counters()
+        # Các chỉ số phụ thuộc ngày hiện tại vẫn tính bằng truy vấn gộp
+        contract_stats = StatisticsService.contract_stats()
+
         # Room Statistics
-        total_rooms = Room.query.count()
-        occupied_rooms = Room.query.filter(Room.current_occupancy > 0).count()
-        available_rooms = Room.query.filter_by(status='available').count()
-        maintenance_rooms = Room.query.filter_by(status='maintenance').count()
-        
-        # Alternative occupancy calculation - count rooms with active contracts
-        rooms_with_contracts = db.session.query(Room.room_id).join(
-            Registration, Room.room_id == Registration.room_id
-        ).join(
-            Contract, Registration.registration_id == Contract.registration_id
-        ).filter(
-            Contract.start_date <= date.today(),
-            Contract.end_date >= date.today()
-        ).distinct().count()
-        
-        # Use the higher of the two occupancy counts
-        occupied_rooms = max(occupied_rooms, rooms_with_contracts)
-        
+        total_rooms = counters.count("rooms.total")
+        available_rooms = counters.count("rooms.available")
+        maintenance_rooms = counters.count("rooms.maintenance")
+
+        # Use the higher of the two occupancy counts (occupancy vs. rooms with active contracts)
+        occupied_rooms = max(
+            counters.count("rooms.occupied"),
+            StatisticsService.rooms_with_active_contracts(),
+        )
+
         # User Statistics
-        total_students = User.query.join(Role).filter(Role.role_name == 'student').count()
-        total_staff = User.query.join(Role).filter(Role.role_name == 'staff').count() 
-        total_admins = User.query.join(Role).filter(Role.role_name == 'admin').count()
-        
+        total_students = counters.count('users.role.student')
+        total_staff = counters.count('users.role.staff')
+        total_admins = counters.count('users.role.admin')
+
         # Contract Statistics
-        total_contracts = Contract.query.count()
-        active_contracts = Contract.query.filter(
-            Contract.start_date <= date.today(),
-            Contract.end_date >= date.today()
-        ).count()
-        expired_contracts = Contract.query.filter(
-            Contract.end_date < date.today()
-        ).count()
-        expiring_soon = Contract.query.filter(
-            Contract.end_date <= date.today() + timedelta(days=30),
-            Contract.end_date >= date.today()
-        ).count()
-        
+        total_contracts = contract_stats["total"]
+        active_contracts = contract_stats["active"]
+        expired_contracts = contract_stats["expired"]
+        expiring_soon = contract_stats["expiring_soon"]
+
         # Registration Statistics
-        pending_registrations = Registration.query.filter_by(status='pending').count()
-        approved_registrations = Registration.query.filter_by(status='approved').count()
-        rejected_registrations = Registration.query.filter_by(status='rejected').count()
-        
+        pending_registrations = counters.count('registrations.pending')
+        approved_registrations = counters.count('registrations.approved')
+        rejected_registrations = counters.count('registrations.rejected')
+
         # Payment Statistics
-        total_revenue = db.session.query(
-            db.func.sum(Payment.amount)
-        ).filter(
-            Payment.status == 'confirmed'
-        ).scalar() or 0
-        
-        pending_payments = Payment.query.filter_by(status='pending').count()
-        confirmed_payments = Payment.query.filter_by(status='confirmed').count()
-        
+        total_revenue = counters.amount('payments.confirmed.amount')
+        pending_payments = counters.count('payments.pending.count')
+        confirmed_payments = counters.count('payments.confirmed.count')
+
         # Maintenance Statistics
-        pending_maintenance = MaintenanceRequest.query.filter_by(status='pending').count()
-        in_progress_maintenance = MaintenanceRequest.query.filter_by(status='in_progress').count()
-        completed_maintenance = MaintenanceRequest.query.filter_by(status='completed').count()
-        
-        # Monthly revenue for the last 6 months
-        monthly_revenue = []
-        for i in range(6):
-            start_date = (date.today().replace(day=1) - timedelta(days=i*30)).replace(day=1)
-            end_date = (start_date.replace(month=start_date.month+1) if start_date.month < 12 
-                       else start_date.replace(year=start_date.year+1, month=1)) - timedelta(days=1)
-            
-            month_revenue = db.session.query(
-                db.func.sum(Payment.amount)
-            ).filter(
-                Payment.status == 'confirmed',
-                Payment.payment_date >= start_date,
-                Payment.payment_date <= end_date
-            ).scalar() or 0
-            
-            monthly_revenue.append({
-                'month': start_date.strftime('%Y-%m'),
-                'month_name': start_date.strftime('%m/%Y'),
-                'revenue': float(month_revenue)
-            })
-        
-        monthly_revenue.reverse()  # Show oldest to newest
-        
+        pending_maintenance = counters.count('maintenance.pending')
+        in_progress_maintenance = counters.count('maintenance.in_progress')
+        completed_maintenance = counters.count('maintenance.completed')
+
+        # Monthly revenue for the last 6 months (oldest to newest)
+        monthly_revenue = StatisticsService.monthly_revenue(months=6)
+
         stats_data = {
             "room_stats": {
                 "total_rooms": total_rooms,
@@ -253,9 +218,10 @@ def get_dashboard_alerts():
     """Get important alerts for dashboard"""
     try:
         alerts = []
-        
+        counters = CounterService.get_counters()
+
         # Pending maintenance requests
-        pending_maintenance = MaintenanceRequest.query.filter_by(status='pending').count()
+        pending_maintenance = counters.count('maintenance.pending')
         if pending_maintenance > 0:
             alerts.append({
                 'type': 'warning',
@@ -300,7 +266,7 @@ def get_dashboard_alerts():
             })
         
         # Pending registrations
-        pending_registrations = Registration.query.filter_by(status='pending').count()
+        pending_registrations = counters.count('registrations.pending')
         if pending_registrations > 0:
             alerts.append({
                 'type': 'info',
@@ -345,7 +311,6 @@ def get_dashboard_alerts():
             })
         
         # Pending registrations
-        pending_registrations = Registration.query.filter_by(status='pending').count()
         if pending_registrations > 0:
             alerts.append({
                 'type': 'info',
@@ -385,4 +350,26 @@ def get_relative_time(timestamp):
         minutes = diff.seconds // 60
         return f"{minutes} phút trước"
     else:
-        return "Vừa xong"
\ No newline at end of file
+        return "Vừa xong"
+
+
+@dashboard_bp.route('/pool-stats', methods=['GET'])
+@jwt_required()
+@require_role(['admin'])
+def get_pool_stats():
+    """
+    Số liệu connection pool của worker đang xử lý request
+
+    Mỗi worker (tiến trình) có pool và bộ đếm riêng; `pid` cho biết worker nào trả lời.
+    Gồm trạng thái tức thời (checked_out, checked_in, overflow) và số liệu cộng dồn
+    từ lúc worker khởi động (checkouts, wait_ms_avg/max, slow_checkouts, timeouts,
+    overflow_opened, invalidated).
+    """
+    try:
+        return APIResponse.success(
+            data={"pool": POOL_METRICS.snapshot(db.engine.pool)},
+            message="Lấy số liệu connection pool thành công"
+        )
+
+    except Exception as e:
+        return APIResponse.error(message=str(e), status_code=500)
@@ -1,10 +1,22 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from app.extensions import db
 from app.models import User, MaintenanceRequest, Room
 from datetime import datetime
+from app.services.counter_service import CounterService
 from app.utils.decorators import require_role
 from app.utils.api_response import APIResponse
+from app.utils.cache import cached, invalidates
+from app.utils.etag import etag
+from app.utils.auth import get_current_role, get_current_user_id
+from app.utils.pagination import (
+    MAX_PER_PAGE,
+    CursorError,
+    cursor_requested,
+    keyset_paginate,
+    with_total_requested,
+)
+from app.utils.query_options import with_loader_options
 
 maintenance_bp = Blueprint('maintenance', __name__)
 
@@ -13,17 +25,17 @@ maintenance_bp = Blueprint('maintenance', __name__)
 def get_maintenance_requests():
     """Lấy danh sách yêu cầu bảo trì"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_role = get_current_role()
 
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         status = request.args.get('status')
 
         # Student chỉ xem được yêu cầu của mình
-        if current_user.role.role_name == 'student':
+        if current_role == 'student':
             query = MaintenanceRequest.query.filter_by(student_id=current_user_id)
-        elif current_user.role.role_name == "staff":
+        elif current_role == "staff":
             # Maintenance staff xem yêu cầu được giao cho mình
             query = MaintenanceRequest.query.filter(
                 db.or_(
@@ -38,9 +50,27 @@ def get_maintenance_requests():
         if status:
             query = query.filter_by(status=status)
 
-        requests = query.order_by(MaintenanceRequest.request_date.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        query = with_loader_options(query, "maintenance_list")
+
+        if cursor_requested():
+            requests = keyset_paginate(
+                query, MaintenanceRequest.request_date, MaintenanceRequest.request_id, 'request_date',
+                cursor=request.args.get('cursor'), per_page=per_page,
+                with_total=with_total_requested(),
+            )
+            pagination = requests.to_dict()
+        else:
+            requests = query.order_by(MaintenanceRequest.request_date.desc()).paginate(
+                page=page, per_page=per_page, max_per_page=MAX_PER_PAGE, error_out=False
+            )
+            pagination = {
+                "page": requests.page,
+                "pages": requests.pages,
+                "per_page": requests.per_page,
+                "total": requests.total,
+                "has_next": requests.has_next,
+                "has_prev": requests.has_prev,
+            }
 
         requests_data = {
             "maintenance_requests": [
@@ -62,7 +92,7 @@ def get_maintenance_requests():
                     "image_url": req.image_url,
                     "status": req.status,
                     "status_display": req.status_display,
-                    "request_date": req.request_date.isoformat(),
+                    "request_date": req.request_date,
                     "days_since_request": req.days_since_request,
                     "is_urgent": req.is_urgent,
                     "assigned_to": (
@@ -73,39 +103,33 @@ def get_maintenance_requests():
                         if req.assigned_to
                         else None
                     ),
-                    "completed_date": (
-                        req.completed_date.isoformat() if req.completed_date else None
-                    ),
+                    "completed_date": req.completed_date,
                 }
                 for req in requests.items
             ],
-            "pagination": {
-                "page": requests.page,
-                "pages": requests.pages,
-                "per_page": requests.per_page,
-                "total": requests.total,
-                "has_next": requests.has_next,
-                "has_prev": requests.has_prev,
-            },
+            "pagination": pagination,
         }
 
         return APIResponse.success(
             data=requests_data, message="Lấy danh sách yêu cầu bảo trì thành công"
         )
 
+    except CursorError as e:
+        return APIResponse.error(message=str(e), status_code=400)
     except Exception as e:
         return APIResponse.error(message=str(e), status_code=500)
 
 @maintenance_bp.route('/', methods=['POST'])
 @jwt_required()
+@invalidates("maintenance")
 def create_maintenance_request():
     """Tạo yêu cầu bảo trì mới (sinh viên)"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_role = get_current_role()
 
         # Chỉ sinh viên mới được tạo yêu cầu bảo trì
-        if current_user.role.role_name != 'student':
+        if current_role != 'student':
             return APIResponse.error(
                 message="Chỉ sinh viên mới được tạo yêu cầu bảo trì", status_code=403
             )
@@ -144,7 +168,7 @@ def create_maintenance_request():
                 "title": maintenance_request.title,
                 "room_number": maintenance_request.room.room_number,
                 "status": maintenance_request.status,
-                "request_date": maintenance_request.request_date.isoformat(),
+                "request_date": maintenance_request.request_date,
             }
         }
 
@@ -159,6 +183,7 @@ def create_maintenance_request():
 @maintenance_bp.route('/<int:request_id>/assign', methods=['POST'])
 @jwt_required()
 @require_role(['admin', 'management'])
+@invalidates("maintenance")
 def assign_maintenance_request(request_id):
     """Phân công yêu cầu bảo trì cho nhân viên"""
     try:
@@ -202,10 +227,11 @@ def assign_maintenance_request(request_id):
 @maintenance_bp.route("/<int:request_id>/start", methods=["POST"])
 @jwt_required()
 @require_role(["staff"])
+@invalidates("maintenance")
 def start_maintenance(request_id):
     """Bắt đầu xử lý yêu cầu bảo trì"""
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = get_current_user_id()
 
         maintenance_request = MaintenanceRequest.query.get(request_id)
         if not maintenance_request:
@@ -238,10 +264,11 @@ def start_maintenance(request_id):
 @maintenance_bp.route("/<int:request_id>/complete", methods=["POST"])
 @jwt_required()
 @require_role(["staff"])
+@invalidates("maintenance")
 def complete_maintenance(request_id):
     """Hoàn thành yêu cầu bảo trì"""
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = get_current_user_id()
         
         maintenance_request = MaintenanceRequest.query.get(request_id)
         if not maintenance_request:
@@ -264,7 +291,7 @@ def complete_maintenance(request_id):
             'maintenance_request': {
                 'request_id': maintenance_request.request_id,
                 'status': maintenance_request.status,
-                'completed_date': maintenance_request.completed_date.isoformat()
+                'completed_date': maintenance_request.completed_date
             }
         }), 200
         
@@ -274,24 +301,25 @@ def complete_maintenance(request_id):
 
 @maintenance_bp.route('/<int:request_id>/cancel', methods=['POST'])
 @jwt_required()
+@invalidates("maintenance")
 def cancel_maintenance_request(request_id):
     """Hủy yêu cầu bảo trì"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_role = get_current_role()
         
         maintenance_request = MaintenanceRequest.query.get(request_id)
         if not maintenance_request:
             return jsonify('Yêu cầu bảo trì không tồn tại'), 404
         
         # Student chỉ hủy được yêu cầu của mình và phải ở trạng thái pending
-        if current_user.role.role_name == 'student':
+        if current_role == 'student':
             if (maintenance_request.student_id != current_user_id or 
                 maintenance_request.status != 'pending'):
                 return jsonify('Chỉ có thể hủy yêu cầu đang chờ xử lý của mình'), 403
         
         # Admin/Management có thể hủy bất kỳ yêu cầu nào chưa hoàn thành
-        elif current_user.role.role_name in ['admin', 'management']:
+        elif current_role in ['admin', 'management']:
             if maintenance_request.status == 'completed':
                 return jsonify('Không thể hủy yêu cầu đã hoàn thành'), 400
         else:
@@ -316,15 +344,19 @@ def cancel_maintenance_request(request_id):
 @maintenance_bp.route('/statistics', methods=['GET'])
 @jwt_required()
 @require_role(['admin', 'management'])
+@etag("maintenance_requests", daily=True)
+@cached(tags=("maintenance",), timeout=60)
 def get_maintenance_statistics():
     """Thống kê yêu cầu bảo trì"""
     try:
-        total_requests = MaintenanceRequest.query.count()
-        pending_requests = MaintenanceRequest.query.filter_by(status='pending').count()
-        assigned_requests = MaintenanceRequest.query.filter_by(status='assigned').count()
-        in_progress_requests = MaintenanceRequest.query.filter_by(status='in_progress').count()
-        completed_requests = MaintenanceRequest.query.filter_by(status='completed').count()
-        cancelled_requests = MaintenanceRequest.query.filter_by(status='cancelled').count()
+        counters = CounterService.get_counters()
+
+        total_requests = counters.count('maintenance.total')
+        pending_requests = counters.count('maintenance.pending')
+        assigned_requests = counters.count('maintenance.assigned')
+        in_progress_requests = counters.count('maintenance.in_progress')
+        completed_requests = counters.count('maintenance.completed')
+        cancelled_requests = counters.count('maintenance.cancelled')
         
         # Yêu cầu khẩn cấp (pending > 3 ngày)
         urgent_requests = MaintenanceRequest.query.filter(
@@ -1,9 +1,24 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from app.extensions import db
-from app.models import User, Payment, Contract, Registration
+from app.models import Payment, Contract, Registration
+from app.services.billing_service import BillingService
+from app.services.counter_service import CounterService
+from app.services.payment_service import PaymentService
+from app.services.reconciliation_service import ReconciliationError, ReconciliationService
 from app.utils.decorators import require_role
 from app.utils.api_response import APIResponse
+from app.utils.cache import cached, invalidates
+from app.utils.etag import etag
+from app.utils.auth import get_current_role, get_current_user_id
+from app.utils.pagination import (
+    MAX_PER_PAGE,
+    CursorError,
+    cursor_requested,
+    keyset_paginate,
+    with_total_requested,
+)
+from app.utils.query_options import with_loader_options
 
 payments_bp = Blueprint('payments', __name__)
 
@@ -12,15 +27,15 @@ payments_bp = Blueprint('payments', __name__)
 def get_payments():
     """Lấy danh sách thanh toán"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_role = get_current_role()
 
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         status = request.args.get('status')
 
         # Student chỉ xem được payment của mình
-        if current_user.role.role_name == 'student':
+        if current_role == 'student':
             query = Payment.query.join(Contract).join(Registration).filter_by(student_id=current_user_id)
         else:
             # Admin/Management xem tất cả
@@ -29,9 +44,27 @@ def get_payments():
         if status:
             query = query.filter_by(status=status)
 
-        payments = query.order_by(Payment.payment_date.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        query = with_loader_options(query, "payment_list")
+
+        if cursor_requested():
+            payments = keyset_paginate(
+                query, Payment.payment_date, Payment.payment_id, 'payment_date',
+                cursor=request.args.get('cursor'), per_page=per_page,
+                with_total=with_total_requested(),
+            )
+            pagination = payments.to_dict()
+        else:
+            payments = query.order_by(Payment.payment_date.desc()).paginate(
+                page=page, per_page=per_page, max_per_page=MAX_PER_PAGE, error_out=False
+            )
+            pagination = {
+                "page": payments.page,
+                "pages": payments.pages,
+                "per_page": payments.per_page,
+                "total": payments.total,
+                "has_next": payments.has_next,
+                "has_prev": payments.has_prev,
+            }
 
         payments_data = {
             "payments": [
@@ -45,11 +78,12 @@ def get_payments():
                         "room_number": payment.contract.registration.room.room_number,
                         "building_name": payment.contract.registration.room.building.building_name,
                     },
-                    "amount": float(payment.amount),
-                    "payment_date": payment.payment_date.isoformat(),
+                    "amount": payment.amount,
+                    "payment_date": payment.payment_date,
                     "payment_method": payment.payment_method,
                     "payment_method_display": payment.payment_method_display,
                     "status": payment.status,
+                    "billing_period": payment.billing_period,
                     "proof_image_url": payment.proof_image_url,
                     "confirmed_by": (
                         {
@@ -62,33 +96,29 @@ def get_payments():
                 }
                 for payment in payments.items
             ],
-            "pagination": {
-                "page": payments.page,
-                "pages": payments.pages,
-                "per_page": payments.per_page,
-                "total": payments.total,
-                "has_next": payments.has_next,
-                "has_prev": payments.has_prev,
-            },
+            "pagination": pagination,
         }
 
         return APIResponse.success(
             data=payments_data, message="Lấy danh sách thanh toán thành công"
         )
 
+    except CursorError as e:
+        return APIResponse.error(message=str(e), status_code=400)
     except Exception as e:
         return APIResponse.error(message=str(e), status_code=500)
 
 @payments_bp.route('/', methods=['POST'])
 @jwt_required()
+@invalidates("payments")
 def create_payment():
     """Tạo thanh toán mới (sinh viên)"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_role = get_current_role()
 
         # Chỉ sinh viên mới được tạo payment
-        if current_user.role.role_name != 'student':
+        if current_role != 'student':
             return APIResponse.error(
                 message="Chỉ sinh viên mới được tạo thanh toán", status_code=403
             )
@@ -133,7 +163,7 @@ def create_payment():
 
         payment_data = {
             "payment_id": payment.payment_id,
-            "amount": float(payment.amount),
+            "amount": payment.amount,
             "payment_method": payment.payment_method,
             "status": payment.status,
             "contract_code": payment.contract.contract_code,
@@ -149,13 +179,141 @@ def create_payment():
         db.session.rollback()
         return APIResponse.error(message=str(e), status_code=500)
 
+@payments_bp.route('/billing-run', methods=['POST'])
+@jwt_required()
+@require_role(['admin', 'management'])
+@invalidates("payments")
+def run_billing():
+    """
+    Tạo khoản tiền phòng (pending) của một kỳ cho mọi hợp đồng đang hiệu lực
+
+    Request JSON:
+    {
+        "period": "2025-09",     # Kỳ thu YYYY-MM (mặc định: tháng hiện tại)
+        "dry_run": false         # true: chỉ tính số khoản/tổng tiền, không ghi
+    }
+    Chạy lại cùng kỳ chỉ tạo các khoản còn thiếu.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        result = BillingService.run(data.get('period'), dry_run=bool(data.get('dry_run')))
+
+        message = (
+            f"Kỳ {result['period']}: {result['payments']} khoản thu"
+            + (" (chạy thử)" if result['dry_run'] else "")
+        )
+        return APIResponse.success(data={"billing_run": result}, message=message)
+
+    except ValueError as e:
+        return APIResponse.error(message=str(e), status_code=400)
+    except Exception as e:
+        db.session.rollback()
+        return APIResponse.error(message=str(e), status_code=500)
+
+@payments_bp.route('/confirm-batch', methods=['POST'])
+@jwt_required()
+@require_role(['admin', 'management'])
+@invalidates("payments")
+def confirm_payments_batch():
+    """
+    Xác nhận nhiều thanh toán trong một request
+
+    Request JSON:
+    {
+        "payment_ids": [101, 102, 103]
+    }
+    Response: danh sách id đã xác nhận và các id bị bỏ qua (kèm lý do)
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        payment_ids = data.get('payment_ids')
+
+        if not isinstance(payment_ids, list) or not payment_ids:
+            return APIResponse.error(
+                message="payment_ids phải là danh sách không rỗng", status_code=400
+            )
+        if not all(isinstance(i, int) and not isinstance(i, bool) for i in payment_ids):
+            return APIResponse.error(
+                message="payment_ids chỉ được chứa số nguyên", status_code=400
+            )
+        if len(payment_ids) > PaymentService.MAX_BATCH_SIZE:
+            return APIResponse.error(
+                message=f"Tối đa {PaymentService.MAX_BATCH_SIZE} thanh toán mỗi lần xác nhận",
+                status_code=400,
+            )
+
+        result = PaymentService.confirm_batch(payment_ids, get_current_user_id())
+
+        return APIResponse.success(
+            data=result,
+            message=f"Đã xác nhận {len(result['confirmed'])}, bỏ qua {len(result['skipped'])} thanh toán",
+        )
+
+    except Exception as e:
+        db.session.rollback()
+        return APIResponse.error(message=str(e), status_code=500)
+
+@payments_bp.route('/reconcile', methods=['POST'])
+@jwt_required()
+@require_role(['admin', 'management'])
+@invalidates("payments")
+def reconcile_bank_statement():
+    """
+    Đối soát sao kê ngân hàng (CSV) với các thanh toán đang chờ xác nhận
+
+    Request: multipart/form-data với trường `file`, hoặc body `text/csv`.
+    Cột bắt buộc: ngày, số tiền, nội dung chuyển khoản (cột mã tham chiếu là tùy chọn).
+    Tham số (form hoặc query string):
+        confirm=true          # Xác nhận các thanh toán khớp chính xác
+        include_fuzzy=true    # Xác nhận cả các thanh toán khớp gần đúng
+        window_days=10        # Độ lệch ngày tối đa giữa giao dịch và thanh toán
+    """
+    try:
+        def flag(name):
+            return request.values.get(name, '').lower() in ('1', 'true', 'yes')
+
+        upload = request.files.get('file')
+        if upload:
+            stream = upload.stream
+        elif request.mimetype in ('text/csv', 'text/plain', 'application/octet-stream'):
+            stream = request.stream
+        else:
+            return APIResponse.error(message="Vui lòng gửi file sao kê CSV", status_code=400)
+
+        window_days = request.values.get('window_days', type=int)
+        if window_days is not None and window_days < 0:
+            return APIResponse.error(message="window_days không hợp lệ", status_code=400)
+
+        report = ReconciliationService.reconcile(
+            stream,
+            confirm=flag('confirm'),
+            include_fuzzy=flag('include_fuzzy'),
+            confirmed_by_user_id=get_current_user_id(),
+            window_days=window_days,
+        )
+
+        summary = report['summary']
+        message = f"Khớp {summary['matched']}/{summary['lines']} giao dịch"
+        if report['confirmation'] is not None:
+            message += f", đã xác nhận {report['confirmation']['confirmed']} thanh toán"
+            if report['confirmation']['failed']:
+                message += f", {len(report['confirmation']['failed'])} thanh toán chưa xác nhận được do lỗi"
+        return APIResponse.success(data=report, message=message)
+
+    except ReconciliationError as e:
+        return APIResponse.error(message=str(e), status_code=400)
+    except Exception as e:
+        db.session.rollback()
+        return APIResponse.error(message=str(e), status_code=500)
+
 @payments_bp.route('/<int:payment_id>/confirm', methods=['POST'])
 @jwt_required()
 @require_role(['admin', 'management'])
+@invalidates("payments")
 def confirm_payment(payment_id):
     """Xác nhận thanh toán"""
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = get_current_user_id()
 
         payment = Payment.query.get(payment_id)
         if not payment:
@@ -190,6 +348,7 @@ def confirm_payment(payment_id):
 @payments_bp.route('/<int:payment_id>/reject', methods=['POST'])
 @jwt_required()
 @require_role(['admin', 'management'])
+@invalidates("payments")
 def reject_payment(payment_id):
     """Từ chối thanh toán"""
     try:
@@ -220,11 +379,12 @@ def reject_payment(payment_id):
 
 @payments_bp.route('/<int:payment_id>', methods=['PUT'])
 @jwt_required()
+@invalidates("payments")
 def update_payment(payment_id):
     """Cập nhật thanh toán (sinh viên chỉ cập nhật được payment pending của mình)"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_role = get_current_role()
 
         payment = Payment.query.get(payment_id)
         if not payment:
@@ -233,7 +393,7 @@ def update_payment(payment_id):
             )
 
         # Student chỉ cập nhật được payment của mình và phải ở trạng thái pending
-        if current_user.role.role_name == 'student':
+        if current_role == 'student':
             if payment.contract.registration.student_id != current_user_id:
                 return APIResponse.error(
                     message="Không có quyền cập nhật thanh toán này", status_code=403
@@ -251,7 +411,7 @@ def update_payment(payment_id):
             payment.proof_image_url = data['proof_image_url']
 
         # Admin/Management có thể cập nhật thêm các trường khác
-        if current_user.role.role_name in ['admin', 'management']:
+        if current_role in ['admin', 'management']:
             if 'amount' in data:
                 payment.amount = data['amount']
             if 'payment_method' in data and data['payment_method'] in ['bank_transfer', 'cash']:
@@ -261,7 +421,7 @@ def update_payment(payment_id):
 
         payment_data = {
             "payment_id": payment.payment_id,
-            "amount": float(payment.amount),
+            "amount": payment.amount,
             "payment_method": payment.payment_method,
             "proof_image_url": payment.proof_image_url,
         }
@@ -277,23 +437,21 @@ def update_payment(payment_id):
 @payments_bp.route('/statistics', methods=['GET'])
 @jwt_required()
 @require_role(['admin', 'management'])
+@etag("payments")
+@cached(tags=("payments",), timeout=60)
 def get_payment_statistics():
     """Thống kê thanh toán"""
     try:
-        total_payments = Payment.query.count()
-        confirmed_payments = Payment.query.filter_by(status='confirmed').count()
-        pending_payments = Payment.query.filter_by(status='pending').count()
-        failed_payments = Payment.query.filter_by(status='failed').count()
-
-        # Tổng tiền đã xác nhận
-        total_confirmed_amount = db.session.query(
-            db.func.sum(Payment.amount)
-        ).filter_by(status='confirmed').scalar() or 0
-
-        # Tổng tiền đang chờ
-        total_pending_amount = db.session.query(
-            db.func.sum(Payment.amount)
-        ).filter_by(status='pending').scalar() or 0
+        counters = CounterService.get_counters()
+
+        total_payments = counters.count('payments.total')
+        confirmed_payments = counters.count('payments.confirmed.count')
+        pending_payments = counters.count('payments.pending.count')
+        failed_payments = counters.count('payments.failed.count')
+
+        # Tổng tiền đã xác nhận / đang chờ
+        total_confirmed_amount = counters.amount('payments.confirmed.amount')
+        total_pending_amount = counters.amount('payments.pending.amount')
 
         statistics_data = {
             "statistics": {
@@ -1,11 +1,23 @@
-from datetime import date, datetime
-
+from app.db_routing import use_primary
 from app.extensions import db
-from app.models import Contract, Payment, Registration, Room, User
+from app.models import Registration, RegistrationTicket
+from app.services.registration_queue_service import RegistrationQueueService
+from app.services.registration_service import RegistrationError, RegistrationService
+from app.services.room_allocation_service import RoomAllocationService
 from app.utils.api_response import APIResponse
+from app.utils.cache import invalidates
+from app.utils.auth import get_current_role, get_current_user_id
 from app.utils.decorators import require_role
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from app.utils.pagination import (
+    MAX_PER_PAGE,
+    CursorError,
+    cursor_requested,
+    keyset_paginate,
+    with_total_requested,
+)
+from app.utils.query_options import with_loader_options
+from flask import Blueprint, jsonify, request, url_for
+from flask_jwt_extended import jwt_required
 
 registrations_bp = Blueprint('registrations', __name__)
 
@@ -14,15 +26,15 @@ registrations_bp = Blueprint('registrations', __name__)
 def get_registrations():
     """Lấy danh sách đơn đăng ký"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_role = get_current_role()
 
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         status = request.args.get('status')
 
         # Student chỉ xem được đơn của mình
-        if current_user.role.role_name == 'student':
+        if current_role == 'student':
             query = Registration.query.filter_by(student_id=current_user_id)
         else:
             # Admin/Management xem tất cả
@@ -31,9 +43,27 @@ def get_registrations():
         if status:
             query = query.filter_by(status=status)
 
-        registrations = query.order_by(Registration.registration_date.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        query = with_loader_options(query, "registration_list")
+
+        if cursor_requested():
+            registrations = keyset_paginate(
+                query, Registration.registration_date, Registration.registration_id, 'registration_date',
+                cursor=request.args.get('cursor'), per_page=per_page,
+                with_total=with_total_requested(),
+            )
+            pagination = registrations.to_dict()
+        else:
+            registrations = query.order_by(Registration.registration_date.desc()).paginate(
+                page=page, per_page=per_page, max_per_page=MAX_PER_PAGE, error_out=False
+            )
+            pagination = {
+                "page": registrations.page,
+                "pages": registrations.pages,
+                "per_page": registrations.per_page,
+                "total": registrations.total,
+                "has_next": registrations.has_next,
+                "has_prev": registrations.has_prev,
+            }
 
         registrations_data = {
             "registrations": [
@@ -50,28 +80,23 @@ def get_registrations():
                         "room_number": reg.room.room_number,
                         "building_name": reg.room.building.building_name,
                         "room_type": reg.room.room_type.type_name,
-                        "price": float(reg.room.room_type.price),
+                        "price": reg.room.room_type.price,
                     },
                     "status": reg.status,
-                    "registration_date": reg.registration_date.isoformat(),
+                    "registration_date": reg.registration_date,
                     "has_contract": reg.contract is not None,
                 }
                 for reg in registrations.items
             ],
-            "pagination": {
-                "page": registrations.page,
-                "pages": registrations.pages,
-                "per_page": registrations.per_page,
-                "total": registrations.total,
-                "has_next": registrations.has_next,
-                "has_prev": registrations.has_prev,
-            },
+            "pagination": pagination,
         }
 
         return APIResponse.success(
             data=registrations_data, message="Lấy danh sách đăng ký thành công"
         )
 
+    except CursorError as e:
+        return APIResponse.error(message=str(e), status_code=400)
     except Exception as e:
         return APIResponse.error(message=str(e), status_code=500)
 
@@ -80,11 +105,11 @@ def get_registrations():
 def create_registration():
     """Tạo đơn đăng ký mới (sinh viên)"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_role = get_current_role()
 
         # Chỉ sinh viên mới được đăng ký
-        if current_user.role.role_name != 'student':
+        if current_role != 'student':
             return APIResponse.error(
                 message="Chỉ sinh viên mới được đăng ký phòng", status_code=403
             )
@@ -95,48 +120,25 @@ def create_registration():
         if not room_id:
             return APIResponse.error(message="room_id là bắt buộc", status_code=400)
 
-        # Kiểm tra phòng tồn tại
-        room = Room.query.get(room_id)
-        if not room:
-            return APIResponse.error(message="Phòng không tồn tại", status_code=404)
-
-        # Kiểm tra phòng còn chỗ trống
-        if not room.is_available:
-            return APIResponse.error(
-                message="Phòng đã đầy hoặc không khả dụng", status_code=400
-            )
-
-        # Kiểm tra giới tính của sinh viên và tòa nhà
-        building_gender = room.building.gender
-        student_gender = current_user.gender
-        if building_gender != "all" and building_gender != student_gender:
-            return APIResponse.error(
-                message=f"Bạn chỉ được đăng ký phòng ở tòa nhà dành cho giới tính '{student_gender}'",
-                status_code=400,
-            )
-
-        # Kiểm tra sinh viên đã có đơn đăng ký pending/approved chưa
-        existing_registration = (
-            Registration.query.filter_by(student_id=current_user_id)
-            .filter(Registration.status.in_(["pending", "approved"]))
-            .first()
-        )
-        if existing_registration:
-            return APIResponse.error(
-                message="Bạn đã có đơn đăng ký đang chờ xử lý hoặc đã được duyệt",
-                status_code=400,
+        # Chế độ cao điểm: chỉ xếp hàng, allocator sẽ kiểm tra và tạo đơn
+        if RegistrationQueueService.rush_mode_enabled():
+            if not isinstance(room_id, int) or isinstance(room_id, bool):
+                return APIResponse.error(message="room_id không hợp lệ", status_code=400)
+
+            ticket = RegistrationQueueService.enqueue(current_user_id, room_id)
+            return APIResponse.success(
+                data={
+                    "ticket": ticket.to_dict(),
+                    "queue_position": RegistrationQueueService.queue_position(ticket),
+                    "status_url": url_for(
+                        "registrations.get_registration_ticket", ticket_id=ticket.ticket_id
+                    ),
+                },
+                message="Yêu cầu đăng ký đã được xếp hàng",
+                status_code=202,
             )
 
-        # Tạo đơn đăng ký mới
-        registration = Registration(
-            student_id=current_user_id,
-            room_id=room_id,
-            status='pending',
-            registration_date=datetime.utcnow()
-        )
-
-        db.session.add(registration)
-        db.session.commit()
+        registration = RegistrationService.register(current_user_id, room_id)
 
         registration_data = {
             "registration": {
@@ -144,7 +146,7 @@ def create_registration():
                 "room_number": registration.room.room_number,
                 "building_name": registration.room.building.building_name,
                 "status": registration.status,
-                "registration_date": registration.registration_date.isoformat(),
+                "registration_date": registration.registration_date,
             }
         }
 
@@ -152,11 +154,47 @@ def create_registration():
             data=registration_data, message="Đăng ký phòng thành công", status_code=201
         )
 
+    except RegistrationError as e:
+        db.session.rollback()
+        return APIResponse.error(message=str(e), status_code=e.status_code)
     except Exception as e:
         db.session.rollback()
         return APIResponse.error(message=str(e), status_code=500)
 
 
+@registrations_bp.route('/tickets/<int:ticket_id>', methods=['GET'])
+@jwt_required()
+@use_primary
+def get_registration_ticket(ticket_id):
+    """Trạng thái phiếu đăng ký trong hàng đợi (sinh viên chỉ xem phiếu của mình)"""
+    try:
+        ticket = db.session.get(RegistrationTicket, ticket_id)
+        if not ticket:
+            return APIResponse.error(message="Phiếu đăng ký không tồn tại", status_code=404)
+
+        if get_current_role() == 'student' and ticket.student_id != get_current_user_id():
+            return APIResponse.error(message="Không có quyền xem phiếu này", status_code=403)
+
+        ticket_data = {
+            "ticket": ticket.to_dict(),
+            "queue_position": RegistrationQueueService.queue_position(ticket),
+        }
+        if ticket.registration:
+            ticket_data["registration"] = {
+                "registration_id": ticket.registration.registration_id,
+                "room_number": ticket.registration.room.room_number,
+                "building_name": ticket.registration.room.building.building_name,
+                "status": ticket.registration.status,
+                "registration_date": ticket.registration.registration_date,
+            }
+
+        return APIResponse.success(
+            data=ticket_data, message="Lấy trạng thái phiếu đăng ký thành công"
+        )
+
+    except Exception as e:
+        return APIResponse.error(message=str(e), status_code=500)
+
 @registrations_bp.route("/<int:registration_id>/json", methods=["GET"])
 @jwt_required()
 def get_registration_json(registration_id):
@@ -168,7 +206,7 @@ def get_registration_json(registration_id):
 
         reg_data = {
             "registration_id": registration.registration_id,
-            "registration_date": registration.registration_date.isoformat(),
+            "registration_date": registration.registration_date,
             "status": registration.status,
             "student": {
                 "full_name": registration.student.full_name,
@@ -179,7 +217,7 @@ def get_registration_json(registration_id):
                 "room_number": registration.room.room_number,
                 "building_name": registration.room.building.building_name,
                 "room_type": registration.room.room_type.type_name,
-                "price": float(registration.room.room_type.price),
+                "price": registration.room.room_type.price,
             },
         }
         return jsonify({"success": True, "registration": reg_data})
@@ -187,70 +225,110 @@ def get_registration_json(registration_id):
         return jsonify({"success": False, "message": str(e)}), 500
 
 
-@registrations_bp.route('/<int:registration_id>/approve', methods=['POST'])
+@registrations_bp.route('/approve-batch', methods=['POST'])
 @jwt_required()
 @require_role(['admin', 'management'])
-def approve_registration(registration_id):
-    """Duyệt đơn đăng ký"""
+@invalidates("contracts")
+def approve_registrations_batch():
+    """Duyệt nhiều đơn đăng ký cùng lúc, trả về kết quả cho từng đơn"""
     try:
-        registration = Registration.query.get(registration_id)
-        if not registration:
+        data = request.get_json() or {}
+        registration_ids = data.get('registration_ids')
+
+        if not isinstance(registration_ids, list) or not registration_ids:
             return APIResponse.error(
-                message="Đơn đăng ký không tồn tại", status_code=404
+                message="registration_ids phải là danh sách không rỗng", status_code=400
             )
-
-        if registration.status != 'pending':
+        if not all(isinstance(i, int) and not isinstance(i, bool) for i in registration_ids):
             return APIResponse.error(
-                message="Chỉ có thể duyệt đơn đang chờ xử lý", status_code=400
+                message="registration_ids chỉ được chứa số nguyên", status_code=400
             )
-
-        # Kiểm tra phòng còn chỗ trống
-        room = registration.room
-        if not room.is_available:
+        if len(registration_ids) > RegistrationService.MAX_BATCH_SIZE:
             return APIResponse.error(
-                message="Phòng đã đầy, không thể duyệt đơn", status_code=400
+                message=f"Tối đa {RegistrationService.MAX_BATCH_SIZE} đơn mỗi lần duyệt",
+                status_code=400,
             )
 
-        # Cập nhật trạng thái đơn đăng ký
-        registration.status = 'approved'
+        result = RegistrationService.approve_batch(registration_ids)
+
+        return APIResponse.success(
+            data=result,
+            message=f"Đã duyệt {result['approved']}/{len(result['results'])} đơn đăng ký",
+        )
+
+    except Exception as e:
+        db.session.rollback()
+        return APIResponse.error(message=str(e), status_code=500)
 
-        # Cập nhật số người trong phòng
-        room.current_occupancy += 1
-        if room.current_occupancy >= room.room_type.capacity:
-            room.status = 'occupied'
+def _allocation_registration_ids():
+    """registration_ids (tùy chọn) trong body của các endpoint xếp phòng"""
+    data = request.get_json(silent=True) or {}
+    registration_ids = data.get('registration_ids')
+    if registration_ids is None:
+        return None
+    if not isinstance(registration_ids, list) or not all(
+        isinstance(i, int) and not isinstance(i, bool) for i in registration_ids
+    ):
+        raise RegistrationError("registration_ids phải là danh sách số nguyên")
+    return registration_ids
 
-        # Tạo hợp đồng tự động
-        contract_code = f"HD{registration.registration_id:04d}"
-        start_date = date.today()
-        end_date = date(start_date.year + 1, start_date.month, start_date.day)  # 1 năm
 
-        contract = Contract(
-            registration_id=registration.registration_id,
-            contract_code=contract_code,
-            start_date=start_date,
-            end_date=end_date
+@registrations_bp.route('/allocation/preview', methods=['POST'])
+@jwt_required()
+@require_role(['admin', 'management'])
+def preview_room_allocation():
+    """Xem trước phương án xếp phòng cho các đơn pending (không ghi dữ liệu)"""
+    try:
+        plan = RoomAllocationService.plan(_allocation_registration_ids())
+        db.session.rollback()
+
+        return APIResponse.success(
+            data=plan,
+            message=f"Xếp được {plan['summary']['assigned']}/{plan['summary']['pending']} đơn",
         )
 
-        db.session.add(contract)
-        db.session.flush()  # To get the contract ID
+    except RegistrationError as e:
+        return APIResponse.error(message=str(e), status_code=e.status_code)
+    except Exception as e:
+        db.session.rollback()
+        return APIResponse.error(message=str(e), status_code=500)
+
+
+@registrations_bp.route('/allocation/apply', methods=['POST'])
+@jwt_required()
+@require_role(['admin', 'management'])
+@invalidates("contracts")
+def apply_room_allocation():
+    """Áp dụng phương án xếp phòng: chuyển phòng và duyệt các đơn được xếp"""
+    try:
+        plan = RoomAllocationService.apply(_allocation_registration_ids())
 
-        # Tạo khoản thanh toán đầu tiên (pending) cho tháng đầu
-        room_price = registration.room.room_type.price
-        initial_payment = Payment(
-            contract_id=contract.contract_id,
-            amount=room_price,
-            payment_method="bank_transfer",  # Mặc định
-            status="pending",  # Chờ sinh viên thanh toán
+        return APIResponse.success(
+            data=plan,
+            message=f"Đã duyệt {plan['approval']['approved']}/{plan['summary']['pending']} đơn",
         )
 
-        db.session.add(initial_payment)
+    except RegistrationError as e:
+        db.session.rollback()
+        return APIResponse.error(message=str(e), status_code=e.status_code)
+    except Exception as e:
+        db.session.rollback()
+        return APIResponse.error(message=str(e), status_code=500)
+
 
-        db.session.commit()
+@registrations_bp.route('/<int:registration_id>/approve', methods=['POST'])
+@jwt_required()
+@require_role(['admin', 'management'])
+@invalidates("contracts")
+def approve_registration(registration_id):
+    """Duyệt đơn đăng ký"""
+    try:
+        contract = RegistrationService.approve(registration_id)
 
         registration_data = {
             "registration": {
-                "registration_id": registration.registration_id,
-                "status": registration.status,
+                "registration_id": registration_id,
+                "status": "approved",
                 "contract_code": contract.contract_code,
             }
         }
@@ -259,6 +337,9 @@ def approve_registration(registration_id):
             data=registration_data, message="Duyệt đơn đăng ký thành công"
         )
 
+    except RegistrationError as e:
+        db.session.rollback()
+        return APIResponse.error(message=str(e), status_code=e.status_code)
     except Exception as e:
         db.session.rollback()
         return APIResponse.error(message=str(e), status_code=500)
@@ -303,8 +384,8 @@ def reject_registration(registration_id):
 def cancel_registration(registration_id):
     """Hủy đơn đăng ký (sinh viên chỉ hủy được đơn pending của mình)"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_role = get_current_role()
 
         registration = Registration.query.get(registration_id)
         if not registration:
@@ -313,7 +394,7 @@ def cancel_registration(registration_id):
             )
 
         # Sinh viên chỉ hủy được đơn của mình
-        if (current_user.role.role_name == 'student' and 
+        if (current_role == 'student' and 
             registration.student_id != current_user_id):
             return APIResponse.error(
                 message="Không có quyền hủy đơn này", status_code=403
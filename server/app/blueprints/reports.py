@@ -0,0 +1,91 @@
+import os
+
+from app.db_routing import use_primary
+from app.extensions import db
+from app.models import ReportJob
+from app.services.report_job_service import ReportJobService
+from app.utils.api_response import APIResponse
+from app.utils.decorators import require_role
+from flask import Blueprint, send_file
+from flask_jwt_extended import jwt_required
+
+reports_bp = Blueprint('reports', __name__)
+
+
+@reports_bp.route('/<int:job_id>', methods=['GET'])
+@jwt_required()
+@require_role(['admin', 'management'])
+@use_primary
+def get_report_job(job_id):
+    """
+    Lấy trạng thái và tiến độ của report job
+
+    Method: GET
+    Path Parameters:
+        job_id: int                # ID của job
+
+    Response JSON (Success - 200):
+    {
+        "success": true,
+        "message": "Lấy trạng thái báo cáo thành công",
+        "data": {
+            "job": {
+                "job_id": 1,
+                "report_type": "contracts_excel",
+                "status": "running",       # pending | running | completed | failed
+                "progress": 3000,
+                "total": 10000,
+                "progress_percent": 30,
+                ...
+            }
+        }
+    }
+    """
+    try:
+        job = db.session.get(ReportJob, job_id)
+        if not job:
+            return APIResponse.error(message="Báo cáo không tồn tại", status_code=404)
+
+        return APIResponse.success(
+            data={"job": job.to_dict()}, message="Lấy trạng thái báo cáo thành công"
+        )
+
+    except Exception as e:
+        return APIResponse.error(message=str(e), status_code=500)
+
+
+@reports_bp.route('/<int:job_id>/download', methods=['GET'])
+@jwt_required()
+@require_role(['admin', 'management'])
+@use_primary
+def download_report(job_id):
+    """
+    Tải file của report job đã hoàn thành
+
+    Response (Error):
+        404 - Job không tồn tại
+        409 - Job chưa hoàn thành
+        410 - File đã bị xóa do hết hạn lưu trữ
+    """
+    try:
+        job = db.session.get(ReportJob, job_id)
+        if not job:
+            return APIResponse.error(message="Báo cáo không tồn tại", status_code=404)
+
+        if job.status != 'completed':
+            return APIResponse.error(
+                message=f"Báo cáo chưa sẵn sàng (trạng thái: {job.status})", status_code=409
+            )
+
+        if not job.file_path or not os.path.exists(job.file_path):
+            return APIResponse.error(message="File báo cáo đã hết hạn", status_code=410)
+
+        return send_file(
+            job.file_path,
+            mimetype=ReportJobService.mimetype(job),
+            as_attachment=True,
+            download_name=job.file_name,
+        )
+
+    except Exception as e:
+        return APIResponse.error(message=str(e), status_code=500)
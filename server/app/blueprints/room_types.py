@@ -1,6 +1,10 @@
 from app.extensions import db
-from app.models import RoomType
+from app.models import Room, RoomType
+from app.services.statistics_service import StatisticsService
 from app.utils.api_response import APIResponse
+from app.utils.cache import cached, invalidates
+from app.utils.etag import etag
+from app.utils.pagination import MAX_PER_PAGE
 from app.utils.decorators import require_role
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
@@ -10,6 +14,7 @@ room_types_bp = Blueprint('room_types', __name__)
 
 @room_types_bp.route('/', methods=['GET'])
 @jwt_required()
+@etag("room_types", "rooms")
 def get_room_types():
     """
     Lấy danh sách loại phòng với phân trang và tìm kiếm
@@ -70,8 +75,8 @@ def get_room_types():
         min_price = request.args.get('min_price', type=float)
         max_price = request.args.get('max_price', type=float)
 
-        # Tạo query cơ bản
-        query = RoomType.query
+        # Tạo query cơ bản (kèm số phòng tính bằng subquery GROUP BY)
+        query = StatisticsService.with_room_counts(RoomType, Room.room_type_id)
 
         # Thêm điều kiện tìm kiếm theo tên
         if search:
@@ -94,22 +99,14 @@ def get_room_types():
 
         # Phân trang
         room_types = query.paginate(
-            page=page, per_page=per_page, error_out=False
+            page=page, per_page=per_page, max_per_page=MAX_PER_PAGE, error_out=False
         )
 
         # Chuẩn bị dữ liệu trả về
         room_types_data = {
             "room_types": [
-                {
-                    "room_type_id": rt.room_type_id,
-                    "type_name": rt.type_name,
-                    "capacity": rt.capacity,
-                    "price": float(rt.price),
-                    "total_rooms": rt.room_count,
-                    "available_rooms": rt.available_rooms_count,
-                    "occupied_rooms": rt.occupied_rooms_count,
-                }
-                for rt in room_types.items
+                row.RoomType.to_dict(room_counts=row._mapping)
+                for row in room_types.items
             ],
             "pagination": {
                 "page": room_types.page,
@@ -131,6 +128,7 @@ def get_room_types():
 
 @room_types_bp.route('/<int:room_type_id>', methods=['GET'])
 @jwt_required()
+@etag("room_types", "rooms")
 def get_room_type(room_type_id):
     """
     Lấy thông tin chi tiết một loại phòng
@@ -177,7 +175,7 @@ def get_room_type(room_type_id):
                 "room_type_id": room_type.room_type_id,
                 "type_name": room_type.type_name,
                 "capacity": room_type.capacity,
-                "price": float(room_type.price),
+                "price": room_type.price,
                 "total_rooms": room_type.room_count,
                 "available_rooms": room_type.available_rooms_count,
                 "occupied_rooms": room_type.occupied_rooms_count,
@@ -195,6 +193,7 @@ def get_room_type(room_type_id):
 @room_types_bp.route('/', methods=['POST'])
 @jwt_required()
 @require_role(['admin'])
+@invalidates("room_types")
 def create_room_type():
     """
     Tạo loại phòng mới
@@ -291,7 +290,7 @@ def create_room_type():
                 "room_type_id": room_type.room_type_id,
                 "type_name": room_type.type_name,
                 "capacity": room_type.capacity,
-                "price": float(room_type.price),
+                "price": room_type.price,
                 "total_rooms": room_type.room_count,
                 "available_rooms": room_type.available_rooms_count,
                 "occupied_rooms": room_type.occupied_rooms_count,
@@ -315,6 +314,7 @@ def create_room_type():
 @room_types_bp.route('/<int:room_type_id>', methods=['PUT'])
 @jwt_required()
 @require_role(['admin'])
+@invalidates("room_types")
 def update_room_type(room_type_id):
     """
     Cập nhật thông tin loại phòng
@@ -416,7 +416,7 @@ def update_room_type(room_type_id):
                 "room_type_id": room_type.room_type_id,
                 "type_name": room_type.type_name,
                 "capacity": room_type.capacity,
-                "price": float(room_type.price),
+                "price": room_type.price,
                 "total_rooms": room_type.room_count,
                 "available_rooms": room_type.available_rooms_count,
                 "occupied_rooms": room_type.occupied_rooms_count,
@@ -440,6 +440,7 @@ def update_room_type(room_type_id):
 @room_types_bp.route('/<int:room_type_id>', methods=['DELETE'])
 @jwt_required()
 @require_role(['admin'])
+@invalidates("room_types")
 def delete_room_type(room_type_id):
     """
     Xóa loại phòng
@@ -500,6 +501,8 @@ def delete_room_type(room_type_id):
 
 @room_types_bp.route('/simple', methods=['GET'])
 @jwt_required()
+@etag("room_types")
+@cached(tags=("room_types",))
 def get_room_types_simple():
     """
     Lấy danh sách loại phòng đơn giản (cho dropdown, select box)
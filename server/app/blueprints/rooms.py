@@ -1,7 +1,17 @@
 from app.extensions import db
 from app.models import Building, Room, RoomType, User
 from app.utils.api_response import APIResponse
+from app.utils.cache import cached, invalidates
+from app.utils.etag import etag
 from app.utils.decorators import require_role
+from app.utils.pagination import (
+    MAX_PER_PAGE,
+    CursorError,
+    cursor_requested,
+    keyset_paginate,
+    with_total_requested,
+)
+from app.utils.query_options import with_loader_options
 from flask import Blueprint, json, jsonify, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 
@@ -10,6 +20,7 @@ rooms_bp = Blueprint('rooms', __name__)
 
 @rooms_bp.route("/", methods=["GET"])
 @jwt_required()
+@etag("rooms", "buildings", "room_types")
 def get_rooms():
     """
     Lấy danh sách phòng với phân trang và tìm kiếm
@@ -80,9 +91,28 @@ def get_rooms():
         if search:
             query = query.filter(Room.room_number.contains(search))
 
-        rooms = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        query = with_loader_options(query, "room_list")
+
+        if cursor_requested():
+            rooms = keyset_paginate(
+                query, Room.room_id, Room.room_id, 'room_id',
+                cursor=request.args.get('cursor'), per_page=per_page,
+                with_total=with_total_requested(),
+                descending=False,
+            )
+            pagination = rooms.to_dict()
+        else:
+            rooms = query.paginate(
+                page=page, per_page=per_page, max_per_page=MAX_PER_PAGE, error_out=False
+            )
+            pagination = {
+                "page": rooms.page,
+                "pages": rooms.pages,
+                "per_page": rooms.per_page,
+                "total": rooms.total,
+                "has_next": rooms.has_next,
+                "has_prev": rooms.has_prev,
+            }
 
         rooms_data = {
             "rooms": [
@@ -97,7 +127,7 @@ def get_rooms():
                         "room_type_id": room.room_type.room_type_id,
                         "type_name": room.room_type.type_name,
                         "capacity": room.room_type.capacity,
-                        "price": float(room.room_type.price),
+                        "price": room.room_type.price,
                     },
                     "status": room.status,
                     "current_occupancy": room.current_occupancy,
@@ -106,26 +136,86 @@ def get_rooms():
                 }
                 for room in rooms.items
             ],
-            "pagination": {
-                "page": rooms.page,
-                "pages": rooms.pages,
-                "per_page": rooms.per_page,
-                "total": rooms.total,
-                "has_next": rooms.has_next,
-                "has_prev": rooms.has_prev,
-            },
+            "pagination": pagination,
         }
 
         return APIResponse.success(
             data=rooms_data, message="Lấy danh sách phòng thành công"
         )
 
+    except CursorError as e:
+        return APIResponse.error(message=str(e), status_code=400)
+    except Exception as e:
+        return APIResponse.error(message=str(e), status_code=500)
+
+
+@rooms_bp.route("/simple", methods=["GET"])
+@jwt_required()
+@etag("rooms", "buildings", "room_types")
+@cached(tags=("rooms", "buildings", "room_types"))
+def get_rooms_simple():
+    """
+    Lấy danh sách phòng đơn giản (cho dropdown, select box)
+
+    Method: GET
+    Query Parameters:
+        building_id: int           # Lọc theo ID tòa nhà (optional)
+        room_type_id: int          # Lọc theo ID loại phòng (optional)
+
+    Example URL: GET /rooms/simple?building_id=1
+
+    Response JSON (Success - 200):
+    {
+        "success": true,
+        "message": "Lấy danh sách phòng thành công",
+        "data": {
+            "rooms": [
+                {
+                    "room_id": 1,
+                    "room_number": "101",
+                    "building_id": 1,
+                    "building_name": "Tòa A",
+                    "room_type_id": 1,
+                    "type_name": "Phòng đơn",
+                    "capacity": 2
+                }
+            ]
+        }
+    }
+    """
+    try:
+        building_id = request.args.get('building_id', type=int)
+        room_type_id = request.args.get('room_type_id', type=int)
+
+        query = db.session.query(
+            Room.room_id,
+            Room.room_number,
+            Room.building_id,
+            Building.building_name,
+            Room.room_type_id,
+            RoomType.type_name,
+            RoomType.capacity,
+        ).join(Building).join(RoomType)
+
+        if building_id:
+            query = query.filter(Room.building_id == building_id)
+        if room_type_id:
+            query = query.filter(Room.room_type_id == room_type_id)
+
+        rows = query.order_by(Building.building_name, Room.room_number).all()
+
+        return APIResponse.success(
+            data={"rooms": [dict(row._mapping) for row in rows]},
+            message="Lấy danh sách phòng thành công",
+        )
+
     except Exception as e:
         return APIResponse.error(message=str(e), status_code=500)
 
 
 @rooms_bp.route("/<int:room_id>", methods=["GET"])
 @jwt_required()
+@etag("rooms", "buildings", "room_types")
 def get_room(room_id):
     """
     Lấy thông tin chi tiết một phòng
@@ -188,7 +278,7 @@ def get_room(room_id):
                     "room_type_id": room.room_type.room_type_id,
                     "type_name": room.room_type.type_name,
                     "capacity": room.room_type.capacity,
-                    "price": float(room.room_type.price),
+                    "price": room.room_type.price,
                 },
                 "status": room.status,
                 "current_occupancy": room.current_occupancy,
@@ -197,11 +287,7 @@ def get_room(room_id):
                 "description": getattr(
                     room, "description", None
                 ),  # Add description field
-                "created_at": (
-                    room.created_at.isoformat()
-                    if hasattr(room, "created_at") and room.created_at
-                    else None
-                ),
+                "created_at": getattr(room, "created_at", None),
             }
         }
 
@@ -216,6 +302,7 @@ def get_room(room_id):
 @rooms_bp.route("/", methods=["POST"])
 @jwt_required()
 @require_role(["admin", "management"])
+@invalidates("rooms")
 def create_room():
     """
     Tạo phòng mới
@@ -334,6 +421,7 @@ def create_room():
 @rooms_bp.route("/<int:room_id>", methods=["PUT"])
 @jwt_required()
 @require_role(["admin", "management"])
+@invalidates("rooms")
 def update_room(room_id):
     """Cập nhật thông tin phòng"""
     try:
@@ -374,6 +462,7 @@ def update_room(room_id):
 @rooms_bp.route("/<int:room_id>", methods=["DELETE"])
 @jwt_required()
 @require_role(["admin"])
+@invalidates("rooms")
 def delete_room(room_id):
     """
     Xóa phòng
@@ -9,11 +9,21 @@ from app.models import (
     Room,
     User,
 )
+from app.services.user_import_service import UserImportError, UserImportService
 from app.utils.api_response import APIResponse
+from app.utils.auth import forget_auth_state, get_current_role, get_current_user_id
 from app.utils.decorators import require_role
+from app.utils.password_hashing import PasswordHashingBusy, hash_password
+from app.utils.pagination import (
+    MAX_PER_PAGE,
+    CursorError,
+    cursor_requested,
+    keyset_paginate,
+    with_total_requested,
+)
+from app.utils.query_options import with_loader_options
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
-from werkzeug.security import generate_password_hash
+from flask_jwt_extended import jwt_required
 
 users_bp = Blueprint("users", __name__)
 
@@ -85,7 +95,26 @@ def get_users():
                 )
             )
 
-        users = query.paginate(page=page, per_page=per_page, error_out=False)
+        query = with_loader_options(query, "user_list")
+
+        if cursor_requested():
+            users = keyset_paginate(
+                query, User.user_id, User.user_id, "user_id",
+                cursor=request.args.get("cursor"), per_page=per_page,
+                with_total=with_total_requested(),
+                descending=False,
+            )
+            pagination = users.to_dict()
+        else:
+            users = query.paginate(page=page, per_page=per_page, max_per_page=MAX_PER_PAGE, error_out=False)
+            pagination = {
+                "page": users.page,
+                "pages": users.pages,
+                "per_page": users.per_page,
+                "total": users.total,
+                "has_next": users.has_next,
+                "has_prev": users.has_prev,
+            }
 
         user_data = {
             "users": [
@@ -97,25 +126,20 @@ def get_users():
                     "student_id": user.student_id,
                     "gender": user.gender,
                     "role": user.role.role_name,
-                    "created_at": user.created_at.isoformat(),
+                    "created_at": user.created_at,
                     "is_active": user.is_active,
                 }
                 for user in users.items
             ],
-            "pagination": {
-                "page": users.page,
-                "pages": users.pages,
-                "per_page": users.per_page,
-                "total": users.total,
-                "has_next": users.has_next,
-                "has_prev": users.has_prev,
-            },
+            "pagination": pagination,
         }
 
         return APIResponse.success(
             data=user_data, message="Lấy danh sách users thành công"
         )
 
+    except CursorError as e:
+        return APIResponse.error(message=str(e), status_code=400)
     except Exception as e:
         return APIResponse.error(message=str(e), status_code=500)
 
@@ -166,11 +190,11 @@ def get_user(user_id):
     }
     """
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_role = get_current_role()
 
         # Chỉ cho phép xem thông tin của chính mình hoặc Admin/Management
-        if current_user_id != user_id and current_user.role.role_name not in [
+        if current_user_id != user_id and current_role not in [
             "admin",
             "management",
         ]:
@@ -189,7 +213,7 @@ def get_user(user_id):
                 "student_id": user.student_id,
                 "gender": user.gender,
                 "role": user.role.role_name,
-                "created_at": user.created_at.isoformat(),
+                "created_at": user.created_at,
                 "is_active": user.is_active,
             }
         }
@@ -288,7 +312,7 @@ def create_user():
             role_id=role.role_id,
             full_name=data["full_name"],
             email=data["email"],
-            password_hash=generate_password_hash(data["password"]),
+            password_hash=hash_password(data["password"]),
             phone_number=data.get("phone_number"),
             student_id=data.get("student_id"),
             gender=data.get("gender", "other"),
@@ -307,7 +331,7 @@ def create_user():
                 "student_id": user.student_id,
                 "gender": user.gender,
                 "role": user.role.role_name,
-                "created_at": user.created_at.isoformat(),
+                "created_at": user.created_at,
                 "is_active": user.is_active,
             }
         }
@@ -316,6 +340,77 @@ def create_user():
             data=user_data, message="Tạo user thành công", status_code=201
         )
 
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return APIResponse.error(message=str(e), status_code=503)
+    except Exception as e:
+        db.session.rollback()
+        return APIResponse.error(message=str(e), status_code=500)
+
+
+@users_bp.route("/import", methods=["POST"])
+@jwt_required()
+@require_role(["admin", "management"])
+def import_users():
+    """
+    Tạo tài khoản hàng loạt từ file CSV
+
+    Method: POST
+    Headers:
+        Authorization: Bearer <access_token>
+        Content-Type: multipart/form-data (trường `file`) hoặc text/csv
+
+    Permissions: Chỉ admin và management
+
+    CSV:
+        full_name,email,password,role_name,phone_number,student_id,gender
+        Cột bắt buộc: full_name, email. Dòng không có password được cấp mật khẩu
+        ngẫu nhiên (trả về trong `initial_password`).
+
+    Query/Form Parameters:
+        role: string = "student"   # Role cho các dòng không có role_name (optional)
+        dry_run: bool = false      # Chỉ kiểm tra, không ghi database (optional)
+
+    Response JSON (Success - 200):
+    {
+        "success": true,
+        "message": "Đã tạo 2/3 tài khoản",
+        "data": {
+            "summary": {"rows": 3, "created": 2, "failed": 1},
+            "created": [{"line": 2, "user_id": 10, "email": "a@example.com", "student_id": "SV010"}],
+            "errors": [{"line": 4, "email": "b@example.com", "error": "Email đã được sử dụng"}],
+            "dry_run": false
+        },
+        "status_code": 200
+    }
+    """
+    try:
+        upload = request.files.get("file")
+        if upload:
+            stream = upload.stream
+        elif request.mimetype in ("text/csv", "text/plain", "application/octet-stream"):
+            stream = request.stream
+        else:
+            return APIResponse.error(message="Vui lòng gửi file CSV", status_code=400)
+
+        report = UserImportService.import_csv(
+            stream,
+            default_role=request.values.get("role", "student"),
+            dry_run=request.values.get("dry_run", "").lower() in ("1", "true", "yes"),
+        )
+
+        summary = report["summary"]
+        return APIResponse.success(
+            data=report,
+            message=f"Đã tạo {summary['created']}/{summary['rows']} tài khoản"
+            + (" (chạy thử)" if report["dry_run"] else ""),
+        )
+
+    except UserImportError as e:
+        return APIResponse.error(message=str(e), status_code=400)
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return APIResponse.error(message=str(e), status_code=503)
     except Exception as e:
         db.session.rollback()
         return APIResponse.error(message=str(e), status_code=500)
@@ -376,11 +471,11 @@ def update_user(user_id):
     }
     """
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = get_current_user_id()
+        current_role = get_current_role()
 
         # Chỉ cho phép cập nhật thông tin của chính mình hoặc Admin/Management
-        if current_user_id != user_id and current_user.role.role_name not in [
+        if current_user_id != user_id and current_role not in [
             "admin",
             "management",
         ]:
@@ -401,7 +496,7 @@ def update_user(user_id):
             user.gender = data["gender"]
 
         # Chỉ Admin/Management mới được cập nhật role và is_active
-        if current_user.role.role_name in ["admin", "management"]:
+        if current_role in ["admin", "management"]:
             if "is_active" in data:
                 user.is_active = data["is_active"]
             if "role_name" in data:
@@ -410,6 +505,8 @@ def update_user(user_id):
                     user.role_id = role.role_id
 
         db.session.commit()
+        # Đổi role/khóa tài khoản có hiệu lực ngay (worker khác: sau AUTH_RECHECK_SECONDS)
+        forget_auth_state(user_id)
 
         user_data = {
             "user": {
@@ -420,7 +517,7 @@ def update_user(user_id):
                 "student_id": user.student_id,
                 "gender": user.gender,
                 "role": user.role.role_name,
-                "created_at": user.created_at.isoformat(),
+                "created_at": user.created_at,
                 "is_active": user.is_active,
             }
         }
@@ -471,7 +568,7 @@ def delete_user(user_id):
             return APIResponse.error(message="User không tồn tại", status_code=404)
 
         # Không cho phép xóa chính mình
-        current_user_id = get_jwt_identity()
+        current_user_id = get_current_user_id()
         if current_user_id == user_id:
             return APIResponse.error(
                 message="Không thể xóa chính mình", status_code=400
@@ -528,6 +625,7 @@ def delete_user(user_id):
 
         db.session.delete(user)
         db.session.commit()
+        forget_auth_state(user_id)
 
         return APIResponse.success(message="Xóa user thành công")
 
@@ -0,0 +1,107 @@
+"""
+Các lệnh CLI của ứng dụng (chạy bằng `flask --app application <group> <command>`).
+"""
+import click
+from flask.cli import AppGroup
+
+counters_cli = AppGroup("counters", help="Quản lý bộ đếm dashboard")
+reports_cli = AppGroup("reports", help="Xử lý report job chạy nền")
+registrations_cli = AppGroup("registrations", help="Hàng đợi đăng ký phòng (chế độ cao điểm)")
+billing_cli = AppGroup("billing", help="Tạo khoản tiền phòng hàng tháng")
+users_cli = AppGroup("users", help="Quản lý tài khoản")
+
+
+@counters_cli.command("rebuild")
+def rebuild_counters():
+    """Tính lại toàn bộ dashboard counters từ các bảng nguồn"""
+    from app.services.counter_service import CounterService
+
+    counters = CounterService.rebuild()
+    click.echo(f"Đã tính lại {len(counters)} counter")
+
+
+@reports_cli.command("worker")
+@click.option("--once", is_flag=True, help="Xử lý hết các job đang chờ rồi thoát")
+@click.option("--interval", type=float, default=None, help="Số giây chờ khi không có job")
+def run_report_worker(once, interval):
+    """Chạy worker tạo báo cáo cho các report job đang chờ"""
+    from app.services.report_job_service import ReportJobService
+
+    ReportJobService.work(once=once, poll_interval=interval, log=click.echo)
+
+
+@reports_cli.command("cleanup")
+def cleanup_reports():
+    """Xóa các report job và file đã hết hạn lưu trữ"""
+    from app.services.report_job_service import ReportJobService
+
+    removed = ReportJobService.cleanup()
+    click.echo(f"Đã xóa {removed} report job hết hạn")
+
+
+@registrations_cli.command("allocate")
+@click.option("--once", is_flag=True, help="Xử lý hết các phiếu đang chờ rồi thoát")
+@click.option("--batch-size", type=int, default=None, help="Số phiếu mỗi lô")
+@click.option("--interval", type=float, default=None, help="Số giây chờ khi hàng đợi rỗng")
+def allocate_registrations(once, batch_size, interval):
+    """Xử lý hàng đợi đăng ký theo thứ tự đến (chỉ chạy một tiến trình)"""
+    from app.services.registration_queue_service import RegistrationQueueService
+
+    RegistrationQueueService.work(
+        once=once, batch_size=batch_size, poll_interval=interval, log=click.echo
+    )
+
+
+@billing_cli.command("run")
+@click.option("--period", default=None, help="Kỳ thu YYYY-MM (mặc định: tháng hiện tại)")
+@click.option("--dry-run", is_flag=True, help="Chỉ tính, không ghi database")
+def run_billing(period, dry_run):
+    """Tạo khoản tiền phòng của kỳ cho mọi hợp đồng đang hiệu lực"""
+    from app.services.billing_service import BillingService
+
+    try:
+        result = BillingService.run(period, dry_run=dry_run)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--period")
+    click.echo(
+        f"Kỳ {result['period']}: {result['payments']} khoản thu, tổng {result['amount']:,.0f} VND"
+        + (" (chạy thử)" if dry_run else "")
+    )
+
+
+@users_cli.command("import")
+@click.argument("csv_file", type=click.File("rb"))
+@click.option("--role", "default_role", default="student", help="Role cho các dòng không có role_name")
+@click.option("--dry-run", is_flag=True, help="Chỉ kiểm tra, không ghi database")
+@click.option("--workers", type=int, default=None, help="Số nhóm mật khẩu băm song song tối đa")
+def import_users(csv_file, default_role, dry_run, workers):
+    """Tạo tài khoản hàng loạt từ file CSV"""
+    from app.services.user_import_service import UserImportError, UserImportService
+
+    try:
+        report = UserImportService.import_csv(
+            csv_file, default_role=default_role, dry_run=dry_run, workers=workers
+        )
+    except UserImportError as e:
+        raise click.BadParameter(str(e), param_hint="CSV_FILE")
+
+    for error in report["errors"]:
+        click.echo(f"Dòng {error['line']} ({error['email']}): {error['error']}", err=True)
+    for item in report["created"]:
+        if "initial_password" in item:
+            click.echo(f"{item['email']},{item['initial_password']}")
+    summary = report["summary"]
+    click.echo(
+        f"{summary['rows']} dòng: tạo {summary['created']}, lỗi {summary['failed']}"
+        + (" (chạy thử)" if dry_run else ""),
+        err=True,
+    )
+
+
+def register_commands(app):
+    """Đăng ký các nhóm lệnh CLI"""
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(reports_cli)
+    app.cli.add_command(registrations_cli)
+    app.cli.add_command(billing_cli)
+    app.cli.add_command(users_cli)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 from dotenv import load_dotenv
 
@@ -7,15 +8,84 @@ load_dotenv()
 class BaseConfig:
     SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool (mỗi worker một pool). pool_recycle phải nhỏ hơn wait_timeout của MySQL;
+    # pool_pre_ping kiểm tra connection trước khi dùng để bỏ các connection đã bị server đóng.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+    }
+    # Ghi số liệu pool (thời gian chờ, overflow, timeout) cho GET /api/dashboard/pool-stats
+    DB_POOL_METRICS = os.getenv('DB_POOL_METRICS', 'true').lower() in ('1', 'true', 'yes')
+
+    # Read replica (tùy chọn): request GET/HEAD đọc từ replica, ghi và đọc-sau-ghi dùng primary
+    SQLALCHEMY_REPLICA_URI = os.getenv('SQLALCHEMY_REPLICA_URI')
+    REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 10))  # Trễ hơn thì đọc primary; < 0: không kiểm tra
+    REPLICA_LAG_CHECK_SECONDS = float(os.getenv('REPLICA_LAG_CHECK_SECONDS', 5))  # Thời gian cache kết quả kiểm tra độ trễ
+    REPLICA_HEARTBEAT_SECONDS = float(os.getenv('REPLICA_HEARTBEAT_SECONDS', 1))  # Chu kỳ ghi heartbeat lên primary; <= 0: không ghi (heartbeat do tiến trình khác ghi)
+    REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', 5))  # Đọc primary trong khoảng này sau khi ghi
+
+    # Cache response của endpoint dropdown/thống kê (app.utils.cache)
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND')  # Import path của backend khác; mặc định LRU trong bộ nhớ worker
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+    CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 300))  # Giây
+    # ETag/304 cho các endpoint GET (app.utils.etag)
+    ETAG_ENABLED = os.getenv('ETAG_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+    # Nén response JSON/CSV theo Accept-Encoding (tắt nếu reverse proxy đã nén)
+    COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))  # Byte, response nhỏ hơn không nén
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))  # gzip/deflate: 1 (nhanh) - 9 (nhỏ nhất)
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))  # brotli: 0 - 11
     SECRET_KEY = os.getenv('SECRET_KEY')
     
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', os.getenv('SECRET_KEY'))
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # Role/trạng thái active trong token được đối chiếu lại với database sau mỗi khoảng này
+    # (giây, trong từng worker); < 0: chỉ dùng claim trong token
+    AUTH_RECHECK_SECONDS = int(os.getenv('AUTH_RECHECK_SECONDS', 60))
+
+    # Report jobs (xử lý nền bằng `flask reports worker`)
+    REPORT_DIR = os.getenv('REPORT_DIR')  # Mặc định: <instance_path>/reports
+    REPORT_RETENTION_HOURS = int(os.getenv('REPORT_RETENTION_HOURS', 24))  # Thời gian giữ file đã tạo
+    REPORT_REUSE_SECONDS = int(os.getenv('REPORT_REUSE_SECONDS', 300))  # Yêu cầu giống nhau trong khoảng này dùng lại kết quả
+    REPORT_JOB_TIMEOUT_SECONDS = int(os.getenv('REPORT_JOB_TIMEOUT_SECONDS', 3600))  # Job 'running' lâu hơn bị coi là lỗi
+    REPORT_WORKER_POLL_SECONDS = float(os.getenv('REPORT_WORKER_POLL_SECONDS', 2))
+
+    # Chế độ cao điểm: đơn đăng ký được xếp hàng, `flask registrations allocate` xử lý theo lô
+    REGISTRATION_RUSH_MODE = os.getenv('REGISTRATION_RUSH_MODE', 'false').lower() in ('1', 'true', 'yes')
+    REGISTRATION_QUEUE_BATCH_SIZE = int(os.getenv('REGISTRATION_QUEUE_BATCH_SIZE', 500))
+    REGISTRATION_ALLOCATOR_POLL_SECONDS = float(os.getenv('REGISTRATION_ALLOCATOR_POLL_SECONDS', 1))
+
+    # Đối soát sao kê: độ lệch ngày tối đa giữa giao dịch ngân hàng và thanh toán
+    RECONCILIATION_DATE_WINDOW_DAYS = int(os.getenv('RECONCILIATION_DATE_WINDOW_DAYS', 10))
+
+    # Băm mật khẩu: thuật toán/chi phí theo định dạng werkzeug ('scrypt:32768:8:1', 'pbkdf2:sha256:600000').
+    # Đổi giá trị này thì hash cũ được băm lại khi user đăng nhập thành công.
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    # Băm trong process pool thay vì trên thread xử lý request
+    PASSWORD_HASH_OFFLOAD = os.getenv('PASSWORD_HASH_OFFLOAD', 'true').lower() in ('1', 'true', 'yes')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0)) or None  # Mặc định: số CPU
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 0)) or None  # Mặc định: 8 * số tiến trình
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', 10))
 
 class DevelopmentConfig(BaseConfig):
     DEBUG = True
 
 class ProductionConfig(BaseConfig):
     DEBUG = False
+
+class TestingConfig(BaseConfig):
+    TESTING = True
+    PASSWORD_HASH_OFFLOAD = False
+    # Database riêng cho test (mặc định file SQLite trong thư mục tạm)
+    SQLALCHEMY_DATABASE_URI = os.getenv(
+        'TEST_DATABASE_URI', 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'qlktx_test.db')
+    )
+    JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', os.getenv('SECRET_KEY', 'test-secret-key-for-qlktx-tests'))
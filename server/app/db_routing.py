@@ -0,0 +1,228 @@
+"""
+Định tuyến truy vấn đọc sang database replica (tùy chọn, bật bằng SQLALCHEMY_REPLICA_URI).
+
+Request GET/HEAD đọc từ replica; mọi thứ khác dùng primary:
+
+- request ghi (POST/PUT/DELETE...), CLI, worker;
+- câu lệnh ghi (INSERT/UPDATE/DELETE), flush của ORM, SELECT ... FOR UPDATE và
+  `db.session.connection()` không kèm câu lệnh, kể cả khi nằm trong request GET;
+- view được đánh dấu `@use_primary` (trạng thái do worker khác ghi và được client
+  hỏi liên tục, ví dụ report job, phiếu đăng ký);
+- đọc ngay sau khi ghi: response của request ghi thành công có header
+  `X-DB-Primary-Until` (timestamp); client gửi lại header này thì các request đọc
+  tới thời điểm đó vẫn đọc primary;
+- replica trễ quá REPLICA_MAX_LAG_SECONDS hoặc không kết nối được. Mỗi worker có một
+  thread ghi thời điểm hiện tại vào bảng `replica_heartbeat` trên primary sau mỗi
+  REPLICA_HEARTBEAT_SECONDS giây (không phụ thuộc có request ghi hay không). Độ trễ là
+  khoảng cách từ heartbeat mà replica đã nhận tới thời điểm hiện tại (lớn hơn độ trễ
+  thật tối đa một chu kỳ heartbeat). Kết quả kiểm tra được giữ
+  REPLICA_LAG_CHECK_SECONDS giây trong mỗi worker.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+REPLICA_BIND_KEY = "replica"
+PRIMARY_UNTIL_HEADER = "X-DB-Primary-Until"
+READ_METHODS = ("GET", "HEAD")
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+HEARTBEAT_ID = 1
+
+_lag_lock = threading.Lock()
+_lag_checked_at = 0.0
+_replica_usable = True
+
+
+def use_primary(f):
+    """Đánh dấu view luôn đọc từ primary"""
+    f.use_primary = True
+    return f
+
+
+def on_primary(f):
+    """Chạy hàm (service) trên primary kể cả khi được gọi trong request đọc"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not has_request_context():
+            return f(*args, **kwargs)
+        previous = g.get("db_read_replica", False)
+        g.db_read_replica = False
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g.db_read_replica = previous
+    return decorated_function
+
+
+def replica_configured(app=None):
+    app = app or current_app
+    return REPLICA_BIND_KEY in (app.config.get("SQLALCHEMY_BINDS") or {})
+
+
+def configure_replica(app):
+    """Thêm bind 'replica' từ SQLALCHEMY_REPLICA_URI (gọi trước `db.init_app`)"""
+    uri = app.config.get("SQLALCHEMY_REPLICA_URI")
+    if uri:
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        binds[REPLICA_BIND_KEY] = uri
+        app.config["SQLALCHEMY_BINDS"] = binds
+
+
+def write_heartbeat(engine):
+    """Ghi thời điểm hiện tại (UTC) vào `replica_heartbeat` trên primary"""
+    from app.models import ReplicaHeartbeat
+
+    table = ReplicaHeartbeat.__table__
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        updated = connection.execute(
+            table.update().where(table.c.heartbeat_id == HEARTBEAT_ID).values(beat_at=now)
+        ).rowcount
+        if not updated:
+            try:
+                with connection.begin_nested():
+                    connection.execute(table.insert().values(heartbeat_id=HEARTBEAT_ID, beat_at=now))
+            except IntegrityError:
+                pass  # Worker khác vừa tạo dòng heartbeat
+
+
+def _heartbeat_loop(app, db, interval):
+    while True:
+        try:
+            with app.app_context():
+                write_heartbeat(db.engine)
+        except Exception as e:
+            app.logger.warning("Không ghi được heartbeat replica: %s", e)
+        time.sleep(interval)
+
+
+def _start_heartbeat(app, db):
+    """Chạy thread heartbeat của tiến trình hiện tại (tạo lại sau khi fork)"""
+    interval = app.config.get("REPLICA_HEARTBEAT_SECONDS", 1)
+    if not interval or interval <= 0:
+        return
+    with _lag_lock:
+        if app.extensions.get("replica_heartbeat_pid") == os.getpid():
+            return
+        app.extensions["replica_heartbeat_pid"] = os.getpid()
+    threading.Thread(
+        target=_heartbeat_loop, args=(app, db, interval), name="replica-heartbeat", daemon=True
+    ).start()
+
+
+def replica_lag(db):
+    """Số giây replica trễ so với hiện tại (None nếu replica chưa có heartbeat)"""
+    from app.models import ReplicaHeartbeat
+
+    with db.engines[REPLICA_BIND_KEY].connect() as connection:
+        beat_at = connection.execute(
+            select(ReplicaHeartbeat.beat_at).where(ReplicaHeartbeat.heartbeat_id == HEARTBEAT_ID)
+        ).scalar()
+    if beat_at is None:
+        return None
+    return max(0.0, (datetime.utcnow() - beat_at).total_seconds())
+
+
+def replica_usable(db):
+    """
+    Replica kết nối được và không trễ quá REPLICA_MAX_LAG_SECONDS (có cache).
+    REPLICA_MAX_LAG_SECONDS < 0 tắt việc kiểm tra.
+    """
+    global _lag_checked_at, _replica_usable
+    config = current_app.config
+    max_lag = config.get("REPLICA_MAX_LAG_SECONDS")
+    now = time.monotonic()
+
+    with _lag_lock:
+        if now - _lag_checked_at < config.get("REPLICA_LAG_CHECK_SECONDS", 5):
+            return _replica_usable
+
+        try:
+            if max_lag is None or max_lag < 0:
+                _replica_usable = True
+            else:
+                lag = replica_lag(db)
+                _replica_usable = lag is not None and lag <= max_lag
+                if not _replica_usable:
+                    current_app.logger.warning("Replica trễ %s giây, đọc từ primary", lag)
+        except Exception as e:
+            _replica_usable = False
+            current_app.logger.warning("Không kiểm tra được replica, đọc từ primary: %s", e)
+        _lag_checked_at = now
+        return _replica_usable
+
+
+def reset_replica_state():
+    """Bỏ kết quả kiểm tra replica đã cache (test)"""
+    global _lag_checked_at, _replica_usable
+    with _lag_lock:
+        _lag_checked_at = 0.0
+        _replica_usable = True
+
+
+def _sticky_to_primary():
+    value = request.headers.get(PRIMARY_UNTIL_HEADER)
+    if not value:
+        return False
+    try:
+        return float(value) > time.time()
+    except ValueError:
+        return False
+
+
+def register_routing(app, db):
+    """Chọn database cho từng request (chỉ khi có replica)"""
+    if not replica_configured(app):
+        return
+
+    # Replica chỉ là engine đọc cùng schema, không có model riêng: bỏ metadata rỗng của
+    # bind này để create_all/drop_all (kể cả của app khác trong tiến trình) không đòi tới nó
+    db.metadatas.pop(REPLICA_BIND_KEY, None)
+
+    @app.before_request
+    def choose_database():
+        _start_heartbeat(app, db)
+        view = app.view_functions.get(request.endpoint)
+        g.db_read_replica = (
+            request.method in READ_METHODS
+            and view is not None
+            and not getattr(view, "use_primary", False)
+            and not _sticky_to_primary()
+            and replica_usable(db)
+        )
+
+    @app.after_request
+    def mark_primary_reads(response):
+        # Sau khi ghi, client đọc primary thêm một khoảng để thấy ngay dữ liệu vừa ghi
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            until = time.time() + app.config.get("REPLICA_STICKY_SECONDS", 5)
+            response.headers[PRIMARY_UNTIL_HEADER] = f"{until:.3f}"
+        return response
+
+
+class RoutingSession(Session):
+    """Session của Flask-SQLAlchemy, gửi câu SELECT sang replica khi request cho phép"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._read_from_replica(clause):
+            return self._db.engines[REPLICA_BIND_KEY]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _read_from_replica(self, clause):
+        if (
+            clause is None
+            or self._flushing
+            or not has_request_context()
+            or not g.get("db_read_replica", False)
+        ):
+            return False
+        if not getattr(clause, "is_select", False):
+            return False
+        return getattr(clause, "_for_update_arg", None) is None
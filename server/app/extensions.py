@@ -2,6 +2,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 
-db = SQLAlchemy()
+from app.db_routing import RoutingSession
+
+# RoutingSession gửi câu SELECT của request đọc sang replica khi có cấu hình replica
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
@@ -1,10 +1,15 @@
 from app.models.building import Building
 from app.models.contract import Contract
+from app.models.dashboard_counter import DashboardCounter
 from app.models.maintenance import MaintenanceRequest
 from app.models.payment import Payment
 from app.models.registration import Registration
+from app.models.registration_ticket import RegistrationTicket
+from app.models.replica_heartbeat import ReplicaHeartbeat
+from app.models.report_job import ReportJob
 from app.models.room import Room
 from app.models.room_type import RoomType
+from app.models.table_version import TableVersion
 from app.models.user import Role, User
 
 __all__ = [
@@ -14,7 +19,12 @@ __all__ = [
     "RoomType",
     "Room",
     "Registration",
+    "RegistrationTicket",
     "Contract",
     "Payment",
     "MaintenanceRequest",
+    "DashboardCounter",
+    "ReportJob",
+    "TableVersion",
+    "ReplicaHeartbeat",
 ]
@@ -16,15 +16,26 @@ class Building(db.Model):
     def __repr__(self):
         return f"<Building {self.building_name}>"
 
-    def to_dict(self):
-        """Convert building object to dictionary"""
+    def to_dict(self, room_counts=None):
+        """
+        Convert building object to dictionary
+
+        room_counts: dict total_rooms/available_rooms/occupied_rooms đã tính sẵn bằng SQL
+        (xem StatisticsService.with_room_counts); nếu không có sẽ đếm từ self.rooms
+        """
+        if room_counts is None:
+            room_counts = {
+                "total_rooms": self.room_count,
+                "available_rooms": self.available_rooms_count,
+                "occupied_rooms": self.occupied_rooms_count,
+            }
         return {
             "building_id": self.building_id,
             "building_name": self.building_name,
             "gender": self.gender,
-            "total_rooms": len(self.rooms),
-            "available_rooms": self.available_rooms_count,
-            "occupied_rooms": self.occupied_rooms_count,
+            "total_rooms": int(room_counts["total_rooms"]),
+            "available_rooms": int(room_counts["available_rooms"]),
+            "occupied_rooms": int(room_counts["occupied_rooms"]),
         }
 
     def to_dict_simple(self):
@@ -1,10 +1,16 @@
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 
 from app.extensions import db
+from sqlalchemy.ext.hybrid import hybrid_property
 
 
 class Contract(db.Model):
     __tablename__ = 'contracts'
+    __table_args__ = (
+        db.Index('ix_contracts_end_date', 'end_date'),
+        db.Index('ix_contracts_start_date_end_date', 'start_date', 'end_date'),
+        db.Index('ix_contracts_created_at', 'created_at'),
+    )
 
     contract_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     registration_id = db.Column(db.Integer, db.ForeignKey('registrations.registration_id'), nullable=False, unique=True)
@@ -20,34 +26,70 @@ class Contract(db.Model):
     def __repr__(self):
         return f'<Contract {self.contract_code} - {self.start_date} to {self.end_date}>'
 
-    @property
+    @hybrid_property
     def is_active(self):
         """Kiểm tra hợp đồng có đang hiệu lực không"""
         today = date.today()
         return self.start_date <= today <= self.end_date
 
-    @property
+    @is_active.expression
+    def is_active(cls):
+        today = date.today()
+        return db.and_(cls.start_date <= today, cls.end_date >= today)
+
+    @hybrid_property
     def is_expired(self):
         """Kiểm tra hợp đồng đã hết hạn chưa"""
         return date.today() > self.end_date
 
-    @property
+    @is_expired.expression
+    def is_expired(cls):
+        return cls.end_date < date.today()
+
+    @hybrid_property
     def days_remaining(self):
         """Số ngày còn lại của hợp đồng"""
         if self.is_expired:
             return 0
         return (self.end_date - date.today()).days
 
+    @days_remaining.expression
+    def days_remaining(cls):
+        from app.utils.sql_functions import days_between
+
+        today = date.today()
+        return db.case(
+            (cls.end_date < today, 0),
+            else_=days_between(today, cls.end_date),
+        )
+
+    @classmethod
+    def expiring_within(cls, days):
+        """Điều kiện SQL: hợp đồng còn hiệu lực và hết hạn trong `days` ngày tới"""
+        today = date.today()
+        return db.and_(cls.end_date >= today, cls.end_date <= today + timedelta(days=days))
+
     @property
     def duration_months(self):
         """Thời hạn hợp đồng tính theo tháng"""
         return (self.end_date.year - self.start_date.year) * 12 + (self.end_date.month - self.start_date.month)
 
-    @property
+    @hybrid_property
     def total_paid(self):
         """Tổng số tiền đã thanh toán"""
         return sum(payment.amount for payment in self.payments if payment.status == 'confirmed')
 
+    @total_paid.expression
+    def total_paid(cls):
+        from app.models.payment import Payment
+
+        return (
+            db.select(db.func.coalesce(db.func.sum(Payment.amount), 0))
+            .where(Payment.contract_id == cls.contract_id, Payment.status == 'confirmed')
+            .correlate_except(Payment)
+            .scalar_subquery()
+        )
+
     @property
     def pending_payments(self):
         """Danh sách các khoản thanh toán đang chờ xác nhận"""
@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from app.extensions import db
+
+
+class DashboardCounter(db.Model):
+    __tablename__ = 'dashboard_counters'
+
+    counter_key = db.Column(db.String(100), primary_key=True)  # vd: 'registrations.pending', 'payments.confirmed.amount'
+    value = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DashboardCounter {self.counter_key}={self.value}>'
@@ -4,6 +4,11 @@ from datetime import datetime
 
 class MaintenanceRequest(db.Model):
     __tablename__ = 'maintenance_requests'
+    __table_args__ = (
+        db.Index('ix_maintenance_requests_status_request_date', 'status', 'request_date'),
+        db.Index('ix_maintenance_requests_assigned_to_user_id_request_date', 'assigned_to_user_id', 'request_date'),
+        db.Index('ix_maintenance_requests_request_date', 'request_date'),
+    )
     
     request_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     student_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
@@ -5,6 +5,13 @@ from app.extensions import db
 
 class Payment(db.Model):
     __tablename__ = 'payments'
+    __table_args__ = (
+        db.Index('ix_payments_contract_id_status', 'contract_id', 'status'),
+        db.Index('ix_payments_status_payment_date', 'status', 'payment_date'),
+        db.Index('ix_payments_payment_date', 'payment_date'),
+        # Mỗi hợp đồng chỉ có một khoản tiền phòng cho mỗi kỳ thu
+        db.UniqueConstraint('contract_id', 'billing_period', name='uq_payments_contract_id_billing_period'),
+    )
 
     payment_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     contract_id = db.Column(db.Integer, db.ForeignKey('contracts.contract_id'), nullable=False)
@@ -14,6 +21,7 @@ class Payment(db.Model):
     status = db.Column(db.String(50), default='pending')  # 'pending', 'confirmed', 'failed'
     proof_image_url = db.Column(db.String(255))  # URL ảnh chụp màn hình giao dịch
     confirmed_by_user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
+    billing_period = db.Column(db.String(7))  # Kỳ thu 'YYYY-MM' (NULL: thanh toán không theo kỳ)
 
     # Relationships
     contract = db.relationship('Contract', back_populates='payments')
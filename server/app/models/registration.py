@@ -5,6 +5,11 @@ from app.extensions import db
 
 class Registration(db.Model):
     __tablename__ = 'registrations'
+    __table_args__ = (
+        db.Index('ix_registrations_student_id_status', 'student_id', 'status'),
+        db.Index('ix_registrations_status_registration_date', 'status', 'registration_date'),
+        db.Index('ix_registrations_registration_date', 'registration_date'),
+    )
     
     registration_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     student_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
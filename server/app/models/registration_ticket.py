@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from app.extensions import db
+
+
+class RegistrationTicket(db.Model):
+    """Phiếu đăng ký phòng trong hàng đợi (chế độ cao điểm)"""
+    __tablename__ = 'registration_tickets'
+    __table_args__ = (
+        db.Index('ix_registration_tickets_status_ticket_id', 'status', 'ticket_id'),
+        db.Index('ix_registration_tickets_student_id_status', 'student_id', 'status'),
+    )
+
+    ticket_id = db.Column(db.Integer, primary_key=True, autoincrement=True)  # Thứ tự đến
+    student_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    room_id = db.Column(db.Integer, nullable=False)  # Chưa kiểm tra khi xếp hàng
+    status = db.Column(db.String(50), nullable=False, default='queued')  # 'queued', 'accepted', 'rejected'
+    message = db.Column(db.String(255))  # Lý do từ chối
+    registration_id = db.Column(db.Integer, db.ForeignKey('registrations.registration_id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+
+    student = db.relationship('User')
+    registration = db.relationship('Registration')
+
+    def __repr__(self):
+        return f'<RegistrationTicket {self.ticket_id} - Student: {self.student_id}, Status: {self.status}>'
+
+    @property
+    def is_queued(self):
+        """Phiếu còn đang chờ xử lý"""
+        return self.status == 'queued'
+
+    def to_dict(self):
+        """Convert ticket object to dictionary"""
+        return {
+            "ticket_id": self.ticket_id,
+            "student_id": self.student_id,
+            "room_id": self.room_id,
+            "status": self.status,
+            "message": self.message,
+            "registration_id": self.registration_id,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "processed_at": self.processed_at.isoformat() if self.processed_at else None,
+        }
@@ -0,0 +1,11 @@
+from app.extensions import db
+
+
+class ReplicaHeartbeat(db.Model):
+    __tablename__ = 'replica_heartbeat'
+
+    heartbeat_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # Luôn một dòng (1)
+    beat_at = db.Column(db.DateTime, nullable=False)  # UTC, ghi định kỳ trên primary
+
+    def __repr__(self):
+        return f'<ReplicaHeartbeat {self.beat_at}>'
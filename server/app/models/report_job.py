@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from app.extensions import db
+
+
+class ReportJob(db.Model):
+    __tablename__ = 'report_jobs'
+    __table_args__ = (
+        db.Index('ix_report_jobs_status_created_at', 'status', 'created_at'),
+        db.Index('ix_report_jobs_report_type_params_hash', 'report_type', 'params_hash'),
+    )
+
+    job_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    report_type = db.Column(db.String(50), nullable=False)  # 'contracts_excel'
+    params = db.Column(db.Text)  # JSON tham số của báo cáo
+    params_hash = db.Column(db.String(64), nullable=False)  # sha256(report_type + params), dùng để tái sử dụng kết quả
+    status = db.Column(db.String(50), nullable=False, default='pending')  # 'pending', 'running', 'completed', 'failed'
+    progress = db.Column(db.Integer, default=0)  # Số dòng đã xử lý
+    total = db.Column(db.Integer)  # Tổng số dòng cần xử lý (nếu biết trước)
+    file_path = db.Column(db.String(255))
+    file_name = db.Column(db.String(255))  # Tên file khi tải về
+    error_message = db.Column(db.Text)
+    requested_by_user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    requested_by = db.relationship('User')
+
+    def __repr__(self):
+        return f'<ReportJob {self.job_id} {self.report_type} - {self.status}>'
+
+    @property
+    def is_finished(self):
+        """Job đã kết thúc (thành công hoặc lỗi)"""
+        return self.status in ('completed', 'failed')
+
+    @property
+    def progress_percent(self):
+        """Phần trăm hoàn thành (None nếu chưa biết tổng)"""
+        if self.status == 'completed':
+            return 100
+        if not self.total:
+            return None
+        return min(99, int((self.progress or 0) * 100 / self.total))
+
+    def to_dict(self):
+        """Convert report job object to dictionary"""
+        return {
+            "job_id": self.job_id,
+            "report_type": self.report_type,
+            "status": self.status,
+            "progress": self.progress or 0,
+            "total": self.total,
+            "progress_percent": self.progress_percent,
+            "file_name": self.file_name,
+            "error_message": self.error_message,
+            "requested_by_user_id": self.requested_by_user_id,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -3,6 +3,10 @@ from app.extensions import db
 
 class Room(db.Model):
     __tablename__ = 'rooms'
+    __table_args__ = (
+        db.Index('ix_rooms_building_id_status', 'building_id', 'status'),
+        db.Index('ix_rooms_status', 'status'),
+    )
 
     room_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     room_number = db.Column(db.String(10), nullable=False)
@@ -17,16 +17,27 @@ class RoomType(db.Model):
     def __repr__(self):
         return f"<RoomType {self.type_name} - {self.capacity} người>"
 
-    def to_dict(self):
-        """Convert room type object to dictionary"""
+    def to_dict(self, room_counts=None):
+        """
+        Convert room type object to dictionary
+
+        room_counts: dict total_rooms/available_rooms/occupied_rooms đã tính sẵn bằng SQL
+        (xem StatisticsService.with_room_counts); nếu không có sẽ đếm từ self.rooms
+        """
+        if room_counts is None:
+            room_counts = {
+                "total_rooms": self.room_count,
+                "available_rooms": self.available_rooms_count,
+                "occupied_rooms": self.occupied_rooms_count,
+            }
         return {
             "room_type_id": self.room_type_id,
             "type_name": self.type_name,
             "capacity": self.capacity,
             "price": float(self.price),
-            "total_rooms": len(self.rooms),
-            "available_rooms": self.available_rooms_count,
-            "occupied_rooms": self.occupied_rooms_count,
+            "total_rooms": int(room_counts["total_rooms"]),
+            "available_rooms": int(room_counts["available_rooms"]),
+            "occupied_rooms": int(room_counts["occupied_rooms"]),
         }
 
     def to_dict_simple(self):
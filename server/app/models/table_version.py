@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from app.extensions import db
+
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_versions'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)  # Tăng mỗi lần bảng bị ghi, dùng để tính ETag
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<TableVersion {self.table_name}={self.version}>'
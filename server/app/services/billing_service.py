@@ -0,0 +1,143 @@
+"""
+Tạo khoản tiền phòng hàng tháng cho toàn bộ hợp đồng đang hiệu lực.
+
+Mỗi kỳ thu ('YYYY-MM') được tạo bằng một câu INSERT ... SELECT duy nhất: số tiền
+(giá loại phòng, tính theo tỷ lệ số ngày hợp đồng có hiệu lực trong tháng) được
+database tính cho cả tập hợp đồng, không nạp từng hợp đồng lên Python. Ràng buộc
+unique (contract_id, billing_period) cùng điều kiện NOT EXISTS giúp chạy lại cùng
+một kỳ không tạo trùng khoản thu.
+"""
+import calendar
+import re
+from datetime import date, datetime
+from decimal import Decimal
+
+from app.extensions import db
+from app.models import Contract, Payment, Registration, Room, RoomType
+from app.services.counter_service import CounterService
+from app.utils.sql_functions import days_between
+from sqlalchemy.exc import IntegrityError
+
+PERIOD_PATTERN = re.compile(r"^(\d{4})-(0[1-9]|1[0-2])$")
+
+
+def billing_period_of(day):
+    """Kỳ thu 'YYYY-MM' chứa ngày `day`"""
+    return day.strftime("%Y-%m")
+
+
+def parse_period(period):
+    """
+    'YYYY-MM' -> (ngày đầu tháng, ngày cuối tháng)
+
+    Raises:
+        ValueError: Sai định dạng kỳ thu
+    """
+    match = PERIOD_PATTERN.match(period) if isinstance(period, str) else None
+    if not match:
+        raise ValueError("Kỳ thu phải có dạng YYYY-MM")
+    year, month = int(match.group(1)), int(match.group(2))
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+class BillingService:
+
+    @staticmethod
+    def billing_query(period):
+        """
+        SELECT các khoản thu còn thiếu của kỳ: (contract_id, amount)
+
+        Số tiền = giá phòng * số ngày hiệu lực trong tháng / số ngày của tháng,
+        làm tròn 2 chữ số; đủ cả tháng thì lấy nguyên giá phòng.
+        """
+        month_start, month_end = parse_period(period)
+        days_in_month = (month_end - month_start).days + 1
+
+        billed_from = db.case(
+            (Contract.start_date > month_start, Contract.start_date), else_=month_start
+        )
+        billed_to = db.case((Contract.end_date < month_end, Contract.end_date), else_=month_end)
+        billed_days = days_between(billed_from, billed_to) + 1
+        amount = db.case(
+            (billed_days >= days_in_month, RoomType.price),
+            else_=db.func.round(RoomType.price * billed_days / days_in_month, 2),
+        )
+
+        already_billed = (
+            db.select(Payment.payment_id)
+            .where(Payment.contract_id == Contract.contract_id, Payment.billing_period == period)
+            .exists()
+        )
+
+        return (
+            db.select(Contract.contract_id, amount.label("amount"))
+            .join(Registration, Contract.registration_id == Registration.registration_id)
+            .join(Room, Registration.room_id == Room.room_id)
+            .join(RoomType, Room.room_type_id == RoomType.room_type_id)
+            .where(
+                Contract.start_date <= month_end,
+                Contract.end_date >= month_start,
+                ~already_billed,
+            )
+        )
+
+    @staticmethod
+    def run(period=None, dry_run=False):
+        """
+        Tạo các khoản thu (pending) của kỳ cho mọi hợp đồng có hiệu lực trong tháng.
+
+        Args:
+            period (str): Kỳ thu 'YYYY-MM' (mặc định: tháng hiện tại)
+            dry_run (bool): Chỉ tính, không ghi database
+
+        Returns:
+            dict: {"period", "payments", "amount", "dry_run"}
+        """
+        period = period or billing_period_of(date.today())
+
+        for attempt in range(2):
+            query = BillingService.billing_query(period).subquery()
+            count, total = db.session.execute(
+                db.select(db.func.count(), db.func.coalesce(db.func.sum(query.c.amount), 0))
+            ).one()
+            total = Decimal(str(total)).quantize(Decimal("0.01"))
+
+            if dry_run or not count:
+                db.session.rollback()
+                break
+
+            try:
+                db.session.execute(
+                    Payment.__table__.insert().from_select(
+                        ["contract_id", "amount", "payment_date", "payment_method", "status", "billing_period"],
+                        db.select(
+                            query.c.contract_id,
+                            query.c.amount,
+                            db.literal(datetime.utcnow(), db.DateTime),
+                            db.literal("bank_transfer"),
+                            db.literal("pending"),
+                            db.literal(period),
+                        ),
+                    )
+                )
+                CounterService.apply_deltas(
+                    {
+                        "payments.total": count,
+                        "payments.pending.count": count,
+                        "payments.pending.amount": total,
+                    }
+                )
+                db.session.commit()
+                break
+            except IntegrityError:
+                # Một lần chạy khác cùng kỳ vừa commit trước: tính lại phần còn thiếu
+                db.session.rollback()
+                if attempt:
+                    raise
+
+        return {
+            "period": period,
+            "payments": count,
+            "amount": float(total),
+            "dry_run": dry_run,
+        }
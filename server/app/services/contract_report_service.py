@@ -1,9 +1,12 @@
-import io
-from datetime import date, datetime
+import os
+import tempfile
+from datetime import date
 
 from app.extensions import db
-from app.models import Contract, Payment
-from flask import make_response
+from app.models import Contract, Payment, Registration, Room
+from app.services.statistics_service import StatisticsService
+from flask import Response
+from sqlalchemy.orm import contains_eager
 
 # Note: xlsxwriter needs to be installed: pip install xlsxwriter
 try:
@@ -16,12 +19,33 @@ except ImportError:
 
 class ContractReportService:
 
+    # Số hợp đồng đọc mỗi lô từ database
+    BATCH_SIZE = 1000
+
+    XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
     @staticmethod
-    def generate_contracts_excel_report():
-        """Generate Excel report of all contracts"""
+    def report_filename():
+        return f'hop_dong_{date.today().strftime("%Y%m%d")}.xlsx'
 
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {"in_memory": True})
+    @staticmethod
+    def write_contracts_workbook(path, progress=None):
+        """
+        Ghi báo cáo hợp đồng ra file Excel tại `path`.
+
+        Dùng chế độ constant_memory của xlsxwriter (mỗi dòng được ghi ra file tạm
+        ngay khi xong) nên bộ nhớ không tăng theo số hợp đồng.
+
+        Args:
+            path (str): Đường dẫn file .xlsx đích
+            progress (callable): Hàm nhận số dòng đã ghi, gọi sau mỗi lô (optional)
+
+        Returns:
+            int: Số hợp đồng đã ghi
+        """
+        workbook = xlsxwriter.Workbook(
+            path, {"constant_memory": True, "tmpdir": os.path.dirname(path) or None}
+        )
 
         # Add formats
         header_format = workbook.add_format(
@@ -86,10 +110,23 @@ class ContractReportService:
         for col, header in enumerate(headers):
             contracts_sheet.write(0, col, header, header_format)
 
-        # Data
-        contracts = Contract.query.join(Contract.registration).all()
+        # Data: duyệt theo lô (yield_per), quan hệ many-to-one được join sẵn,
+        # total_paid tính bằng subquery nên không cần nạp payments
+        contracts = (
+            db.session.query(Contract, Contract.total_paid)
+            .join(Contract.registration)
+            .options(
+                contains_eager(Contract.registration).joinedload(Registration.student),
+                contains_eager(Contract.registration)
+                .joinedload(Registration.room)
+                .joinedload(Room.building),
+            )
+            .order_by(Contract.contract_id)
+            .yield_per(ContractReportService.BATCH_SIZE)
+        )
 
-        for row, contract in enumerate(contracts, start=1):
+        row = 0
+        for row, (contract, total_paid) in enumerate(contracts, start=1):
             student = contract.registration.student
             room = contract.registration.room
 
@@ -114,7 +151,7 @@ class ContractReportService:
             contracts_sheet.write(row, 7, contract.start_date, date_format)
             contracts_sheet.write(row, 8, contract.end_date, date_format)
             contracts_sheet.write(row, 9, status, cell_format)
-            contracts_sheet.write(row, 10, float(contract.total_paid), number_format)
+            contracts_sheet.write(row, 10, float(total_paid or 0), number_format)
             contracts_sheet.write(
                 row,
                 11,
@@ -122,6 +159,9 @@ class ContractReportService:
                 number_format,
             )
 
+            if progress and row % ContractReportService.BATCH_SIZE == 0:
+                progress(row)
+
         # Statistics Sheet
         stats_sheet = workbook.add_worksheet("Thống kê")
         stats_sheet.set_column("A:A", 25)
@@ -130,18 +170,12 @@ class ContractReportService:
         stats_sheet.write(0, 0, "Thống kê hợp đồng", header_format)
         stats_sheet.write(0, 1, "Số lượng", header_format)
 
-        total_contracts = Contract.query.count()
-        active_contracts = Contract.query.filter(
-            Contract.start_date <= date.today(), Contract.end_date >= date.today()
-        ).count()
-        expired_contracts = Contract.query.filter(
-            Contract.end_date < date.today()
-        ).count()
+        contract_stats = StatisticsService.contract_stats()
 
         stats_data = [
-            ("Tổng số hợp đồng", total_contracts),
-            ("Hợp đồng đang hiệu lực", active_contracts),
-            ("Hợp đồng đã hết hạn", expired_contracts),
+            ("Tổng số hợp đồng", contract_stats["total"]),
+            ("Hợp đồng đang hiệu lực", contract_stats["active"]),
+            ("Hợp đồng đã hết hạn", contract_stats["expired"]),
             (
                 "Tổng doanh thu (VND)",
                 float(
@@ -153,23 +187,45 @@ class ContractReportService:
             ),
         ]
 
-        for row, (label, value) in enumerate(stats_data, start=1):
-            stats_sheet.write(row, 0, label, cell_format)
-            if "doanh thu" in label.lower():
-                stats_sheet.write(row, 1, value, number_format)
-            else:
-                stats_sheet.write(row, 1, value, number_format)
+        for stats_row, (label, value) in enumerate(stats_data, start=1):
+            stats_sheet.write(stats_row, 0, label, cell_format)
+            stats_sheet.write(stats_row, 1, value, number_format)
 
         workbook.close()
+        return row
 
-        output.seek(0)
-
-        response = make_response(output.read())
-        response.headers["Content-Type"] = (
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    @staticmethod
+    def generate_contracts_excel_report():
+        """Generate Excel report of all contracts (ghi ra file tạm rồi gửi về client theo từng khối)"""
+        fd, path = tempfile.mkstemp(prefix="hop_dong_", suffix=".xlsx")
+        os.close(fd)
+
+        try:
+            ContractReportService.write_contracts_workbook(path)
+            size = os.path.getsize(path)
+        except Exception:
+            os.remove(path)
+            raise
+
+        response = Response(
+            _stream_file_and_remove(path),
+            mimetype=ContractReportService.XLSX_MIMETYPE,
         )
+        response.headers["Content-Length"] = str(size)
         response.headers["Content-Disposition"] = (
-            f'attachment; filename=hop_dong_{date.today().strftime("%Y%m%d")}.xlsx'
+            f"attachment; filename={ContractReportService.report_filename()}"
         )
-
         return response
+
+
+def _stream_file_and_remove(path, chunk_size=64 * 1024):
+    """Đọc file theo từng khối; file được xóa khi client nhận xong hoặc ngắt kết nối"""
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
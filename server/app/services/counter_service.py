@@ -0,0 +1,311 @@
+"""
+Bộ đếm dashboard được cập nhật tăng dần (incremental).
+
+Mỗi lần session flush, listener `after_flush` tính chênh lệch (trước/sau) của các
+bản ghi Room, Registration, Contract, Payment, MaintenanceRequest, User và cộng
+dồn vào bảng `dashboard_counters` trong cùng transaction với thao tác ghi.
+Các thao tác ghi dạng Core (bulk insert/update) không đi qua flush nên phải gọi
+`CounterService.apply_deltas()` trực tiếp.
+
+Những chỉ số phụ thuộc ngày hiện tại (hợp đồng đang hiệu lực/sắp hết hạn,
+thanh toán quá hạn...) không thể duy trì tăng dần và vẫn được tính bằng truy vấn.
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from app.db_routing import on_primary
+from app.extensions import db
+from app.models import (
+    Contract,
+    DashboardCounter,
+    MaintenanceRequest,
+    Payment,
+    Registration,
+    Role,
+    Room,
+    User,
+)
+from app.services.statistics_service import StatisticsService
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import IntegrityError
+
+REGISTRATION_STATUSES = ("pending", "approved", "rejected")
+PAYMENT_STATUSES = ("pending", "confirmed", "failed")
+MAINTENANCE_STATUSES = ("pending", "assigned", "in_progress", "completed", "cancelled")
+
+# Các key bắt buộc phải có; thiếu key nào thì coi như bảng counter chưa được khởi tạo
+REQUIRED_KEYS = (
+    ["rooms.total", "rooms.available", "rooms.maintenance", "rooms.occupied", "contracts.total"]
+    + [f"registrations.{s}" for s in REGISTRATION_STATUSES]
+    + ["payments.total"]
+    + [f"payments.{s}.count" for s in PAYMENT_STATUSES]
+    + [f"payments.{s}.amount" for s in PAYMENT_STATUSES]
+    + ["maintenance.total"]
+    + [f"maintenance.{s}" for s in MAINTENANCE_STATUSES]
+)
+
+
+def _room_counters(values, role_names):
+    return {
+        "rooms.total": 1,
+        "rooms.available": int(values["status"] == "available"),
+        "rooms.maintenance": int(values["status"] == "maintenance"),
+        "rooms.occupied": int((values["current_occupancy"] or 0) > 0),
+    }
+
+
+def _registration_counters(values, role_names):
+    return {f"registrations.{values['status']}": 1}
+
+
+def _contract_counters(values, role_names):
+    return {"contracts.total": 1}
+
+
+def _payment_counters(values, role_names):
+    return {
+        "payments.total": 1,
+        f"payments.{values['status']}.count": 1,
+        f"payments.{values['status']}.amount": Decimal(values["amount"] or 0),
+    }
+
+
+def _maintenance_counters(values, role_names):
+    return {"maintenance.total": 1, f"maintenance.{values['status']}": 1}
+
+
+def _user_counters(values, role_names):
+    return {f"users.role.{role_names.get(values['role_id'], values['role_id'])}": 1}
+
+
+# Model -> (các thuộc tính ảnh hưởng tới counter, hàm tính đóng góp của một bản ghi)
+TRACKED_MODELS = {
+    Room: (("status", "current_occupancy"), _room_counters),
+    Registration: (("status",), _registration_counters),
+    Contract: ((), _contract_counters),
+    Payment: (("status", "amount"), _payment_counters),
+    MaintenanceRequest: (("status",), _maintenance_counters),
+    User: (("role_id",), _user_counters),
+}
+
+
+def _column_default(model, attr):
+    default = model.__table__.c[attr].default
+    return default.arg if default is not None and default.is_scalar else None
+
+
+def _current_values(obj, attrs):
+    state = inspect(obj)
+    values = {}
+    for attr in attrs:
+        value = state.dict.get(attr)
+        if value is None:
+            value = _column_default(type(obj), attr)
+        values[attr] = value
+    return values
+
+
+def _previous_values(obj, attrs):
+    state = inspect(obj)
+    values = {}
+    for attr in attrs:
+        history = state.attrs[attr].history
+        if history.deleted:
+            values[attr] = history.deleted[0]
+        elif history.added:
+            # Thuộc tính được theo dõi với active_history nên giá trị cũ luôn được nạp
+            # trước khi gán: có giá trị mới mà không có giá trị cũ nghĩa là trước đó là NULL
+            values[attr] = None
+        else:
+            values[attr] = state.dict.get(attr)
+    return values
+
+
+def _has_changes(obj, attrs):
+    state = inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _collect_deltas(session):
+    """Tính chênh lệch counter cho những thay đổi sắp được flush"""
+    changes = []
+    for obj in session.new:
+        if type(obj) in TRACKED_MODELS:
+            changes.append((obj, None, "new"))
+    for obj in session.deleted:
+        if type(obj) in TRACKED_MODELS:
+            changes.append((obj, "old", None))
+    for obj in session.dirty:
+        if type(obj) in TRACKED_MODELS and _has_changes(obj, TRACKED_MODELS[type(obj)][0]):
+            changes.append((obj, "old", "new"))
+
+    if not changes:
+        return {}
+
+    role_names = {}
+    if any(type(obj) is User for obj, _, _ in changes):
+        role_names = dict(
+            session.connection().execute(
+                db.select(Role.__table__.c.role_id, Role.__table__.c.role_name)
+            ).all()
+        )
+
+    deltas = defaultdict(Decimal)
+    for obj, before, after in changes:
+        attrs, counters_for = TRACKED_MODELS[type(obj)]
+        if before:
+            for key, value in counters_for(_previous_values(obj, attrs), role_names).items():
+                deltas[key] -= Decimal(value)
+        if after:
+            for key, value in counters_for(_current_values(obj, attrs), role_names).items():
+                deltas[key] += Decimal(value)
+
+    return {key: value for key, value in deltas.items() if value}
+
+
+def _update_counter(connection, key, delta, now):
+    table = DashboardCounter.__table__
+    result = connection.execute(
+        table.update()
+        .where(table.c.counter_key == key)
+        .values(value=table.c.value + delta, updated_at=now)
+    )
+    return result.rowcount
+
+
+def _insert_counters(connection, keys, deltas, now):
+    """
+    Tạo dòng cho các key chưa có (role mới, trạng thái ngoài REQUIRED_KEYS...) với giá
+    trị 0 + chênh lệch hiện tại. Không tính lại từ bảng nguồn trong flush; nếu bảng
+    counter lệch với dữ liệu thì chạy `flask counters rebuild`.
+    """
+    table = DashboardCounter.__table__
+    for key in keys:
+        try:
+            with connection.begin_nested():
+                connection.execute(table.insert().values(counter_key=key, value=deltas[key], updated_at=now))
+        except IntegrityError:
+            # Transaction khác vừa tạo dòng này
+            _update_counter(connection, key, deltas[key], now)
+
+
+def _execute_deltas(connection, deltas):
+    now = datetime.utcnow()
+    missing = [key for key, delta in deltas.items() if not _update_counter(connection, key, delta, now)]
+    if missing:
+        _insert_counters(connection, missing, deltas, now)
+
+
+def _load_previous(target, value, oldvalue, initiator):
+    """Listener rỗng: chỉ để bật active_history cho thuộc tính được theo dõi"""
+
+
+def _after_flush(session, flush_context):
+    deltas = _collect_deltas(session)
+    if deltas:
+        _execute_deltas(session.connection(), deltas)
+
+
+class CounterService:
+
+    @staticmethod
+    def register_events():
+        """Gắn listener after_flush vào session của ứng dụng"""
+        if not event.contains(db.session, "after_flush", _after_flush):
+            event.listen(db.session, "after_flush", _after_flush)
+        # Nạp giá trị cũ khi gán thuộc tính chưa được nạp (expired/deferred), để bản ghi
+        # được trừ khỏi đúng nhóm cũ
+        for model, (attrs, _) in TRACKED_MODELS.items():
+            for attr in attrs:
+                attribute = getattr(model, attr)
+                if not event.contains(attribute, "set", _load_previous):
+                    event.listen(attribute, "set", _load_previous, active_history=True)
+
+    @staticmethod
+    def apply_deltas(deltas):
+        """Cộng dồn chênh lệch counter trong transaction hiện tại (dùng cho bulk/Core statements)"""
+        deltas = {key: Decimal(value) for key, value in deltas.items() if value}
+        if deltas:
+            _execute_deltas(db.session.connection(), deltas)
+
+    @staticmethod
+    def compute_counters():
+        """Tính lại toàn bộ counter từ các bảng nguồn"""
+        counters = {}
+
+        room_stats = StatisticsService.room_stats()
+        counters["rooms.total"] = room_stats["total"]
+        counters["rooms.available"] = room_stats["available"]
+        counters["rooms.maintenance"] = room_stats["maintenance"]
+        counters["rooms.occupied"] = room_stats["occupied"]
+
+        counters["contracts.total"] = db.session.query(db.func.count(Contract.contract_id)).scalar()
+
+        for role_name, count in StatisticsService.users_by_role().items():
+            counters[f"users.role.{role_name}"] = count
+
+        registrations = StatisticsService.registrations_by_status()
+        for status in set(REGISTRATION_STATUSES) | set(registrations):
+            counters[f"registrations.{status}"] = registrations.get(status, 0)
+
+        payments = StatisticsService.payments_by_status()
+        counters["payments.total"] = sum(p["count"] for p in payments.values())
+        for status in set(PAYMENT_STATUSES) | set(payments):
+            payment = payments.get(status, {"count": 0, "amount": 0})
+            counters[f"payments.{status}.count"] = payment["count"]
+            counters[f"payments.{status}.amount"] = payment["amount"] or 0
+
+        maintenance = StatisticsService.maintenance_by_status()
+        counters["maintenance.total"] = sum(maintenance.values())
+        for status in set(MAINTENANCE_STATUSES) | set(maintenance):
+            counters[f"maintenance.{status}"] = maintenance.get(status, 0)
+
+        return counters
+
+    @staticmethod
+    @on_primary
+    def rebuild():
+        """Ghi đè bảng dashboard_counters bằng giá trị tính lại từ bảng nguồn"""
+        counters = CounterService.compute_counters()
+        table = DashboardCounter.__table__
+        now = datetime.utcnow()
+
+        db.session.execute(table.delete())
+        db.session.execute(
+            table.insert(),
+            [
+                {"counter_key": key, "value": value or 0, "updated_at": now}
+                for key, value in counters.items()
+            ],
+        )
+        db.session.commit()
+        return counters
+
+    @staticmethod
+    def get_counters():
+        """
+        Đọc toàn bộ counter. Chỉ đọc: nếu bảng chưa được khởi tạo (database tạo bằng
+        schema.sql/`db.create_all()`) thì tính trực tiếp từ bảng nguồn mà không ghi;
+        khởi tạo bằng migration hoặc `flask counters rebuild`.
+        """
+        counters = dict(
+            db.session.query(DashboardCounter.counter_key, DashboardCounter.value).all()
+        )
+        if any(key not in counters for key in REQUIRED_KEYS):
+            current_app.logger.warning(
+                "dashboard_counters chưa được khởi tạo, hãy chạy: flask --app application counters rebuild"
+            )
+            counters = CounterService.compute_counters()
+        return Counters(counters)
+
+
+class Counters(dict):
+    """Dict counter với các hàm đọc tiện dụng"""
+
+    def count(self, key):
+        return int(self.get(key) or 0)
+
+    def amount(self, key):
+        return float(self.get(key) or 0)
@@ -0,0 +1,90 @@
+"""
+Xác nhận thanh toán hàng loạt.
+
+Một request xác nhận nhiều thanh toán chỉ tốn một truy vấn đọc (kiểm tra tồn tại và
+trạng thái) và một câu UPDATE theo tập, thay vì đọc/ghi từng thanh toán.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from app.extensions import db
+from app.models import Payment
+from app.services.counter_service import CounterService
+from app.utils.decorators import retry_on_deadlock
+from sqlalchemy.orm.exc import StaleDataError
+
+
+class PaymentService:
+
+    # Số thanh toán tối đa cho một lần xác nhận hàng loạt
+    MAX_BATCH_SIZE = 1000
+
+    @staticmethod
+    @retry_on_deadlock()
+    def confirm_batch(payment_ids, confirmed_by_user_id):
+        """
+        Xác nhận nhiều thanh toán bằng một câu UPDATE có điều kiện status = 'pending'.
+
+        Các thanh toán được đọc (và khóa) trong một truy vấn để biết id nào không
+        tồn tại hoặc không còn pending; những id đó được bỏ qua và trả về kèm lý do.
+
+        Args:
+            payment_ids (list[int]): Danh sách mã thanh toán
+            confirmed_by_user_id (int): Người xác nhận
+
+        Returns:
+            dict: {"confirmed": [payment_id...], "skipped": [{"payment_id", "reason"}...],
+            "confirmed_amount": float}
+        """
+        # Giữ thứ tự gửi lên, bỏ trùng
+        payment_ids = list(dict.fromkeys(payment_ids))
+
+        rows = {
+            row.payment_id: row
+            for row in db.session.query(Payment.payment_id, Payment.status, Payment.amount)
+            .filter(Payment.payment_id.in_(payment_ids))
+            .with_for_update()
+        }
+
+        confirmed = []
+        skipped = []
+        for payment_id in payment_ids:
+            row = rows.get(payment_id)
+            if row is None:
+                skipped.append({"payment_id": payment_id, "reason": "Thanh toán không tồn tại"})
+            elif row.status != "pending":
+                skipped.append(
+                    {
+                        "payment_id": payment_id,
+                        "status": row.status,
+                        "reason": "Chỉ có thể xác nhận thanh toán đang chờ xử lý",
+                    }
+                )
+            else:
+                confirmed.append(payment_id)
+
+        confirmed_amount = sum((Decimal(rows[i].amount) for i in confirmed), Decimal(0))
+        if confirmed:
+            payments = Payment.__table__
+            result = db.session.execute(
+                payments.update()
+                .where(payments.c.payment_id.in_(confirmed), payments.c.status == "pending")
+                .values(status="confirmed", confirmed_by_user_id=confirmed_by_user_id)
+            )
+            # Không có FOR UPDATE (SQLite) thì request khác có thể đã đổi trạng thái: chạy lại
+            if result.rowcount != len(confirmed):
+                raise StaleDataError("Thanh toán đã bị thay đổi bởi request khác")
+
+            deltas = defaultdict(Decimal)
+            deltas["payments.pending.count"] -= len(confirmed)
+            deltas["payments.confirmed.count"] += len(confirmed)
+            deltas["payments.pending.amount"] -= confirmed_amount
+            deltas["payments.confirmed.amount"] += confirmed_amount
+            CounterService.apply_deltas(deltas)
+
+        db.session.commit()
+        return {
+            "confirmed": confirmed,
+            "skipped": skipped,
+            "confirmed_amount": float(confirmed_amount),
+        }
@@ -0,0 +1,409 @@
+"""
+Đối soát sao kê ngân hàng với các thanh toán đang chờ xác nhận.
+
+Sao kê (CSV xuất từ ngân hàng) được đọc lần lượt từng dòng, không nạp cả file vào
+bộ nhớ. Các thanh toán pending được nạp một lần thành các chỉ mục băm:
+
+- (mã hợp đồng, số tiền) -> thanh toán, dùng khi nội dung chuyển khoản có mã hợp đồng;
+- số tiền -> thanh toán sắp theo ngày, dùng cho các trường hợp khớp gần đúng.
+
+Thứ tự khớp cho mỗi giao dịch:
+
+1. `exact`: mã hợp đồng trong nội dung + đúng số tiền + ngày trong cửa sổ cho phép.
+2. `fuzzy_date`: mã hợp đồng + đúng số tiền nhưng ngày ngoài cửa sổ.
+3. `fuzzy_code`: mã trong nội dung gần giống (gõ nhầm) mã của một thanh toán cùng số
+   tiền, trong cửa sổ ngày.
+4. `fuzzy_amount`: không có mã, nhưng chỉ có đúng một thanh toán cùng số tiền trong
+   cửa sổ ngày.
+
+Mỗi thanh toán chỉ được khớp với một giao dịch.
+"""
+import codecs
+import csv
+import difflib
+import itertools
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+from app.models import Contract, Payment
+from app.services.payment_service import PaymentService
+from flask import current_app
+
+MATCH_EXACT = "exact"
+MATCH_FUZZY_DATE = "fuzzy_date"
+MATCH_FUZZY_CODE = "fuzzy_code"
+MATCH_FUZZY_AMOUNT = "fuzzy_amount"
+
+# Tên cột chấp nhận được (đã bỏ dấu, chữ thường)
+COLUMN_ALIASES = {
+    "date": ("date", "transaction date", "posting date", "value date", "ngay", "ngay giao dich"),
+    "amount": ("amount", "credit", "credit amount", "so tien", "so tien ghi co", "ghi co"),
+    "memo": ("memo", "description", "details", "content", "noi dung", "dien giai", "mo ta"),
+    "reference": ("reference", "ref", "transaction id", "ma giao dich", "so tham chieu", "so ct"),
+}
+# Ngày dạng YYYY-MM-DD hoặc DD/MM/YYYY (phân cách '-', '/', '.'), phần giờ phía sau bị bỏ qua
+ISO_DATE_PATTERN = re.compile(r"(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})(?!\d)")
+DMY_DATE_PATTERN = re.compile(r"(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})(?!\d)")
+CONTRACT_CODE_PATTERN = re.compile(r"HD[\s\-_:.#]*(\d{1,9})", re.IGNORECASE)
+FUZZY_CODE_CUTOFF = 0.75
+
+
+class ReconciliationError(ValueError):
+    """File sao kê không đọc được (sai định dạng, thiếu cột)"""
+
+
+def _normalize_header(value):
+    value = unicodedata.normalize("NFKD", value.replace("đ", "d").replace("Đ", "D"))
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", value.lower()).split())
+
+
+def normalize_contract_code(code):
+    """'HD-0012', 'hd 12' -> 'HD12'; mã không theo mẫu HD<số> chỉ bỏ khoảng trắng/ký tự phân cách"""
+    match = CONTRACT_CODE_PATTERN.fullmatch(code.strip())
+    if match:
+        return f"HD{int(match.group(1))}"
+    return re.sub(r"[^A-Z0-9]", "", code.upper())
+
+
+def find_contract_codes(memo):
+    """Các mã hợp đồng (đã chuẩn hóa) xuất hiện trong nội dung chuyển khoản"""
+    return [f"HD{int(number)}" for number in CONTRACT_CODE_PATTERN.findall(memo)]
+
+
+def parse_amount(value):
+    """
+    Số tiền trong sao kê -> Decimal.
+
+    Chấp nhận '1,000,000', '1.000.000', '1000000.00', '1 000 000 VND'. Dấu phân cách
+    cuối cùng theo sau bởi đúng 3 chữ số được coi là phân cách hàng nghìn.
+
+    Raises:
+        ValueError: Không đọc được số tiền
+    """
+    text = re.sub(r"[^\d.,\-]", "", value or "")
+    if not re.search(r"\d", text):
+        raise ValueError(f"Số tiền không hợp lệ: {value!r}")
+
+    last_separator = max(text.rfind("."), text.rfind(","))
+    if last_separator >= 0 and len(text) - last_separator - 1 != 3:
+        integer, fraction = text[:last_separator], text[last_separator + 1:]
+    else:
+        integer, fraction = text, ""
+    integer = re.sub(r"[.,]", "", integer)
+    try:
+        return Decimal(f"{integer}.{fraction or '0'}").quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise ValueError(f"Số tiền không hợp lệ: {value!r}")
+
+
+def parse_date(value):
+    """
+    Ngày giao dịch trong sao kê -> date
+
+    Raises:
+        ValueError: Không đọc được ngày
+    """
+    value = (value or "").strip()
+    match = ISO_DATE_PATTERN.match(value)
+    if match:
+        year, month, day = match.groups()
+    else:
+        match = DMY_DATE_PATTERN.match(value)
+        if not match:
+            raise ValueError(f"Ngày không hợp lệ: {value!r}")
+        day, month, year = match.groups()
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        raise ValueError(f"Ngày không hợp lệ: {value!r}")
+
+
+def read_statement(stream, encoding="utf-8-sig"):
+    """
+    Đọc sao kê CSV từ một stream nhị phân, trả về iterator các dòng dict
+    {"line", "date", "amount", "memo", "reference"} (giá trị chưa parse).
+
+    Dấu phân cách (',', ';', tab) được nhận diện từ dòng tiêu đề.
+
+    Raises:
+        ReconciliationError: File rỗng hoặc thiếu cột bắt buộc (date, amount, memo)
+    """
+    lines = codecs.iterdecode(stream, encoding, errors="replace")
+    header_line = next(lines, None)
+    if header_line is None:
+        raise ReconciliationError("File sao kê rỗng")
+
+    try:
+        dialect = csv.Sniffer().sniff(header_line, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(itertools.chain([header_line], lines), dialect)
+    header = [_normalize_header(column) for column in next(reader)]
+
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for index, column in enumerate(header):
+            if column in aliases:
+                columns[field] = index
+                break
+    missing = [field for field in ("date", "amount", "memo") if field not in columns]
+    if missing:
+        raise ReconciliationError(f"Sao kê thiếu cột: {', '.join(missing)}")
+
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        yield {
+            "line": reader.line_num,
+            **{
+                field: row[index].strip() if index < len(row) else ""
+                for field, index in columns.items()
+            },
+        }
+
+
+class _PendingPaymentIndex:
+    """Chỉ mục băm các thanh toán pending để tra cứu O(1) theo mã hợp đồng + số tiền"""
+
+    def __init__(self, payments, window_days):
+        self.window = timedelta(days=window_days)
+        self.claimed = set()
+        self.by_code_amount = defaultdict(list)
+        by_amount = defaultdict(list)
+        for payment_id, contract_code, amount, payment_date in payments:
+            amount = Decimal(amount).quantize(Decimal("0.01"))
+            day = (payment_date or datetime.min).date()
+            entry = (day, payment_id, contract_code)
+            if contract_code:
+                self.by_code_amount[(normalize_contract_code(contract_code), amount)].append(entry)
+            by_amount[amount].append(entry)
+
+        # Sắp theo ngày để tìm các thanh toán trong cửa sổ bằng bisect
+        self.by_amount = {}
+        for amount, entries in by_amount.items():
+            entries.sort()
+            self.by_amount[amount] = (entries, [entry[0] for entry in entries])
+
+    def _closest(self, entries, day, within_window):
+        best = None
+        for entry in entries:
+            if entry[1] in self.claimed:
+                continue
+            distance = abs((entry[0] - day).days)
+            if within_window and distance > self.window.days:
+                continue
+            if best is None or distance < best[0]:
+                best = (distance, entry)
+        return best[1] if best else None
+
+    def _in_window(self, amount, day):
+        """Các thanh toán chưa khớp cùng số tiền, ngày trong cửa sổ"""
+        entries, days = self.by_amount.get(amount, ((), ()))
+        start = bisect_left(days, day - self.window)
+        for entry in entries[start:]:
+            if entry[0] > day + self.window:
+                break
+            if entry[1] not in self.claimed:
+                yield entry
+
+    def match(self, codes, amount, day):
+        """
+        Returns:
+            tuple: (payment_id, match, contract_code) hoặc (None, lý do, None)
+        """
+        for within_window, match in ((True, MATCH_EXACT), (False, MATCH_FUZZY_DATE)):
+            for code in codes:
+                entry = self._closest(self.by_code_amount.get((code, amount), ()), day, within_window)
+                if entry:
+                    return self._claim(entry, match)
+
+        candidates = list(self._in_window(amount, day))
+        if codes:
+            by_code = {}
+            for entry in candidates:
+                if entry[2]:
+                    by_code.setdefault(normalize_contract_code(entry[2]), entry)
+            for code in codes:
+                close = difflib.get_close_matches(code, by_code, n=1, cutoff=FUZZY_CODE_CUTOFF)
+                if close:
+                    return self._claim(by_code[close[0]], MATCH_FUZZY_CODE)
+            return None, "Không có thanh toán pending khớp mã hợp đồng và số tiền", None
+
+        if len(candidates) == 1:
+            return self._claim(candidates[0], MATCH_FUZZY_AMOUNT)
+        if candidates:
+            return None, "Nhiều thanh toán cùng số tiền, nội dung không có mã hợp đồng", None
+        return None, "Không có thanh toán pending cùng số tiền", None
+
+    def _claim(self, entry, match):
+        self.claimed.add(entry[1])
+        return entry[1], match, entry[2]
+
+
+class ReconciliationService:
+
+    # Số giao dịch không khớp tối đa liệt kê trong báo cáo (tổng số luôn được đếm đủ)
+    MAX_UNMATCHED_IN_REPORT = 1000
+
+    @staticmethod
+    def pending_payments():
+        """(payment_id, contract_code, amount, payment_date) của mọi thanh toán pending"""
+        return (
+            db.session.query(
+                Payment.payment_id, Contract.contract_code, Payment.amount, Payment.payment_date
+            )
+            .join(Contract, Payment.contract_id == Contract.contract_id)
+            .filter(Payment.status == "pending")
+            .yield_per(5000)
+        )
+
+    @staticmethod
+    def _confirm(payment_ids, confirmed_by_user_id):
+        """
+        Xác nhận theo từng lô (mỗi lô một transaction). Lô bị lỗi được rollback và ghi
+        vào "failed", các lô khác vẫn được xác nhận: kết quả luôn cho biết chính xác
+        những thanh toán nào đã được xác nhận.
+        """
+        confirmation = {"confirmed": 0, "confirmed_ids": [], "skipped": [], "failed": [], "complete": True}
+        for start in range(0, len(payment_ids), PaymentService.MAX_BATCH_SIZE):
+            batch = payment_ids[start:start + PaymentService.MAX_BATCH_SIZE]
+            try:
+                result = PaymentService.confirm_batch(batch, confirmed_by_user_id)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                current_app.logger.exception("Không xác nhận được lô %d thanh toán khi đối soát", len(batch))
+                confirmation["failed"].extend({"payment_id": payment_id, "reason": str(e)} for payment_id in batch)
+                confirmation["complete"] = False
+                continue
+            confirmation["confirmed"] += len(result["confirmed"])
+            confirmation["confirmed_ids"].extend(result["confirmed"])
+            confirmation["skipped"].extend(result["skipped"])
+        return confirmation
+
+    @staticmethod
+    def reconcile(stream, confirm=False, include_fuzzy=False, confirmed_by_user_id=None,
+                  window_days=None):
+        """
+        Đối soát sao kê với các thanh toán pending.
+
+        Args:
+            stream: Stream nhị phân của file CSV
+            confirm (bool): Xác nhận các thanh toán khớp `exact`
+            include_fuzzy (bool): Xác nhận cả các thanh toán khớp gần đúng
+            confirmed_by_user_id (int): Người xác nhận
+            window_days (int): Độ lệch ngày tối đa giữa giao dịch và thanh toán
+
+        Returns:
+            dict: {"summary", "matched", "unmatched", "confirmation"}
+
+        Raises:
+            ReconciliationError: File sao kê sai định dạng
+        """
+        if window_days is None:
+            window_days = current_app.config.get("RECONCILIATION_DATE_WINDOW_DAYS", 10)
+        index = _PendingPaymentIndex(ReconciliationService.pending_payments(), window_days)
+        # Chỉ đọc: không giữ transaction trong lúc đọc file
+        db.session.rollback()
+
+        matched = []
+        unmatched = []
+        unmatched_reasons = defaultdict(int)
+        seen_references = set()
+        summary = defaultdict(int)
+        matched_amount = Decimal(0)
+
+        def reject(row, reason):
+            unmatched_reasons[reason] += 1
+            if len(unmatched) < ReconciliationService.MAX_UNMATCHED_IN_REPORT:
+                unmatched.append(
+                    {
+                        "line": row["line"],
+                        "date": row.get("date"),
+                        "amount": row.get("amount"),
+                        "memo": row.get("memo"),
+                        "reference": row.get("reference"),
+                        "reason": reason,
+                    }
+                )
+
+        for row in read_statement(stream):
+            summary["lines"] += 1
+            try:
+                amount = parse_amount(row["amount"])
+                day = parse_date(row["date"])
+            except ValueError as e:
+                reject(row, str(e))
+                continue
+            if amount <= 0:
+                summary["debits"] += 1
+                continue
+
+            reference = row.get("reference")
+            if reference:
+                if reference in seen_references:
+                    reject(row, "Giao dịch trùng mã tham chiếu")
+                    continue
+                seen_references.add(reference)
+
+            payment_id, match, contract_code = index.match(
+                find_contract_codes(row["memo"]), amount, day
+            )
+            if payment_id is None:
+                reject(row, match)
+                continue
+
+            summary[match] += 1
+            matched_amount += amount
+            matched.append(
+                {
+                    "line": row["line"],
+                    "date": day.isoformat(),
+                    "amount": float(amount),
+                    "memo": row["memo"],
+                    "reference": reference,
+                    "payment_id": payment_id,
+                    "contract_code": contract_code,
+                    "match": match,
+                }
+            )
+
+        confirmation = None
+        if confirm:
+            payment_ids = [
+                item["payment_id"] for item in matched
+                if include_fuzzy or item["match"] == MATCH_EXACT
+            ]
+            confirmation = ReconciliationService._confirm(payment_ids, confirmed_by_user_id)
+            confirmed_ids = set(confirmation.pop("confirmed_ids"))
+            for item in matched:
+                item["confirmed"] = item["payment_id"] in confirmed_ids
+
+        return {
+            "summary": {
+                "lines": summary["lines"],
+                "debits": summary["debits"],
+                "matched": len(matched),
+                "matched_amount": float(matched_amount),
+                "matches": {
+                    match: summary[match]
+                    for match in (MATCH_EXACT, MATCH_FUZZY_DATE, MATCH_FUZZY_CODE, MATCH_FUZZY_AMOUNT)
+                },
+                "unmatched": sum(unmatched_reasons.values()),
+                "unmatched_reasons": dict(unmatched_reasons),
+                "pending_payments_unmatched": sum(
+                    len(entries) for entries, _ in index.by_amount.values()
+                ) - len(index.claimed),
+                "date_window_days": window_days,
+            },
+            "matched": matched,
+            "unmatched": unmatched,
+            "confirmation": confirmation,
+        }
@@ -0,0 +1,205 @@
+"""
+Hàng đợi đăng ký phòng cho giờ cao điểm (REGISTRATION_RUSH_MODE).
+
+Khi bật chế độ cao điểm, `POST /api/registrations` chỉ ghi một phiếu vào bảng
+`registration_tickets` và trả về ticket_id ngay, không đọc/khóa phòng hay sinh
+viên. Một tiến trình allocator duy nhất (`flask --app application registrations
+allocate`) lấy phiếu theo thứ tự đến, kiểm tra cùng các quy tắc như đăng ký
+thường (phòng còn chỗ, đúng giới tính, mỗi sinh viên một đơn pending/approved)
+và ghi đơn đăng ký theo lô. Vì chỉ có một writer, các quy tắc được kiểm tra
+trên dữ liệu đọc một lần cho cả lô mà không cần khóa dòng.
+"""
+import time
+from datetime import datetime
+
+from app.extensions import db
+from app.models import Registration, RegistrationTicket, Room, User
+from app.services.counter_service import CounterService
+from app.utils.decorators import retry_on_deadlock
+from flask import current_app
+from sqlalchemy.orm import joinedload
+
+
+class RegistrationQueueService:
+
+    @staticmethod
+    def rush_mode_enabled():
+        return bool(current_app.config.get("REGISTRATION_RUSH_MODE"))
+
+    @staticmethod
+    def enqueue(student_id, room_id):
+        """
+        Xếp hàng một yêu cầu đăng ký.
+
+        Sinh viên gửi lại khi phiếu trước vẫn đang chờ sẽ nhận lại phiếu cũ.
+
+        Returns:
+            RegistrationTicket
+        """
+        ticket = RegistrationTicket.query.filter_by(
+            student_id=student_id, status="queued"
+        ).first()
+        if ticket:
+            return ticket
+
+        ticket = RegistrationTicket(student_id=student_id, room_id=room_id, status="queued")
+        db.session.add(ticket)
+        db.session.commit()
+        return ticket
+
+    @staticmethod
+    def queue_position(ticket):
+        """Vị trí của phiếu trong hàng đợi (1 = lô tiếp theo), None nếu đã xử lý"""
+        if not ticket.is_queued:
+            return None
+        return (
+            db.session.query(db.func.count(RegistrationTicket.ticket_id))
+            .filter(
+                RegistrationTicket.status == "queued",
+                RegistrationTicket.ticket_id <= ticket.ticket_id,
+            )
+            .scalar()
+        )
+
+    @staticmethod
+    @retry_on_deadlock()
+    def allocate_batch(batch_size=None):
+        """
+        Xử lý một lô phiếu theo thứ tự đến.
+
+        Returns:
+            tuple: (số phiếu đã xử lý, số phiếu được chấp nhận)
+        """
+        batch_size = batch_size or current_app.config.get("REGISTRATION_QUEUE_BATCH_SIZE", 500)
+        tickets = (
+            RegistrationTicket.query.filter_by(status="queued")
+            .order_by(RegistrationTicket.ticket_id)
+            .limit(batch_size)
+            .all()
+        )
+        if not tickets:
+            db.session.commit()
+            return 0, 0
+
+        student_ids = {ticket.student_id for ticket in tickets}
+        rooms = {
+            room.room_id: room
+            for room in Room.query.options(joinedload(Room.room_type), joinedload(Room.building))
+            .filter(Room.room_id.in_({ticket.room_id for ticket in tickets}))
+            .all()
+        }
+        genders = dict(
+            db.session.query(User.user_id, User.gender).filter(User.user_id.in_(student_ids))
+        )
+        # Sinh viên đã có đơn pending/approved
+        has_registration = {
+            student_id
+            for (student_id,) in db.session.query(Registration.student_id).filter(
+                Registration.student_id.in_(student_ids),
+                Registration.status.in_(["pending", "approved"]),
+            )
+        }
+
+        now = datetime.utcnow()
+        outcomes = {}
+        accepted = []
+        for ticket in tickets:
+            room = rooms.get(ticket.room_id)
+            student_gender = genders.get(ticket.student_id)
+            if not room:
+                outcomes[ticket.ticket_id] = ("rejected", "Phòng không tồn tại")
+            elif not room.is_available:
+                outcomes[ticket.ticket_id] = ("rejected", "Phòng đã đầy hoặc không khả dụng")
+            elif room.building.gender != "all" and room.building.gender != student_gender:
+                outcomes[ticket.ticket_id] = (
+                    "rejected",
+                    f"Bạn chỉ được đăng ký phòng ở tòa nhà dành cho giới tính '{student_gender}'",
+                )
+            elif ticket.student_id in has_registration:
+                outcomes[ticket.ticket_id] = (
+                    "rejected",
+                    "Bạn đã có đơn đăng ký đang chờ xử lý hoặc đã được duyệt",
+                )
+            else:
+                has_registration.add(ticket.student_id)
+                outcomes[ticket.ticket_id] = ("accepted", None)
+                accepted.append(ticket)
+
+        registration_ids = {}
+        if accepted:
+            db.session.execute(
+                Registration.__table__.insert(),
+                [
+                    {
+                        "student_id": ticket.student_id,
+                        "room_id": ticket.room_id,
+                        "status": "pending",
+                        # Ngày đăng ký là lúc xếp hàng để giữ đúng thứ tự đến khi duyệt
+                        "registration_date": ticket.created_at,
+                    }
+                    for ticket in accepted
+                ],
+            )
+            registration_ids = dict(
+                db.session.query(Registration.student_id, Registration.registration_id).filter(
+                    Registration.student_id.in_([ticket.student_id for ticket in accepted]),
+                    Registration.status == "pending",
+                )
+            )
+            CounterService.apply_deltas({"registrations.pending": len(accepted)})
+
+        tickets_table = RegistrationTicket.__table__
+        db.session.execute(
+            tickets_table.update()
+            .where(tickets_table.c.ticket_id == db.bindparam("b_ticket_id"))
+            .values(
+                status=db.bindparam("b_status"),
+                message=db.bindparam("b_message"),
+                registration_id=db.bindparam("b_registration_id"),
+                processed_at=now,
+            ),
+            [
+                {
+                    "b_ticket_id": ticket.ticket_id,
+                    "b_status": outcomes[ticket.ticket_id][0],
+                    "b_message": outcomes[ticket.ticket_id][1],
+                    "b_registration_id": (
+                        registration_ids.get(ticket.student_id)
+                        if outcomes[ticket.ticket_id][0] == "accepted"
+                        else None
+                    ),
+                }
+                for ticket in tickets
+            ],
+        )
+        db.session.commit()
+        return len(tickets), len(accepted)
+
+    @staticmethod
+    def work(once=False, batch_size=None, poll_interval=None, log=None):
+        """
+        Vòng lặp allocator: xử lý hết hàng đợi theo lô, chờ khi hàng đợi rỗng.
+
+        Chỉ chạy MỘT tiến trình allocator cho mỗi database.
+
+        Args:
+            once (bool): Xử lý hết các phiếu đang chờ rồi dừng
+            batch_size (int): Số phiếu mỗi lô
+            poll_interval (float): Số giây chờ khi hàng đợi rỗng
+            log (callable): Hàm ghi log (optional)
+        """
+        log = log or (lambda message: None)
+        poll_interval = poll_interval or current_app.config.get(
+            "REGISTRATION_ALLOCATOR_POLL_SECONDS", 1
+        )
+
+        while True:
+            processed, accepted = RegistrationQueueService.allocate_batch(batch_size)
+            db.session.remove()
+            if processed:
+                log(f"Đã xử lý {processed} phiếu, chấp nhận {accepted}")
+                continue
+
+            if once:
+                return
+            time.sleep(poll_interval)
@@ -0,0 +1,413 @@
+"""
+Tạo và duyệt đơn đăng ký phòng.
+
+Chỗ trong phòng được giữ bằng một câu UPDATE có điều kiện
+(`current_occupancy + n <= capacity`), nên hai admin duyệt cùng lúc vào một phòng
+không thể làm phòng vượt sức chứa: câu lệnh thứ hai không cập nhật dòng nào.
+Quy tắc "mỗi sinh viên chỉ có một đơn pending/approved" được bảo vệ bằng khóa
+dòng của sinh viên (SELECT ... FOR UPDATE). Mỗi thao tác tự commit transaction
+của mình và được chạy lại khi gặp deadlock/lock timeout (`retry_on_deadlock`).
+
+Duyệt hàng loạt gom các đơn theo phòng: mỗi phòng chỉ đọc (và khóa) một lần, số
+chỗ trống được kiểm tra một lần cho cả nhóm, sau đó trạng thái đơn, số người
+trong phòng, hợp đồng và khoản thanh toán đầu tiên được ghi bằng các câu lệnh
+gộp (Core) trong cùng một transaction. Các câu lệnh Core không đi qua flush của
+ORM nên chênh lệch counter dashboard được cộng bằng `CounterService.apply_deltas()`.
+"""
+from collections import defaultdict
+from datetime import date, datetime
+
+from app.extensions import db
+from app.models import Contract, Payment, Registration, Room, RoomType, User
+from app.services.billing_service import billing_period_of
+from app.services.counter_service import CounterService
+from app.utils.decorators import retry_on_deadlock
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
+
+
+class RegistrationError(ValueError):
+    """Lỗi nghiệp vụ khi tạo/duyệt đơn, kèm HTTP status code tương ứng"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def contract_code_for(registration_id):
+    """Mã hợp đồng sinh từ mã đơn đăng ký"""
+    return f"HD{registration_id:04d}"
+
+
+def contract_period(start_date):
+    """Thời hạn hợp đồng mặc định: 1 năm kể từ ngày bắt đầu"""
+    try:
+        end_date = start_date.replace(year=start_date.year + 1)
+    except ValueError:
+        # 29/02 -> 28/02 năm sau
+        end_date = start_date.replace(year=start_date.year + 1, day=28)
+    return start_date, end_date
+
+
+def _room_capacity():
+    """Sức chứa của phòng (subquery tương quan với bảng rooms)"""
+    rooms = Room.__table__
+    room_types = RoomType.__table__
+    return (
+        db.select(room_types.c.capacity)
+        .where(room_types.c.room_type_id == rooms.c.room_type_id)
+        .scalar_subquery()
+    )
+
+
+class RegistrationService:
+
+    # Số đơn tối đa cho một lần duyệt hàng loạt
+    MAX_BATCH_SIZE = 5000
+
+    @staticmethod
+    def reserve_seats(room_id, count=1):
+        """
+        Giữ `count` chỗ trong phòng bằng một câu UPDATE có điều kiện.
+
+        Phòng phải đang 'available' và còn đủ chỗ; phòng chuyển sang 'occupied'
+        khi đầy. Chạy trong transaction hiện tại (không commit).
+
+        Returns:
+            bool: False nếu phòng không còn đủ chỗ
+        """
+        rooms = Room.__table__
+        capacity = _room_capacity()
+        occupancy = db.func.coalesce(rooms.c.current_occupancy, 0)
+
+        result = db.session.execute(
+            rooms.update()
+            .where(
+                rooms.c.room_id == room_id,
+                rooms.c.status == "available",
+                occupancy + count <= capacity,
+            )
+            # status đứng trước: MySQL gán lần lượt từ trái sang phải nên biểu thức
+            # CASE phải được tính với current_occupancy cũ
+            .ordered_values(
+                (
+                    rooms.c.status,
+                    db.case((occupancy + count >= capacity, "occupied"), else_=rooms.c.status),
+                ),
+                (rooms.c.current_occupancy, occupancy + count),
+            )
+        )
+        if result.rowcount != 1:
+            return False
+
+        # Dòng đang bị khóa bởi transaction này nên đọc lại là giá trị vừa ghi
+        new_occupancy, new_status = db.session.execute(
+            db.select(rooms.c.current_occupancy, rooms.c.status).where(rooms.c.room_id == room_id)
+        ).one()
+        CounterService.apply_deltas(
+            {
+                "rooms.occupied": int(new_occupancy == count),
+                "rooms.available": -int(new_status != "available"),
+            }
+        )
+        return True
+
+    @staticmethod
+    @retry_on_deadlock()
+    def register(student_id, room_id):
+        """
+        Tạo đơn đăng ký pending cho sinh viên.
+
+        Raises:
+            RegistrationError: Phòng không tồn tại/không khả dụng, sai giới tính
+                hoặc sinh viên đã có đơn pending/approved
+        """
+        room = db.session.get(Room, room_id)
+        if not room:
+            raise RegistrationError("Phòng không tồn tại", 404)
+
+        # Kiểm tra phòng còn chỗ trống
+        if not room.is_available:
+            raise RegistrationError("Phòng đã đầy hoặc không khả dụng")
+
+        # Khóa dòng sinh viên: các request đồng thời của cùng sinh viên phải chờ
+        # nhau, nên lần kiểm tra đơn trùng bên dưới không bị "lọt"
+        student = (
+            User.query.filter_by(user_id=student_id).with_for_update().populate_existing().one()
+        )
+
+        # Kiểm tra giới tính của sinh viên và tòa nhà
+        building_gender = room.building.gender
+        if building_gender != "all" and building_gender != student.gender:
+            raise RegistrationError(
+                f"Bạn chỉ được đăng ký phòng ở tòa nhà dành cho giới tính '{student.gender}'"
+            )
+
+        # Kiểm tra sinh viên đã có đơn đăng ký pending/approved chưa
+        existing_registration = (
+            Registration.query.filter_by(student_id=student_id)
+            .filter(Registration.status.in_(["pending", "approved"]))
+            .first()
+        )
+        if existing_registration:
+            raise RegistrationError("Bạn đã có đơn đăng ký đang chờ xử lý hoặc đã được duyệt")
+
+        registration = Registration(
+            student_id=student_id,
+            room_id=room_id,
+            status="pending",
+            registration_date=datetime.utcnow(),
+        )
+        db.session.add(registration)
+        db.session.commit()
+        return registration
+
+    @staticmethod
+    @retry_on_deadlock()
+    def approve(registration_id):
+        """
+        Duyệt một đơn: giữ chỗ trong phòng, tạo hợp đồng và khoản thanh toán đầu tiên.
+
+        Returns:
+            Contract: Hợp đồng vừa tạo
+
+        Raises:
+            RegistrationError: Đơn không tồn tại, không còn pending hoặc phòng đã đầy
+        """
+        registration = db.session.get(Registration, registration_id)
+        if not registration:
+            raise RegistrationError("Đơn đăng ký không tồn tại", 404)
+
+        # Chuyển trạng thái có điều kiện: chỉ một trong các request đồng thời thành công
+        registrations = Registration.__table__
+        result = db.session.execute(
+            registrations.update()
+            .where(
+                registrations.c.registration_id == registration_id,
+                registrations.c.status == "pending",
+            )
+            .values(status="approved")
+        )
+        if result.rowcount != 1:
+            db.session.rollback()
+            raise RegistrationError("Chỉ có thể duyệt đơn đang chờ xử lý")
+
+        if not RegistrationService.reserve_seats(registration.room_id):
+            db.session.rollback()
+            raise RegistrationError("Phòng đã đầy, không thể duyệt đơn")
+
+        CounterService.apply_deltas({"registrations.pending": -1, "registrations.approved": 1})
+
+        # Tạo hợp đồng tự động
+        start_date, end_date = contract_period(date.today())  # 1 năm
+        contract = Contract(
+            registration_id=registration_id,
+            contract_code=contract_code_for(registration_id),
+            start_date=start_date,
+            end_date=end_date,
+        )
+        db.session.add(contract)
+        db.session.flush()  # To get the contract ID
+
+        # Tạo khoản thanh toán đầu tiên (pending) cho tháng đầu
+        db.session.add(
+            Payment(
+                contract_id=contract.contract_id,
+                amount=registration.room.room_type.price,
+                payment_method="bank_transfer",  # Mặc định
+                status="pending",  # Chờ sinh viên thanh toán
+                billing_period=billing_period_of(start_date),  # Tiền tháng đầu tiên
+            )
+        )
+        db.session.commit()
+        return contract
+
+    @staticmethod
+    @retry_on_deadlock()
+    def approve_batch(registration_ids):
+        """
+        Duyệt nhiều đơn đăng ký trong một transaction (xem `approve_registrations`).
+        """
+        result = RegistrationService.approve_registrations(registration_ids)
+        db.session.commit()
+        return result
+
+    @staticmethod
+    def approve_registrations(registration_ids):
+        """
+        Duyệt nhiều đơn đăng ký trong transaction hiện tại (không commit).
+
+        Trong mỗi phòng, đơn được duyệt theo thứ tự ngày đăng ký cho tới khi hết
+        chỗ; các đơn còn lại trả về lỗi "Phòng đã đầy".
+
+        Args:
+            registration_ids (list[int]): Danh sách mã đơn đăng ký
+
+        Returns:
+            dict: {"results": [...], "approved": int, "failed": int}; mỗi phần tử
+            results có registration_id, success, message và contract_code nếu thành công
+        """
+        # Giữ thứ tự gửi lên, bỏ trùng
+        registration_ids = list(dict.fromkeys(registration_ids))
+        results = {
+            registration_id: {
+                "registration_id": registration_id,
+                "success": False,
+                "message": "Đơn đăng ký không tồn tại",
+            }
+            for registration_id in registration_ids
+        }
+
+        registrations = (
+            Registration.query.filter(Registration.registration_id.in_(registration_ids))
+            .order_by(Registration.registration_date, Registration.registration_id)
+            .all()
+        )
+
+        by_room = defaultdict(list)
+        for registration in registrations:
+            if registration.status != "pending":
+                results[registration.registration_id]["message"] = (
+                    "Chỉ có thể duyệt đơn đang chờ xử lý"
+                )
+                continue
+            by_room[registration.room_id].append(registration)
+
+        # Khóa các phòng liên quan trong một truy vấn (MySQL: SELECT ... FOR UPDATE)
+        rooms = {
+            room.room_id: room
+            for room in Room.query.options(joinedload(Room.room_type))
+            .filter(Room.room_id.in_(list(by_room)))
+            .with_for_update(of=Room)
+            .all()
+        }
+
+        start_date, end_date = contract_period(date.today())
+        now = datetime.utcnow()
+        approved = []
+        room_updates = []
+        deltas = defaultdict(int)
+
+        for room_id, room_registrations in by_room.items():
+            room = rooms[room_id]
+            capacity = room.room_type.capacity
+            free = capacity - (room.current_occupancy or 0) if room.status == "available" else 0
+            accepted = room_registrations[: max(free, 0)]
+
+            for registration in room_registrations[len(accepted):]:
+                results[registration.registration_id]["message"] = (
+                    "Phòng đã đầy, không thể duyệt đơn"
+                )
+            if not accepted:
+                continue
+
+            new_occupancy = (room.current_occupancy or 0) + len(accepted)
+            new_status = "occupied" if new_occupancy >= capacity else room.status
+            room_updates.append(
+                {
+                    "b_room_id": room_id,
+                    "b_expected": room.current_occupancy or 0,
+                    "b_occupancy": new_occupancy,
+                    "b_status": new_status,
+                }
+            )
+            if new_status != room.status:
+                deltas["rooms.available"] -= 1
+            if not room.current_occupancy:
+                deltas["rooms.occupied"] += 1
+
+            for registration in accepted:
+                approved.append((registration, room.room_type.price))
+
+        if approved:
+            approved_ids = [registration.registration_id for registration, _ in approved]
+            registrations_table = Registration.__table__
+            rooms_table = Room.__table__
+
+            result = db.session.execute(
+                registrations_table.update()
+                .where(
+                    registrations_table.c.registration_id.in_(approved_ids),
+                    registrations_table.c.status == "pending",
+                )
+                .values(status="approved")
+            )
+            if result.rowcount != len(approved_ids):
+                raise StaleDataError("Đơn đăng ký đã bị thay đổi bởi request khác")
+
+            # Chỉ ghi khi số người trong phòng vẫn như lúc đọc: nếu database không hỗ
+            # trợ FOR UPDATE (SQLite), thay đổi đồng thời làm transaction chạy lại
+            result = db.session.execute(
+                rooms_table.update()
+                .where(
+                    rooms_table.c.room_id == db.bindparam("b_room_id"),
+                    rooms_table.c.status == "available",
+                    db.func.coalesce(rooms_table.c.current_occupancy, 0)
+                    == db.bindparam("b_expected"),
+                )
+                .values(
+                    current_occupancy=db.bindparam("b_occupancy"),
+                    status=db.bindparam("b_status"),
+                ),
+                room_updates,
+            )
+            if (
+                db.engine.dialect.supports_sane_multi_rowcount
+                and result.rowcount != len(room_updates)
+            ):
+                raise StaleDataError("Số người trong phòng đã bị thay đổi bởi request khác")
+            db.session.execute(
+                Contract.__table__.insert(),
+                [
+                    {
+                        "registration_id": registration_id,
+                        "contract_code": contract_code_for(registration_id),
+                        "start_date": start_date,
+                        "end_date": end_date,
+                        "created_at": now,
+                    }
+                    for registration_id in approved_ids
+                ],
+            )
+            contract_ids = dict(
+                db.session.query(Contract.registration_id, Contract.contract_id).filter(
+                    Contract.registration_id.in_(approved_ids)
+                )
+            )
+            # Tạo khoản thanh toán đầu tiên (pending) cho tháng đầu
+            db.session.execute(
+                Payment.__table__.insert(),
+                [
+                    {
+                        "contract_id": contract_ids[registration.registration_id],
+                        "amount": price,
+                        "payment_date": now,
+                        "payment_method": "bank_transfer",
+                        "status": "pending",
+                        "billing_period": billing_period_of(start_date),
+                    }
+                    for registration, price in approved
+                ],
+            )
+
+            count = len(approved)
+            deltas["registrations.pending"] -= count
+            deltas["registrations.approved"] += count
+            deltas["contracts.total"] += count
+            deltas["payments.total"] += count
+            deltas["payments.pending.count"] += count
+            deltas["payments.pending.amount"] += sum(price for _, price in approved)
+            CounterService.apply_deltas(deltas)
+
+            for registration_id in approved_ids:
+                results[registration_id].update(
+                    success=True,
+                    message="Duyệt đơn đăng ký thành công",
+                    contract_code=contract_code_for(registration_id),
+                )
+
+        return {
+            "results": list(results.values()),
+            "approved": len(approved),
+            "failed": len(registration_ids) - len(approved),
+        }
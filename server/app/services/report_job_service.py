@@ -0,0 +1,244 @@
+"""
+Hàng đợi report job chạy nền.
+
+Request chỉ tạo một bản ghi `report_jobs` (status = 'pending') rồi trả về job_id;
+worker (`flask --app application reports worker`) lấy job theo thứ tự tạo, đánh
+dấu 'running' bằng một câu UPDATE có điều kiện (nhiều worker chạy song song không
+nhận trùng job), ghi file vào REPORT_DIR và cập nhật tiến độ để client polling.
+
+Các yêu cầu giống nhau (cùng loại báo cáo và tham số) trong REPORT_REUSE_SECONDS
+dùng lại job đang chạy hoặc file đã tạo. File cũ hơn REPORT_RETENTION_HOURS bị xóa
+khi worker dọn dẹp.
+"""
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Contract, ReportJob
+from app.services.contract_report_service import ContractReportService
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+
+# Loại báo cáo -> cách đếm số dòng, ghi file và đặt tên file tải về
+REPORT_TYPES = {
+    "contracts_excel": {
+        "count": lambda params: db.session.query(db.func.count(Contract.contract_id)).scalar(),
+        "write": lambda path, params, progress: ContractReportService.write_contracts_workbook(path, progress),
+        "file_name": lambda params: ContractReportService.report_filename(),
+        "mimetype": ContractReportService.XLSX_MIMETYPE,
+    },
+}
+
+
+def _params_hash(report_type, params):
+    payload = json.dumps([report_type, params], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _update_progress(job_id, progress):
+    """Ghi tiến độ bằng connection riêng để không commit transaction đang đọc dữ liệu báo cáo"""
+    # SQLite khóa cả file khi commit: cursor yield_per đang mở của báo cáo sẽ chặn
+    # lệnh ghi này tới hết busy timeout, nên với SQLite chỉ cập nhật khi job kết thúc
+    if db.engine.dialect.name == "sqlite":
+        return
+
+    table = ReportJob.__table__
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(
+                table.update().where(table.c.job_id == job_id).values(progress=progress)
+            )
+    except OperationalError:
+        # Tiến độ chỉ mang tính tham khảo, không làm hỏng job
+        pass
+
+
+class ReportJobService:
+
+    @staticmethod
+    def report_dir():
+        """Thư mục lưu file báo cáo"""
+        path = current_app.config.get("REPORT_DIR") or os.path.join(
+            current_app.instance_path, "reports"
+        )
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def mimetype(job):
+        return REPORT_TYPES[job.report_type]["mimetype"]
+
+    @staticmethod
+    def request_job(report_type, params=None, user_id=None):
+        """
+        Tạo job mới hoặc dùng lại job giống hệt gần đây.
+
+        Returns:
+            tuple: (ReportJob, reused: bool)
+        """
+        if report_type not in REPORT_TYPES:
+            raise ValueError(f"Loại báo cáo không hợp lệ: {report_type}")
+
+        params = params or {}
+        params_hash = _params_hash(report_type, params)
+        reuse_after = datetime.utcnow() - timedelta(
+            seconds=current_app.config.get("REPORT_REUSE_SECONDS", 300)
+        )
+
+        candidates = (
+            ReportJob.query.filter(
+                ReportJob.report_type == report_type,
+                ReportJob.params_hash == params_hash,
+                ReportJob.created_at >= reuse_after,
+                ReportJob.status.in_(["pending", "running", "completed"]),
+            )
+            .order_by(ReportJob.created_at.desc())
+            .all()
+        )
+        for job in candidates:
+            if job.status != "completed" or (job.file_path and os.path.exists(job.file_path)):
+                return job, True
+
+        job = ReportJob(
+            report_type=report_type,
+            params=json.dumps(params, sort_keys=True),
+            params_hash=params_hash,
+            status="pending",
+            requested_by_user_id=user_id,
+        )
+        db.session.add(job)
+        db.session.commit()
+        return job, False
+
+    @staticmethod
+    def claim_next():
+        """Nhận job pending cũ nhất; trả về None nếu không còn job"""
+        table = ReportJob.__table__
+        while True:
+            job_id = (
+                db.session.query(ReportJob.job_id)
+                .filter(ReportJob.status == "pending")
+                .order_by(ReportJob.created_at, ReportJob.job_id)
+                .limit(1)
+                .scalar()
+            )
+            if job_id is None:
+                db.session.commit()
+                return None
+
+            result = db.session.execute(
+                table.update()
+                .where(table.c.job_id == job_id, table.c.status == "pending")
+                .values(status="running", started_at=datetime.utcnow(), progress=0)
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                return db.session.get(ReportJob, job_id)
+            # Worker khác đã nhận job này, thử job tiếp theo
+
+    @staticmethod
+    def run_job(job):
+        """Tạo file báo cáo cho job đã được nhận"""
+        definition = REPORT_TYPES[job.report_type]
+        params = json.loads(job.params or "{}")
+        file_name = definition["file_name"](params)
+        path = os.path.join(ReportJobService.report_dir(), f"{job.job_id}_{file_name}")
+        partial_path = path + ".part"
+        job_id = job.job_id
+
+        try:
+            job.total = definition["count"](params)
+            db.session.commit()
+
+            rows = definition["write"](
+                partial_path, params, lambda done: _update_progress(job_id, done)
+            )
+            os.replace(partial_path, path)
+
+            job = db.session.get(ReportJob, job_id)
+            job.status = "completed"
+            job.progress = rows
+            job.file_path = path
+            job.file_name = file_name
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            job = db.session.get(ReportJob, job_id)
+            job.status = "failed"
+            job.error_message = str(e)
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        return job
+
+    @staticmethod
+    def cleanup():
+        """
+        Xóa job và file đã quá hạn lưu trữ; đánh dấu lỗi các job 'running' quá lâu
+        (worker bị dừng giữa chừng).
+
+        Returns:
+            int: Số job đã xóa
+        """
+        now = datetime.utcnow()
+        retention = timedelta(hours=current_app.config.get("REPORT_RETENTION_HOURS", 24))
+        timeout = timedelta(seconds=current_app.config.get("REPORT_JOB_TIMEOUT_SECONDS", 3600))
+
+        stale_jobs = ReportJob.query.filter(
+            ReportJob.status == "running", ReportJob.started_at < now - timeout
+        ).all()
+        for job in stale_jobs:
+            job.status = "failed"
+            job.error_message = "Worker dừng trước khi hoàn thành"
+            job.finished_at = now
+
+        expired_jobs = ReportJob.query.filter(
+            ReportJob.status.in_(["completed", "failed"]),
+            ReportJob.finished_at < now - retention,
+        ).all()
+        for job in expired_jobs:
+            if job.file_path and os.path.exists(job.file_path):
+                os.remove(job.file_path)
+            db.session.delete(job)
+
+        db.session.commit()
+        return len(expired_jobs)
+
+    @staticmethod
+    def work(once=False, poll_interval=None, cleanup_interval=300, log=None):
+        """
+        Vòng lặp worker: nhận và chạy job, định kỳ dọn dẹp.
+
+        Args:
+            once (bool): Chạy hết các job đang chờ rồi dừng
+            poll_interval (float): Số giây chờ khi hàng đợi rỗng
+            cleanup_interval (float): Số giây giữa hai lần dọn dẹp
+            log (callable): Hàm ghi log (optional)
+        """
+        log = log or (lambda message: None)
+        poll_interval = poll_interval or current_app.config.get("REPORT_WORKER_POLL_SECONDS", 2)
+        last_cleanup = None
+
+        while True:
+            if last_cleanup is None or time.monotonic() - last_cleanup >= cleanup_interval:
+                removed = ReportJobService.cleanup()
+                if removed:
+                    log(f"Đã xóa {removed} report job hết hạn")
+                last_cleanup = time.monotonic()
+
+            job = ReportJobService.claim_next()
+            if job:
+                log(f"Bắt đầu job {job.job_id} ({job.report_type})")
+                job = ReportJobService.run_job(job)
+                log(f"Job {job.job_id}: {job.status}")
+                db.session.remove()
+                continue
+
+            if once:
+                return
+            time.sleep(poll_interval)
@@ -0,0 +1,465 @@
+"""
+Xếp phòng hàng loạt cho các đơn đăng ký đang chờ duyệt.
+
+Bài toán được giải bằng min-cost max-flow trên một mạng nhỏ:
+
+    nguồn -> (giới tính, phòng đã chọn) -> phòng đã chọn --------------> nhóm phòng -> đích
+    nguồn -> (giới tính, phòng đã chọn) -> (giới tính, tòa nhà, loại) -> nhóm phòng -> đích
+
+- Cạnh "phòng đã chọn" có chi phí 0 và sức chứa bằng số chỗ trống của phòng đó.
+- Cạnh tới nhóm phòng (tòa nhà, loại phòng) có chi phí ưu tiên cùng loại phòng, cùng
+  tòa nhà và giá gần với giá đã chọn. Sinh viên chỉ được xếp vào tòa nhà đúng giới
+  tính và phòng có giá không cao hơn phòng đã chọn.
+- Sức chứa nhóm phòng -> đích là tổng chỗ trống của nhóm, nên chỗ trong phòng đã chọn
+  và chỗ xếp theo nhóm dùng chung một giới hạn.
+
+Luồng lớn nhất = số đơn được xếp nhiều nhất; trong số đó chi phí nhỏ nhất ưu tiên
+đúng phòng đã chọn, rồi tới phòng gần với lựa chọn nhất. Luồng được khởi tạo bằng cách xếp mỗi đơn vào phòng đã chọn nếu
+còn chỗ (chi phí 0 nên vẫn là luồng chi phí nhỏ nhất); bộ giải chỉ dời các đơn này
+sang phòng khác khi việc đó giúp xếp thêm được đơn. Số nút tỉ lệ với số phòng và số
+nhóm, không phụ thuộc số đơn.
+
+Cuối cùng luồng được chia cho từng sinh viên (theo thứ tự đăng ký) và từng phòng
+theo kiểu "lấp đầy": phòng đã có người trước (nhiều người nhất trước), phòng trống
+sau, mỗi phòng được lấp đầy trước khi mở phòng tiếp theo.
+"""
+import heapq
+from collections import defaultdict, deque
+
+from app.extensions import db
+from app.models import Building, Registration, Room, RoomType, User
+from app.services.registration_service import RegistrationService
+from app.utils.decorators import retry_on_deadlock
+
+# Chi phí khi xếp khác loại phòng/khác tòa nhà so với phòng đã chọn
+COST_OTHER_TYPE = 4
+COST_OTHER_BUILDING = 2
+# Giữ phòng ở tòa nhà dùng chung ('all') cho sinh viên không còn lựa chọn khác
+COST_SHARED_BUILDING = 1
+
+MATCH_REQUESTED = "requested_room"
+MATCH_SAME_BUILDING = "same_building"
+MATCH_SAME_TYPE = "same_type"
+MATCH_CHEAPER_TYPE = "cheaper_type"
+MATCH_OTHER_TYPE = "other_type"  # Loại phòng khác, cùng giá
+
+
+class _MinCostFlow:
+    """
+    Min-cost max-flow (primal-dual): mỗi vòng Dijkstra với potential tìm độ dài đường
+    đi ngắn nhất, sau đó đẩy luồng cực đại (kiểu Dinic) trên các cạnh có chi phí rút
+    gọn bằng 0. Chi phí trên mạng xếp phòng là số nguyên nhỏ nên chỉ cần vài vòng.
+    """
+
+    def __init__(self, node_count):
+        self.graph = [[] for _ in range(node_count)]
+
+    def add_edge(self, u, v, capacity, cost):
+        """Thêm cạnh u -> v; trả về (u, index) để đọc luồng sau khi giải"""
+        self.graph[u].append([v, capacity, cost, len(self.graph[v])])
+        self.graph[v].append([u, 0, -cost, len(self.graph[u]) - 1])
+        return u, len(self.graph[u]) - 1
+
+    def push(self, edges, amount):
+        """Đẩy sẵn `amount` đơn vị luồng theo đường đi `edges` (khởi tạo luồng)"""
+        for u, index in edges:
+            edge = self.graph[u][index]
+            edge[1] -= amount
+            self.graph[edge[0]][edge[3]][1] += amount
+
+    def flow(self, u, index):
+        v, capacity, cost, rev = self.graph[u][index]
+        return self.graph[v][rev][1]
+
+    def _distances(self, source, potential):
+        """Dijkstra trên chi phí rút gọn (không âm nhờ potential)"""
+        distance = [None] * len(self.graph)
+        distance[source] = 0
+        heap = [(0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > distance[u]:
+                continue
+            for v, capacity, cost, _ in self.graph[u]:
+                if capacity <= 0:
+                    continue
+                nd = d + cost + potential[u] - potential[v]
+                if distance[v] is None or nd < distance[v]:
+                    distance[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return distance
+
+    def _levels(self, source, sink, potential):
+        """BFS trên các cạnh còn sức chứa, chi phí rút gọn 0; None nếu không tới được đích"""
+        level = [None] * len(self.graph)
+        level[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for v, capacity, cost, _ in self.graph[u]:
+                if capacity > 0 and level[v] is None and cost + potential[u] - potential[v] == 0:
+                    level[v] = level[u] + 1
+                    queue.append(v)
+        return level if level[sink] is not None else None
+
+    def _augment(self, source, sink, level, current, potential):
+        """Tìm một đường tăng trong đồ thị phân tầng (DFS không đệ quy) và đẩy luồng"""
+        path = []
+        u = source
+        while True:
+            if u == sink:
+                push = min(self.graph[node][index][1] for node, index in path)
+                cost = 0
+                for node, index in path:
+                    edge = self.graph[node][index]
+                    edge[1] -= push
+                    self.graph[edge[0]][edge[3]][1] += push
+                    cost += edge[2]
+                return push, push * cost
+
+            edges = self.graph[u]
+            while current[u] < len(edges):
+                v, capacity, cost, _ = edges[current[u]]
+                if (
+                    capacity > 0
+                    and level[v] == level[u] + 1
+                    and cost + potential[u] - potential[v] == 0
+                ):
+                    break
+                current[u] += 1
+            if current[u] < len(edges):
+                path.append((u, current[u]))
+                u = edges[current[u]][0]
+                continue
+
+            # Ngõ cụt: bỏ nút khỏi đồ thị phân tầng rồi lùi lại
+            level[u] = None
+            if not path:
+                return 0, 0
+            u, index = path.pop()
+            current[u] += 1
+
+    def solve(self, source, sink):
+        node_count = len(self.graph)
+        potential = [0] * node_count  # Chi phí ban đầu (và của luồng khởi tạo) không âm
+        total_flow = total_cost = 0
+
+        while True:
+            distance = self._distances(source, potential)
+            if distance[sink] is None:
+                return total_flow, total_cost
+            for node in range(node_count):
+                if distance[node] is not None:
+                    potential[node] += distance[node]
+
+            while True:
+                level = self._levels(source, sink, potential)
+                if level is None:
+                    break
+                current = [0] * node_count
+                while True:
+                    push, cost = self._augment(source, sink, level, current, potential)
+                    if not push:
+                        break
+                    total_flow += push
+                    total_cost += cost
+
+
+def _gender_allowed(building_gender, student_gender):
+    return building_gender == "all" or building_gender == student_gender
+
+
+class RoomAllocationService:
+
+    @staticmethod
+    def plan(registration_ids=None, lock=False):
+        """
+        Tính phương án xếp phòng cho các đơn pending (không ghi database).
+
+        Args:
+            registration_ids (list[int]): Chỉ xét các đơn này (mặc định: tất cả đơn pending)
+            lock (bool): Khóa các phòng còn chỗ (SELECT ... FOR UPDATE) để áp dụng phương án
+
+        Returns:
+            dict: {"assignments": [...], "unassigned": [...], "summary": {...}}
+        """
+        registrations_query = (
+            db.session.query(
+                Registration.registration_id,
+                Registration.student_id,
+                Registration.room_id,
+                User.gender,
+            )
+            .join(User, Registration.student_id == User.user_id)
+            .filter(Registration.status == "pending")
+            .order_by(Registration.registration_date, Registration.registration_id)
+        )
+        if registration_ids is not None:
+            registrations_query = registrations_query.filter(
+                Registration.registration_id.in_(registration_ids)
+            )
+        registrations = registrations_query.all()
+
+        rooms_query = (
+            db.session.query(
+                Room.room_id,
+                Room.building_id,
+                Room.room_type_id,
+                Room.status,
+                Room.current_occupancy,
+                Building.gender,
+                RoomType.capacity,
+                RoomType.price,
+            )
+            .join(Building, Room.building_id == Building.building_id)
+            .join(RoomType, Room.room_type_id == RoomType.room_type_id)
+        )
+        rooms = {room.room_id: room for room in rooms_query}
+        lockable = None
+        if lock:
+            # Chỉ khóa các phòng còn chỗ (đọc lại giá trị mới nhất); phòng đã đầy hoặc đang
+            # bảo trì chỉ cần để biết tòa nhà/loại phòng của đơn và không được xếp thêm
+            locked = rooms_query.filter(
+                Room.status == "available",
+                db.func.coalesce(Room.current_occupancy, 0) < RoomType.capacity,
+            ).with_for_update(of=Room)
+            locked = {room.room_id: room for room in locked}
+            rooms.update(locked)
+            lockable = set(locked)
+
+        free = {
+            room.room_id: (
+                max(0, room.capacity - (room.current_occupancy or 0))
+                if room.status == "available" and (lockable is None or room.room_id in lockable)
+                else 0
+            )
+            for room in rooms.values()
+        }
+        initial_occupancy = {room_id: room.current_occupancy or 0 for room_id, room in rooms.items()}
+
+        assignments = {}  # registration_id -> (room_id, match)
+
+        # Nhóm đơn theo phòng đã chọn; đơn chọn phòng không còn tồn tại bị bỏ qua
+        by_requested = defaultdict(list)
+        for registration in registrations:
+            if registration.room_id in rooms:
+                by_requested[(registration.gender, registration.room_id)].append(registration)
+
+        def class_key(key):
+            gender, room_id = key
+            return gender, rooms[room_id].building_id, rooms[room_id].room_type_id
+
+        room_groups = defaultdict(list)
+        for room in rooms.values():
+            if free[room.room_id] > 0:
+                room_groups[(room.building_id, room.room_type_id)].append(room)
+
+        requested_keys = list(by_requested)
+        class_keys = list(dict.fromkeys(class_key(key) for key in requested_keys))
+        requested_rooms = [
+            room_id for room_id in dict.fromkeys(room_id for _, room_id in requested_keys)
+            if free[room_id] > 0
+        ]
+        room_keys = list(room_groups)
+
+        nodes = {}
+        for kind, keys in (("requested", requested_keys), ("room", requested_rooms),
+                           ("class", class_keys), ("group", room_keys)):
+            for key in keys:
+                nodes[(kind, key)] = 2 + len(nodes)
+        source, sink = 0, 1
+        network = _MinCostFlow(2 + len(nodes))
+
+        sink_edges = {}
+        for key in room_keys:
+            seats = sum(free[room.room_id] for room in room_groups[key])
+            sink_edges[key] = network.add_edge(nodes[("group", key)], sink, seats, 0)
+        room_edges = {}
+        for room_id in requested_rooms:
+            room = rooms[room_id]
+            room_edges[room_id] = network.add_edge(
+                nodes[("room", room_id)], nodes[("group", (room.building_id, room.room_type_id))],
+                free[room_id], 0,
+            )
+
+        source_edges = {}
+        requested_edges = {}
+        class_sizes = defaultdict(int)
+        for key in requested_keys:
+            gender, room_id = key
+            count = len(by_requested[key])
+            node = nodes[("requested", key)]
+            source_edges[key] = network.add_edge(source, node, count, 0)
+            if room_id in room_edges and _gender_allowed(rooms[room_id].gender, gender):
+                requested_edges[key] = network.add_edge(node, nodes[("room", room_id)], count, 0)
+            network.add_edge(node, nodes[("class", class_key(key))], count, 0)
+            class_sizes[class_key(key)] += count
+
+        price_rank = {price: rank for rank, price in enumerate(sorted({r.price for r in rooms.values()}))}
+        type_price = {room.room_type_id: room.price for room in rooms.values()}
+        class_edges = defaultdict(list)  # class key -> [(cost, room key, edge)]
+        for key in class_keys:
+            gender, building_id, room_type_id = key
+            requested_price = type_price[room_type_id]
+            for room_key in room_keys:
+                room_building_id, room_room_type_id = room_key
+                building_gender = room_groups[room_key][0].gender
+                price = room_groups[room_key][0].price
+                if not _gender_allowed(building_gender, gender) or price > requested_price:
+                    continue
+
+                cost = 0
+                if room_room_type_id != room_type_id:
+                    cost += COST_OTHER_TYPE + price_rank[requested_price] - price_rank[price]
+                if room_building_id != building_id:
+                    cost += COST_OTHER_BUILDING
+                if building_gender == "all":
+                    cost += COST_SHARED_BUILDING
+
+                edge = network.add_edge(
+                    nodes[("class", key)], nodes[("group", room_key)], class_sizes[key], cost
+                )
+                class_edges[key].append((cost, room_key, edge))
+
+        # Luồng ban đầu: đúng phòng đã chọn theo thứ tự đăng ký (chi phí 0)
+        seats = dict(free)
+        for key, edge in requested_edges.items():
+            room_id = key[1]
+            amount = min(len(by_requested[key]), seats[room_id])
+            if amount > 0:
+                seats[room_id] -= amount
+                room = rooms[room_id]
+                network.push(
+                    [source_edges[key], edge, room_edges[room_id],
+                     sink_edges[(room.building_id, room.room_type_id)]],
+                    amount,
+                )
+
+        network.solve(source, sink)
+
+        # Chia luồng: đơn đăng ký sớm hơn được ưu tiên vào đúng phòng đã chọn
+        order = {registration.registration_id: i for i, registration in enumerate(registrations)}
+        routed = defaultdict(list)  # class key -> đơn xếp theo nhóm
+        for key in requested_keys:
+            students = by_requested[key]
+            placed = network.flow(*requested_edges[key]) if key in requested_edges else 0
+            for registration in students[:placed]:
+                assignments[registration.registration_id] = (registration.room_id, MATCH_REQUESTED)
+                free[registration.room_id] -= 1
+            routed[class_key(key)].extend(students[placed:])
+
+        # Lấp đầy phòng đã có người trước
+        for key in room_keys:
+            room_groups[key] = deque(
+                sorted(
+                    (room for room in room_groups[key] if free[room.room_id] > 0),
+                    key=lambda room: (-(room.capacity - free[room.room_id]), room.room_id),
+                )
+            )
+
+        for key, edges in class_edges.items():
+            queue = deque(sorted(routed[key], key=lambda registration: order[registration.registration_id]))
+            for cost, room_key, edge in sorted(edges, key=lambda item: item[0]):
+                amount = network.flow(*edge)
+                candidate_rooms = room_groups[room_key]
+                while amount > 0:
+                    room = candidate_rooms[0]
+                    registration = queue.popleft()
+                    requested = rooms[registration.room_id]
+                    if room.room_id == requested.room_id:
+                        match = MATCH_REQUESTED
+                    elif room.room_type_id != requested.room_type_id:
+                        match = MATCH_CHEAPER_TYPE if room.price < requested.price else MATCH_OTHER_TYPE
+                    elif room.building_id == requested.building_id:
+                        match = MATCH_SAME_BUILDING
+                    else:
+                        match = MATCH_SAME_TYPE
+                    assignments[registration.registration_id] = (room.room_id, match)
+                    free[room.room_id] -= 1
+                    if free[room.room_id] == 0:
+                        candidate_rooms.popleft()
+                    amount -= 1
+
+        assignment_list = []
+        unassigned = []
+        matches = defaultdict(int)
+        for registration in registrations:
+            if registration.registration_id not in assignments:
+                unassigned.append(
+                    {
+                        "registration_id": registration.registration_id,
+                        "student_id": registration.student_id,
+                        "requested_room_id": registration.room_id,
+                    }
+                )
+                continue
+            room_id, match = assignments[registration.registration_id]
+            matches[match] += 1
+            assignment_list.append(
+                {
+                    "registration_id": registration.registration_id,
+                    "student_id": registration.student_id,
+                    "requested_room_id": registration.room_id,
+                    "room_id": room_id,
+                    "match": match,
+                }
+            )
+
+        used_rooms = {room_id for room_id, _ in assignments.values()}
+        return {
+            "assignments": assignment_list,
+            "unassigned": unassigned,
+            "summary": {
+                "pending": len(registrations),
+                "assigned": len(assignment_list),
+                "unassigned": len(unassigned),
+                "matches": dict(matches),
+                "rooms_used": len(used_rooms),
+                "rooms_opened": sum(1 for room_id in used_rooms if initial_occupancy[room_id] == 0),
+                "rooms_filled": sum(
+                    1 for room_id in used_rooms
+                    if rooms[room_id].status == "available" and free[room_id] == 0
+                ),
+            },
+        }
+
+    @staticmethod
+    @retry_on_deadlock()
+    def apply(registration_ids=None):
+        """
+        Tính lại phương án trên dữ liệu đã khóa, chuyển phòng cho các đơn được xếp
+        khác phòng đã chọn rồi duyệt toàn bộ các đơn được xếp.
+
+        Returns:
+            dict: Phương án đã áp dụng, kèm "approval" gồm số đơn đã duyệt và các đơn lỗi
+        """
+        plan = RoomAllocationService.plan(registration_ids, lock=True)
+
+        moved = [
+            {"b_registration_id": item["registration_id"], "b_room_id": item["room_id"]}
+            for item in plan["assignments"]
+            if item["room_id"] != item["requested_room_id"]
+        ]
+        if moved:
+            registrations = Registration.__table__
+            db.session.execute(
+                registrations.update()
+                .where(
+                    registrations.c.registration_id == db.bindparam("b_registration_id"),
+                    registrations.c.status == "pending",
+                )
+                .values(room_id=db.bindparam("b_room_id")),
+                moved,
+            )
+            db.session.expire_all()
+
+        approval = RegistrationService.approve_registrations(
+            [item["registration_id"] for item in plan["assignments"]]
+        )
+        db.session.commit()
+
+        plan["approval"] = {
+            "approved": approval["approved"],
+            "failed": [result for result in approval["results"] if not result["success"]],
+        }
+        return plan
@@ -0,0 +1,180 @@
+from datetime import date
+
+from app.extensions import db
+from sqlalchemy import inspect
+from app.models import (
+    Contract,
+    MaintenanceRequest,
+    Payment,
+    Registration,
+    Role,
+    Room,
+    User,
+)
+
+
+def _count_if(condition):
+    """SUM(CASE WHEN condition THEN 1 ELSE 0 END)"""
+    return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+
+
+def _shift_month(month_start, offset):
+    """Ngày đầu tháng sau khi dịch `offset` tháng"""
+    year, month = divmod(month_start.year * 12 + month_start.month - 1 + offset, 12)
+    return date(year, month + 1, 1)
+
+
+class StatisticsService:
+    """Các truy vấn thống kê dạng gộp (conditional aggregation / GROUP BY)"""
+
+    @staticmethod
+    def room_stats():
+        """Thống kê phòng trong một truy vấn"""
+        total, occupied, available, maintenance = db.session.query(
+            db.func.count(Room.room_id),
+            _count_if(Room.current_occupancy > 0),
+            _count_if(Room.status == "available"),
+            _count_if(Room.status == "maintenance"),
+        ).one()
+
+        return {
+            "total": int(total),
+            "occupied": int(occupied),
+            "available": int(available),
+            "maintenance": int(maintenance),
+        }
+
+    @staticmethod
+    def room_counts_subquery(group_column):
+        """Subquery đếm phòng (tổng / trống / có người ở) theo group_column, vd: Room.building_id"""
+        return (
+            db.session.query(
+                group_column.label("group_id"),
+                db.func.count(Room.room_id).label("total_rooms"),
+                _count_if(Room.status == "available").label("available_rooms"),
+                _count_if(Room.current_occupancy > 0).label("occupied_rooms"),
+            )
+            .group_by(group_column)
+            .subquery()
+        )
+
+    @staticmethod
+    def with_room_counts(model, group_column):
+        """
+        Query trả về (model, total_rooms, available_rooms, occupied_rooms) cho mỗi bản ghi cha.
+
+        Số phòng được tính bằng một subquery GROUP BY rồi LEFT JOIN vào trang kết quả,
+        không cần nạp các đối tượng Room.
+        """
+        counts = StatisticsService.room_counts_subquery(group_column)
+        primary_key = inspect(model).primary_key[0]
+        return db.session.query(
+            model,
+            db.func.coalesce(counts.c.total_rooms, 0).label("total_rooms"),
+            db.func.coalesce(counts.c.available_rooms, 0).label("available_rooms"),
+            db.func.coalesce(counts.c.occupied_rooms, 0).label("occupied_rooms"),
+        ).outerjoin(counts, counts.c.group_id == primary_key)
+
+    @staticmethod
+    def rooms_with_active_contracts():
+        """Số phòng có ít nhất một hợp đồng đang hiệu lực"""
+        count = (
+            db.session.query(db.func.count(db.distinct(Registration.room_id)))
+            .join(Contract, Registration.registration_id == Contract.registration_id)
+            .filter(Contract.is_active)
+            .scalar()
+        )
+        return int(count or 0)
+
+    @staticmethod
+    def users_by_role():
+        """Số user theo từng role"""
+        rows = (
+            db.session.query(Role.role_name, db.func.count(User.user_id))
+            .outerjoin(User, User.role_id == Role.role_id)
+            .group_by(Role.role_name)
+            .all()
+        )
+        return {role_name: count for role_name, count in rows}
+
+    @staticmethod
+    def contract_stats(expiring_days=30):
+        """Thống kê hợp đồng theo thời hạn trong một truy vấn"""
+        total, active, expired, expiring_soon = db.session.query(
+            db.func.count(Contract.contract_id),
+            _count_if(Contract.is_active),
+            _count_if(Contract.is_expired),
+            _count_if(Contract.expiring_within(expiring_days)),
+        ).one()
+
+        return {
+            "total": int(total),
+            "active": int(active),
+            "expired": int(expired),
+            "expiring_soon": int(expiring_soon),
+        }
+
+    @staticmethod
+    def registrations_by_status():
+        """Số đơn đăng ký theo trạng thái"""
+        rows = (
+            db.session.query(Registration.status, db.func.count(Registration.registration_id))
+            .group_by(Registration.status)
+            .all()
+        )
+        return {status: count for status, count in rows}
+
+    @staticmethod
+    def payments_by_status():
+        """Số lượng và tổng tiền thanh toán theo trạng thái"""
+        rows = (
+            db.session.query(
+                Payment.status,
+                db.func.count(Payment.payment_id),
+                db.func.coalesce(db.func.sum(Payment.amount), 0),
+            )
+            .group_by(Payment.status)
+            .all()
+        )
+        return {status: {"count": count, "amount": amount} for status, count, amount in rows}
+
+    @staticmethod
+    def maintenance_by_status():
+        """Số yêu cầu bảo trì theo trạng thái"""
+        rows = (
+            db.session.query(MaintenanceRequest.status, db.func.count(MaintenanceRequest.request_id))
+            .group_by(MaintenanceRequest.status)
+            .all()
+        )
+        return {status: count for status, count in rows}
+
+    @staticmethod
+    def monthly_revenue(months=6):
+        """Doanh thu đã xác nhận theo tháng (cũ -> mới), một truy vấn GROUP BY year, month"""
+        current_month = date.today().replace(day=1)
+        first_month = _shift_month(current_month, -(months - 1))
+
+        year = db.extract("year", Payment.payment_date)
+        month = db.extract("month", Payment.payment_date)
+        rows = (
+            db.session.query(year, month, db.func.sum(Payment.amount))
+            .filter(
+                Payment.status == "confirmed",
+                Payment.payment_date >= first_month,
+                Payment.payment_date < _shift_month(current_month, 1),
+            )
+            .group_by(year, month)
+            .all()
+        )
+        revenue_by_month = {(int(y), int(m)): amount for y, m, amount in rows}
+
+        monthly_revenue = []
+        for offset in range(months):
+            month_start = _shift_month(first_month, offset)
+            monthly_revenue.append({
+                "month": month_start.strftime("%Y-%m"),
+                "month_name": month_start.strftime("%m/%Y"),
+                "revenue": float(revenue_by_month.get((month_start.year, month_start.month)) or 0),
+            })
+
+        return monthly_revenue
@@ -0,0 +1,139 @@
+"""
+Phiên bản của từng bảng, dùng để tính ETag cho các endpoint GET.
+
+Session ghi nhận các bảng bị ghi trong transaction: thao tác ORM qua listener
+`after_flush`, câu lệnh Core INSERT/UPDATE/DELETE chạy bằng `db.session.execute` qua
+listener `do_orm_execute`. Ngay trước khi transaction commit (`before_commit`, sau lần
+flush cuối), `table_versions.version` của các bảng đó được tăng trong chính transaction
+ghi, theo thứ tự tên bảng. Dòng `table_versions` chỉ bị khóa trong lúc commit, và dữ
+liệu cùng phiên bản mới cùng được commit hoặc cùng bị rollback: không bao giờ có dữ
+liệu mới đi kèm ETag/key cache cũ.
+
+Đọc phiên bản chỉ tốn một truy vấn trên bảng nhỏ, nên endpoint trả 304 được mà
+không phải truy vấn/serialize dữ liệu. Phiên bản chỉ tăng, không bao giờ lặp lại.
+Các dòng được tạo sẵn bởi migration, `schema.sql` hoặc `db.create_all()`; bảng chưa có
+dòng được coi là phiên bản 0 và dòng được tạo ở lần ghi đầu tiên.
+"""
+from datetime import datetime
+
+from app.extensions import db
+from app.models import DashboardCounter, TableVersion
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import IntegrityError
+
+# Bảng không cần phiên bản (chính các bảng được cập nhật trong listener)
+UNTRACKED_TABLES = (DashboardCounter.__tablename__, TableVersion.__tablename__)
+# Key trong `session.info` chứa tên các bảng bị ghi trong transaction hiện tại
+CHANGED_TABLES_KEY = "table_versions.changed"
+
+
+def _changed_tables(session):
+    """Tên các bảng có bản ghi sắp được flush"""
+    tables = set()
+    objects = list(session.new) + list(session.deleted) + [
+        obj for obj in session.dirty if session.is_modified(obj, include_collections=False)
+    ]
+    for obj in objects:
+        for table in inspect(obj).mapper.tables:
+            tables.add(table.name)
+    return tables
+
+
+def _record(session, tables):
+    tables = set(tables) - set(UNTRACKED_TABLES)
+    if tables:
+        session.info.setdefault(CHANGED_TABLES_KEY, set()).update(tables)
+
+
+def _bump(session, tables):
+    """Tăng phiên bản các bảng trong transaction của session (tạo dòng còn thiếu)"""
+    table = TableVersion.__table__
+    tables = sorted(tables)
+    now = datetime.utcnow()
+    increment = table.update().values(version=table.c.version + 1, updated_at=now)
+    updated = session.execute(increment.where(table.c.table_name.in_(tables))).rowcount
+    if updated == len(tables):
+        return
+
+    existing = set(
+        session.execute(db.select(table.c.table_name).where(table.c.table_name.in_(tables))).scalars()
+    )
+    for name in tables:
+        if name in existing:
+            continue
+        try:
+            with session.begin_nested():
+                session.execute(table.insert().values(table_name=name, version=1, updated_at=now))
+        except IntegrityError:
+            # Transaction khác vừa tạo dòng này
+            session.execute(increment.where(table.c.table_name == name))
+
+
+def _seed_versions(target, connection, **kw):
+    """Tạo dòng phiên bản 0 cho mọi bảng khi `table_versions` được tạo bằng create_all"""
+    names = sorted(name for name in target.metadata.tables if name not in UNTRACKED_TABLES)
+    connection.execute(
+        target.insert(), [{"table_name": name, "version": 0, "updated_at": datetime.utcnow()} for name in names]
+    )
+
+
+def _after_flush(session, flush_context):
+    _record(session, _changed_tables(session))
+
+
+def _do_orm_execute(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None and getattr(table, "name", None):
+        _record(orm_execute_state.session, [table.name])
+
+
+def _before_commit(session):
+    if session.in_nested_transaction():
+        return  # Savepoint: phiên bản được tăng khi transaction ngoài cùng commit
+    # Flush phần còn lại để ghi nhận đủ các bảng trước khi tăng phiên bản
+    session.flush()
+    tables = session.info.pop(CHANGED_TABLES_KEY, None)
+    if tables:
+        _bump(session, tables)
+
+
+def _after_transaction_end(session, transaction):
+    # Transaction ngoài cùng bị rollback: bỏ các bảng đã ghi nhận
+    if transaction.parent is None:
+        session.info.pop(CHANGED_TABLES_KEY, None)
+
+
+class TableVersionService:
+
+    @staticmethod
+    def register_events():
+        """Gắn listener ghi nhận bảng bị ghi và tăng phiên bản khi commit vào session của ứng dụng"""
+        if not event.contains(db.session, "after_flush", _after_flush):
+            event.listen(db.session, "after_flush", _after_flush)
+        if not event.contains(db.session, "do_orm_execute", _do_orm_execute):
+            event.listen(db.session, "do_orm_execute", _do_orm_execute)
+        if not event.contains(db.session, "before_commit", _before_commit):
+            event.listen(db.session, "before_commit", _before_commit)
+        if not event.contains(db.session, "after_transaction_end", _after_transaction_end):
+            event.listen(db.session, "after_transaction_end", _after_transaction_end)
+        if not event.contains(TableVersion.__table__, "after_create", _seed_versions):
+            event.listen(TableVersion.__table__, "after_create", _seed_versions)
+
+    @staticmethod
+    def get_versions(tables):
+        """
+        Phiên bản hiện tại của các bảng (chỉ đọc; bảng chưa có dòng là phiên bản 0).
+
+        Returns:
+            dict: {table_name: version}
+        """
+        tables = sorted(set(tables))
+        table = TableVersion.__table__
+        versions = dict(
+            db.session.execute(
+                db.select(table.c.table_name, table.c.version).where(table.c.table_name.in_(tables))
+            ).all()
+        )
+        return {name: versions.get(name, 0) for name in tables}
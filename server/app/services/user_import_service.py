@@ -0,0 +1,220 @@
+"""
+Nhập hàng loạt tài khoản từ file CSV (tạo tài khoản cho sinh viên khóa mới).
+
+File được đọc lần lượt từng dòng. Email và mã sinh viên được kiểm tra trùng với
+tập giá trị đã có trong database (nạp một lần) và với các dòng trước đó trong
+file. Các dòng hợp lệ được gom thành lô: mật khẩu của cả lô được băm song song
+trên process pool dùng chung (`hash_many`), sau đó lô được ghi bằng một câu INSERT executemany và commit
+riêng. Mỗi dòng lỗi được trả về kèm số dòng và lý do.
+"""
+import codecs
+import csv
+import re
+import secrets
+from collections import defaultdict
+
+from app.extensions import db
+from app.models import Role, User
+from app.services.counter_service import CounterService
+from app.utils.password_hashing import hash_many
+from sqlalchemy.exc import IntegrityError
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+GENDERS = ("male", "female", "other")
+MIN_PASSWORD_LENGTH = 6
+
+REQUIRED_COLUMNS = ("full_name", "email")
+OPTIONAL_COLUMNS = ("password", "role_name", "phone_number", "student_id", "gender")
+
+
+class UserImportError(ValueError):
+    """File import không đọc được (rỗng, thiếu cột bắt buộc)"""
+
+
+def _read_rows(stream, encoding="utf-8-sig"):
+    """Iterator (số dòng, dict) của file CSV; tên cột được chuẩn hóa chữ thường"""
+    reader = csv.reader(codecs.iterdecode(stream, encoding, errors="replace"))
+    header = next(reader, None)
+    if not header:
+        raise UserImportError("File import rỗng")
+    header = [column.strip().lower() for column in header]
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise UserImportError(f"File import thiếu cột: {', '.join(missing)}")
+
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        yield reader.line_num, {
+            column: (row[index].strip() if index < len(row) else "")
+            for index, column in enumerate(header)
+            if column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+        }
+
+
+class UserImportService:
+
+    # Số dòng mỗi lô (mỗi lô một transaction)
+    BATCH_SIZE = 500
+
+    @staticmethod
+    def import_csv(stream, default_role="student", dry_run=False, batch_size=None, workers=None):
+        """
+        Tạo tài khoản từ file CSV.
+
+        Cột bắt buộc: full_name, email. Cột tùy chọn: password, role_name (mặc định
+        `default_role`), phone_number, student_id, gender ('male'/'female'/'other').
+        Dòng không có password được cấp mật khẩu ngẫu nhiên, trả về trong báo cáo.
+
+        Args:
+            stream: Stream nhị phân của file CSV
+            default_role (str): Role khi dòng không có role_name
+            dry_run (bool): Chỉ kiểm tra, không ghi database
+            batch_size (int): Số dòng mỗi lô
+            workers (int): Số nhóm mật khẩu băm song song tối đa (mặc định PASSWORD_HASH_WORKERS)
+
+        Returns:
+            dict: {"summary", "created", "errors", "dry_run"}
+
+        Raises:
+            UserImportError: File rỗng hoặc thiếu cột bắt buộc
+            PasswordHashingBusy: Pool băm mật khẩu quá tải (các lô trước đó đã được ghi)
+        """
+        batch_size = batch_size or UserImportService.BATCH_SIZE
+
+        roles = dict(db.session.query(Role.role_name, Role.role_id))
+        role_names = {role_id: role_name for role_name, role_id in roles.items()}
+        emails = {email.lower() for (email,) in db.session.query(User.email)}
+        student_ids = {
+            student_id.lower()
+            for (student_id,) in db.session.query(User.student_id).filter(User.student_id.isnot(None))
+        }
+        db.session.rollback()
+
+        created = []
+        errors = []
+        rows = 0
+
+        batch = []
+        for line, data in _read_rows(stream):
+            rows += 1
+            error = UserImportService._validate(data, roles, default_role, emails, student_ids)
+            if error:
+                errors.append({"line": line, "email": data.get("email"), "error": error})
+                continue
+
+            # Giữ chỗ email/mã sinh viên để các dòng sau trong file không trùng
+            emails.add(data["email"].lower())
+            if data.get("student_id"):
+                student_ids.add(data["student_id"].lower())
+            batch.append((line, data))
+
+            if len(batch) >= batch_size:
+                UserImportService._insert_batch(batch, role_names, workers, dry_run, created, errors)
+                batch = []
+        if batch:
+            UserImportService._insert_batch(batch, role_names, workers, dry_run, created, errors)
+
+        return {
+            "summary": {"rows": rows, "created": len(created), "failed": len(errors)},
+            "created": created,
+            "errors": sorted(errors, key=lambda error: error["line"]),
+            "dry_run": dry_run,
+        }
+
+    @staticmethod
+    def _validate(data, roles, default_role, emails, student_ids):
+        """Lý do dòng không hợp lệ, None nếu hợp lệ"""
+        if not data.get("full_name"):
+            return "full_name là bắt buộc"
+        if not data.get("email"):
+            return "email là bắt buộc"
+        if not EMAIL_PATTERN.match(data["email"]):
+            return "Email không hợp lệ"
+        if data["email"].lower() in emails:
+            return "Email đã được sử dụng"
+        if data.get("student_id") and data["student_id"].lower() in student_ids:
+            return "Mã sinh viên đã được sử dụng"
+        if (data.get("role_name") or default_role) not in roles:
+            return "Role không tồn tại"
+        data["role_id"] = roles[data.get("role_name") or default_role]
+        if data.get("gender") and data["gender"] not in GENDERS:
+            return "Giới tính phải là 'male', 'female' hoặc 'other'"
+        if data.get("password") and len(data["password"]) < MIN_PASSWORD_LENGTH:
+            return f"Mật khẩu phải có ít nhất {MIN_PASSWORD_LENGTH} ký tự"
+        return None
+
+    @staticmethod
+    def _insert_batch(batch, role_names, workers, dry_run, created, errors):
+        """Băm mật khẩu cả lô rồi ghi bằng một câu INSERT executemany (một transaction)"""
+        if dry_run:
+            created.extend(
+                {"line": line, "email": data["email"], "student_id": data.get("student_id") or None}
+                for line, data in batch
+            )
+            return
+        generated = {}
+        passwords = []
+        for line, data in batch:
+            if not data.get("password"):
+                generated[line] = secrets.token_urlsafe(9)
+            passwords.append(data.get("password") or generated[line])
+        rows = [
+            {
+                "line": line,
+                "role_id": data["role_id"],
+                "full_name": data["full_name"],
+                "email": data["email"],
+                "password_hash": password_hash,
+                "phone_number": data.get("phone_number") or None,
+                "student_id": data.get("student_id") or None,
+                "gender": data.get("gender") or "other",
+                "is_active": True,
+            }
+            for (line, data), password_hash in zip(batch, hash_many(passwords, max_parallel=workers))
+        ]
+
+        users = User.__table__
+        try:
+            db.session.execute(users.insert(), [_without_line(row) for row in rows])
+            inserted = rows
+        except IntegrityError:
+            # Email/mã sinh viên vừa được tạo bởi request khác: ghi từng dòng để biết dòng lỗi
+            db.session.rollback()
+            inserted = []
+            for row in rows:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(users.insert(), _without_line(row))
+                    inserted.append(row)
+                except IntegrityError:
+                    errors.append(
+                        {"line": row["line"], "email": row["email"], "error": "Email hoặc mã sinh viên đã được sử dụng"}
+                    )
+
+        deltas = defaultdict(int)
+        for row in inserted:
+            deltas[f"users.role.{role_names[row['role_id']]}"] += 1
+        CounterService.apply_deltas(deltas)
+        db.session.commit()
+
+        user_ids = dict(
+            db.session.query(User.email, User.user_id).filter(
+                User.email.in_([row["email"] for row in inserted])
+            )
+        )
+        db.session.rollback()
+        for row in inserted:
+            item = {
+                "line": row["line"],
+                "user_id": user_ids.get(row["email"]),
+                "email": row["email"],
+                "student_id": row["student_id"],
+            }
+            if row["line"] in generated:
+                item["initial_password"] = generated[row["line"]]
+            created.append(item)
+
+
+def _without_line(row):
+    return {key: value for key, value in row.items() if key != "line"}
@@ -0,0 +1,122 @@
+"""
+Thông tin người dùng hiện tại lấy từ JWT.
+
+Khi đăng nhập, role và trạng thái active được nhúng vào token dưới dạng
+additional claims. Vì token sống tới JWT_ACCESS_TOKEN_EXPIRES (24h), role và
+trạng thái active thật được đối chiếu lại với database, nhưng kết quả được giữ
+AUTH_RECHECK_SECONDS giây trong mỗi worker: khóa tài khoản hoặc đổi role có hiệu lực
+sau tối đa chừng đó giây (ngay lập tức trên worker xử lý thao tác cập nhật), còn phần
+lớn request không phải truy vấn database. AUTH_RECHECK_SECONDS < 0 thì tin hoàn toàn
+vào claim trong token. Khi handler thực sự cần đối tượng User, `get_current_user()`
+chỉ truy vấn một lần cho mỗi request.
+Token cũ (chưa có claim role) vẫn dùng được: role khi đó được đọc từ database.
+"""
+import threading
+import time
+
+from app.extensions import db
+from app.models import Role, User
+from flask import current_app, g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+# app.extensions["auth_states"]: user_id -> (role_name, is_active, thời điểm đối chiếu),
+# dùng chung giữa các request trong worker
+_auth_states_lock = threading.Lock()
+# Số user tối đa được giữ; vượt quá thì xóa các mục đã hết hạn
+AUTH_STATE_MAX_ENTRIES = 10000
+
+
+def build_token_claims(user):
+    """Additional claims nhúng vào access token khi đăng nhập"""
+    return {
+        "role": user.role.role_name,
+        "is_active": bool(user.is_active),
+    }
+
+
+def _auth_states():
+    return current_app.extensions.setdefault("auth_states", {})
+
+
+def forget_auth_state(user_id):
+    """Bỏ role/trạng thái đã đối chiếu của user (gọi sau khi đổi role, khóa hoặc xóa user)"""
+    with _auth_states_lock:
+        _auth_states().pop(user_id, None)
+
+
+def _load_auth_state(user_id):
+    row = (
+        db.session.query(Role.role_name, User.is_active)
+        .join(User, User.role_id == Role.role_id)
+        .filter(User.user_id == user_id)
+        .first()
+    )
+    # User đã bị xóa: không còn role, coi như bị khóa
+    return (row.role_name, bool(row.is_active)) if row else (None, False)
+
+
+def _verified_auth_state():
+    """
+    (role_name, is_active) của người dùng hiện tại đã đối chiếu với database,
+    hoặc None nếu tắt việc đối chiếu (AUTH_RECHECK_SECONDS < 0).
+    """
+    ttl = current_app.config.get("AUTH_RECHECK_SECONDS", 60)
+    if ttl is None or ttl < 0:
+        return None
+    if "auth_state" in g:
+        return g.auth_state
+
+    user_id = get_current_user_id()
+    states = _auth_states()
+    now = time.monotonic()
+    with _auth_states_lock:
+        cached = states.get(user_id)
+    if cached and now - cached[2] < ttl:
+        state = cached[:2]
+    else:
+        state = _load_auth_state(user_id)
+        with _auth_states_lock:
+            if len(states) >= AUTH_STATE_MAX_ENTRIES:
+                for key in [key for key, value in states.items() if now - value[2] >= ttl]:
+                    del states[key]
+            states[user_id] = (*state, now)
+    g.auth_state = state
+    return state
+
+
+def get_current_user_id():
+    """ID người dùng hiện tại (int; identity trong token là chuỗi)"""
+    identity = get_jwt_identity()
+    return int(identity) if identity is not None else None
+
+
+def get_current_user():
+    """User hiện tại, truy vấn tối đa một lần mỗi request"""
+    if "current_user" not in g:
+        user_id = get_current_user_id()
+        g.current_user = db.session.get(User, user_id) if user_id is not None else None
+    return g.current_user
+
+
+def get_current_role():
+    """Tên role của người dùng hiện tại (đã đối chiếu với database, hoặc từ claim trong token)"""
+    state = _verified_auth_state()
+    if state is not None:
+        return state[0]
+    role = get_jwt().get("role")
+    if role is None:
+        user = get_current_user()
+        role = user.role.role_name if user else None
+    return role
+
+
+def is_current_user_active():
+    """Trạng thái active của người dùng hiện tại (đã đối chiếu với database, hoặc từ claim trong token)"""
+    state = _verified_auth_state()
+    if state is not None:
+        return state[1]
+    is_active = get_jwt().get("is_active")
+    if is_active is None:
+        user = get_current_user()
+        is_active = bool(user and user.is_active)
+    return is_active
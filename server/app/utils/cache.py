@@ -0,0 +1,243 @@
+"""
+Cache response của các endpoint đọc gần như tĩnh (dropdown, thống kê).
+
+    @buildings_bp.route('/dropdown', methods=['GET'])
+    @jwt_required()
+    @cached(tags=("buildings",))
+    def get_buildings_dropdown(): ...
+
+    @buildings_bp.route('/', methods=['POST'])
+    @jwt_required()
+    @invalidates("buildings")
+    def create_building(): ...
+
+Key gồm endpoint, tham số URL, query string và role của người gọi. Chỉ response
+200 được cache. Mỗi tag có một token lưu trong backend; entry ghi lại token của các
+tag lúc bắt đầu tính và chỉ còn hợp lệ khi các token chưa đổi. `invalidate(tag)`
+đổi token nên mọi entry gắn tag đó hết hiệu lực mà không phải duyệt cache, kể cả
+entry đang được tính dở khi có request ghi xen vào.
+
+Khi nhiều request cùng trượt một key, chỉ một request tính lại (single-flight),
+các request còn lại chờ kết quả. Lần tính lại luôn đọc primary để không nạp vào
+cache dữ liệu cũ của replica ngay sau khi vừa invalidate.
+
+Backend mặc định (`MemoryBackend`, LRU + TTL) nằm trong bộ nhớ của từng worker:
+invalidate chỉ có tác dụng trong worker xử lý request ghi, các worker khác thấy dữ
+liệu mới sau tối đa `timeout` giây. View có thêm `@etag` (app.utils.etag) dùng phiên bản
+bảng trong database mà `@etag` đã đọc làm một phần của key: thay đổi từ worker hay
+tiến trình khác cũng làm cache trượt ngay. CACHE_BACKEND trỏ tới class khác (cùng giao
+diện get/set/delete/clear, ví dụ bọc Redis) để dùng chung cache giữa các worker.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, g, make_response, request
+from werkzeug.utils import import_string
+
+from app.db_routing import on_primary
+from app.utils.auth import get_current_role
+
+EXTENSION_KEY = "response_cache"
+
+# Thời gian tối đa chờ request khác tính xong cùng key
+SINGLE_FLIGHT_TIMEOUT = 30
+
+
+class MemoryBackend:
+    """Cache LRU có TTL trong bộ nhớ tiến trình (thread-safe)"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires_at = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ResponseCache:
+    """Cache gắn với app (mỗi app một backend), tạo bằng `init_app`"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        if config.get("CACHE_BACKEND"):
+            backend = import_string(config["CACHE_BACKEND"])(**(config.get("CACHE_BACKEND_OPTIONS") or {}))
+        else:
+            backend = MemoryBackend(max_entries=config.get("CACHE_MAX_ENTRIES", 1024))
+        app.extensions[EXTENSION_KEY] = _CacheState(backend)
+
+    @property
+    def _state(self):
+        return current_app.extensions[EXTENSION_KEY]
+
+    @property
+    def backend(self):
+        return self._state.backend
+
+    def get_or_set(self, key, compute, tags=(), timeout=None, should_cache=None):
+        """
+        Giá trị của `key`; trượt cache thì gọi `compute()` (một lần cho mỗi key dù
+        nhiều thread cùng trượt) và lưu lại nếu `should_cache(value)`.
+
+        Returns:
+            tuple: (value, hit)
+        """
+        state = self._state
+        value = state.lookup(key)
+        if value is not None:
+            return value, True
+
+        with state.lock:
+            event = state.inflight.get(key)
+            leader = event is None
+            if leader:
+                event = state.inflight[key] = threading.Event()
+
+        if not leader:
+            event.wait(SINGLE_FLIGHT_TIMEOUT)
+            value = state.lookup(key)
+            if value is not None:
+                return value, True
+            # Request tính trước bị lỗi hoặc kết quả không được cache
+            return compute(), False
+
+        try:
+            # Đọc token trước khi tính: invalidate xảy ra trong lúc tính làm entry hết hạn ngay
+            tokens = {tag: state.tag_token(tag) for tag in tags}
+            value = compute()
+            if should_cache is None or should_cache(value):
+                state.backend.set(key, (tokens, value), timeout)
+            return value, False
+        finally:
+            with state.lock:
+                state.inflight.pop(key, None)
+            event.set()
+
+    def invalidate(self, *tags):
+        """Làm mọi entry gắn một trong các tag hết hiệu lực"""
+        state = self._state
+        for tag in tags:
+            state.backend.set(_tag_key(tag), uuid.uuid4().hex)
+
+    def clear(self):
+        self._state.backend.clear()
+
+
+class _CacheState:
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.lock = threading.Lock()
+        self.inflight = {}
+
+    def tag_token(self, tag):
+        token = self.backend.get(_tag_key(tag))
+        if token is None:
+            token = uuid.uuid4().hex
+            self.backend.set(_tag_key(tag), token)
+        return token
+
+    def lookup(self, key):
+        item = self.backend.get(key)
+        if item is None:
+            return None
+        tokens, value = item
+        if any(self.backend.get(_tag_key(tag)) != token for tag, token in tokens.items()):
+            return None
+        return value
+
+
+def _tag_key(tag):
+    return f"tag:{tag}"
+
+
+response_cache = ResponseCache()
+
+
+def _cache_key():
+    view_args = ",".join(f"{name}={value}" for name, value in sorted((request.view_args or {}).items()))
+    query = "&".join(f"{name}={value}" for name, value in sorted(request.args.items(multi=True)))
+    return f"view:{request.endpoint}:{get_current_role()}:{g.get('table_versions', '')}:{view_args}?{query}"
+
+
+def cached(tags=(), timeout=None):
+    """
+    Cache response của view (đặt sau `jwt_required`/`require_role` để vẫn kiểm tra quyền).
+
+    Args:
+        tags (tuple): Tag dữ liệu mà response phụ thuộc, xem `invalidates`
+        timeout (int): Số giây giữ response (mặc định CACHE_DEFAULT_TIMEOUT)
+    """
+    def decorator(f):
+        compute_on_primary = on_primary(f)
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            config = current_app.config
+            if not config.get("CACHE_ENABLED", True):
+                return f(*args, **kwargs)
+
+            def compute():
+                response = make_response(compute_on_primary(*args, **kwargs))
+                return response.status_code, response.mimetype, response.get_data()
+
+            (status, mimetype, body), hit = response_cache.get_or_set(
+                _cache_key(),
+                compute,
+                tags=tags,
+                timeout=timeout or config.get("CACHE_DEFAULT_TIMEOUT", 300),
+                should_cache=lambda value: value[0] == 200,
+            )
+            response = Response(body, status=status, mimetype=mimetype)
+            response.headers["X-Cache"] = "HIT" if hit else "MISS"
+            return response
+        return decorated_function
+    return decorator
+
+
+def invalidates(*tags):
+    """Sau khi view ghi thành công (status < 400), làm hết hiệu lực cache gắn các tag"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            response = make_response(f(*args, **kwargs))
+            if response.status_code < 400 and current_app.config.get("CACHE_ENABLED", True):
+                response_cache.invalidate(*tags)
+            return response
+        return decorated_function
+    return decorator
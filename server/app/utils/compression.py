@@ -0,0 +1,115 @@
+"""
+Nén response (gzip/deflate, brotli nếu cài gói `brotli`) theo `Accept-Encoding`.
+
+Chỉ nén response thành công có kiểu nội dung dạng text (JSON, CSV...) và không nhỏ
+hơn COMPRESS_MIN_SIZE byte; file đã nén sẵn (xlsx) và response đã có
+`Content-Encoding` được giữ nguyên. Response streaming được nén dần theo từng chunk
+nên không phải giữ toàn bộ body trong bộ nhớ. Có thể tắt (COMPRESS_ENABLED=false)
+khi reverse proxy đã nén.
+"""
+import zlib
+
+from flask import request
+
+# Note: brotli là tùy chọn: pip install brotli
+try:
+    import brotli
+
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_MIMETYPES = (
+    "application/json",
+    "text/csv",
+    "text/plain",
+    "text/html",
+)
+
+# wbits của zlib cho từng encoding
+ZLIB_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+def supported_encodings():
+    """Encoding theo thứ tự ưu tiên khi client chấp nhận nhiều encoding với cùng q"""
+    return ("br", "gzip", "deflate") if BROTLI_AVAILABLE else ("gzip", "deflate")
+
+
+class Compressor:
+    """Giao diện chung `compress(chunk)`/`finish()` cho zlib và brotli"""
+
+    def __init__(self, encoding, config):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=config.get("COMPRESS_BROTLI_QUALITY", 4))
+            self.compress, self.finish = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(config.get("COMPRESS_LEVEL", 6), zlib.DEFLATED, ZLIB_WBITS[encoding])
+            self.compress, self.finish = compressor.compress, compressor.flush
+
+
+def _compress_stream(chunks, compressor):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        # Đóng iterator gốc (dọn file tạm...) kể cả khi client ngắt kết nối giữa chừng
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def _should_compress(response):
+    return (
+        request.method != "HEAD"
+        and 200 <= response.status_code < 300
+        and response.status_code not in (204, 206)
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+        and "Content-Encoding" not in response.headers
+        and not response.direct_passthrough
+    )
+
+
+def compress_response(response, config):
+    """Nén `response` nếu client chấp nhận và response đủ lớn"""
+    if not _should_compress(response):
+        return response
+
+    # Nội dung thay đổi theo Accept-Encoding, kể cả khi lần này không nén
+    response.vary.add("Accept-Encoding")
+
+    encoding = request.accept_encodings.best_match(supported_encodings())
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, Compressor(encoding, config))
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < config.get("COMPRESS_MIN_SIZE", 1024):
+            return response
+        compressor = Compressor(encoding, config)
+        response.set_data(compressor.compress(data) + compressor.finish())
+
+    response.headers["Content-Encoding"] = encoding
+    # ETag mạnh gắn với từng byte của body: bản nén cần ETag khác
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+
+def register_compression(app):
+    """
+    Gắn after_request nén response. Gọi trước khi đăng ký các after_request khác:
+    Flask chạy after_request theo thứ tự ngược nên việc nén diễn ra sau cùng.
+    """
+    @app.after_request
+    def compress(response):
+        if not app.config.get("COMPRESS_ENABLED", True):
+            return response
+        return compress_response(response, app.config)
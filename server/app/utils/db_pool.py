@@ -0,0 +1,151 @@
+"""
+Connection pool của SQLAlchemy: cấu hình từ biến môi trường và số liệu theo worker.
+
+`configure_pool(app)` gắn `InstrumentedQueuePool` vào SQLALCHEMY_ENGINE_OPTIONS trước
+khi khởi tạo extension. Pool này ghi lại thời gian chờ lấy connection, số lần hết
+thời gian chờ, số connection overflow được mở và số connection bị hủy (pre-ping
+phát hiện connection đã bị MySQL đóng sau `wait_timeout`...). Số liệu được giữ
+trong bộ nhớ của từng tiến trình: mỗi worker gunicorn trả về số liệu của chính nó.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Lấy connection chờ lâu hơn ngưỡng này được tính là chờ chậm
+SLOW_CHECKOUT_SECONDS = 0.1
+
+# Tham số chỉ áp dụng cho QueuePool
+QUEUE_POOL_OPTIONS = ("pool_size", "max_overflow", "pool_timeout")
+
+
+class PoolMetrics:
+    """Bộ đếm cộng dồn của connection pool trong tiến trình hiện tại"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.pid = os.getpid()
+            self.started_at = datetime.utcnow()
+            self.checkouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+            self.slow_checkouts = 0
+            self.timeouts = 0
+            self.overflow_opened = 0
+            self.checked_out_peak = 0
+            self.invalidated = 0
+
+    def _ensure_process(self):
+        # Sau khi fork (gunicorn --preload) bắt đầu đếm lại cho worker mới
+        if self.pid != os.getpid():
+            self.reset()
+
+    def record_checkout(self, wait_seconds, checked_out):
+        self._ensure_process()
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+            if wait_seconds >= SLOW_CHECKOUT_SECONDS:
+                self.slow_checkouts += 1
+            self.checked_out_peak = max(self.checked_out_peak, checked_out)
+
+    def record_timeout(self):
+        self._ensure_process()
+        with self._lock:
+            self.timeouts += 1
+
+    def record_overflow(self):
+        self._ensure_process()
+        with self._lock:
+            self.overflow_opened += 1
+
+    def record_invalidate(self):
+        self._ensure_process()
+        with self._lock:
+            self.invalidated += 1
+
+    def snapshot(self, pool=None):
+        """Số liệu hiện tại, kèm trạng thái tức thời của `pool` nếu có"""
+        self._ensure_process()
+        with self._lock:
+            data = {
+                "pid": self.pid,
+                "since": self.started_at.isoformat(),
+                "checkouts": self.checkouts,
+                "wait_ms_total": round(self.wait_seconds_total * 1000, 3),
+                "wait_ms_avg": round(self.wait_seconds_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+                "slow_checkouts": self.slow_checkouts,
+                "timeouts": self.timeouts,
+                "overflow_opened": self.overflow_opened,
+                "checked_out_peak": self.checked_out_peak,
+                "invalidated": self.invalidated,
+            }
+        if isinstance(pool, QueuePool):
+            data.update(
+                {
+                    "pool_size": pool.size(),
+                    "max_overflow": pool._max_overflow,
+                    "checked_out": pool.checkedout(),
+                    "checked_in": pool.checkedin(),
+                    "overflow": max(0, pool.overflow()),
+                }
+            )
+        return data
+
+
+POOL_METRICS = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool ghi số liệu vào POOL_METRICS"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            POOL_METRICS.record_timeout()
+            raise
+        POOL_METRICS.record_checkout(time.perf_counter() - started, self.checkedout())
+        return record
+
+    def _inc_overflow(self):
+        opened = super()._inc_overflow()
+        if opened and self._overflow > 0:
+            POOL_METRICS.record_overflow()
+        return opened
+
+
+@event.listens_for(InstrumentedQueuePool, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    POOL_METRICS.record_invalidate()
+
+
+def configure_pool(app):
+    """
+    Hoàn thiện SQLALCHEMY_ENGINE_OPTIONS trước `db.init_app(app)`.
+
+    SQLite in-memory dùng StaticPool (không nhận các tham số của QueuePool) nên bỏ
+    các tham số đó; các database khác dùng InstrumentedQueuePool.
+    """
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    uri = app.config.get("SQLALCHEMY_DATABASE_URI")
+    url = make_url(uri) if uri else None
+
+    if url is not None and url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        for key in QUEUE_POOL_OPTIONS + ("pool_recycle",):
+            options.pop(key, None)
+    elif app.config.get("DB_POOL_METRICS", True):
+        options.setdefault("poolclass", InstrumentedQueuePool)
+
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
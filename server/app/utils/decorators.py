@@ -1,14 +1,25 @@
 """
 Decorators for the server application.
 """
+import random
+import time
 from functools import wraps
 from flask import jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import User
+from flask_jwt_extended import jwt_required
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
+from app.extensions import db
+from app.utils.auth import get_current_role, is_current_user_active
+
+# MySQL: 1213 = deadlock, 1205 = hết thời gian chờ khóa
+RETRYABLE_MYSQL_ERRORS = (1213, 1205)
 
 def require_role(allowed_roles):
     """
     Decorator để kiểm tra quyền truy cập dựa trên vai trò người dùng.
+
+    Role và trạng thái active được đọc từ claims của JWT, chỉ truy vấn database
+    với token cũ chưa có các claim này.
     
     Args:
         allowed_roles (list or str): Danh sách các vai trò được phép truy cập hoặc một vai trò đơn lẻ.
@@ -23,10 +34,47 @@ def require_role(allowed_roles):
         @wraps(f)
         @jwt_required()  # Ensure JWT is checked before role
         def decorated_function(*args, **kwargs):
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
-            if not user or user.role.role_name not in allowed_roles:
+            if not is_current_user_active() or get_current_role() not in allowed_roles:
                 return jsonify({'message': 'Không có quyền truy cập'}), 403
             return f(*args, **kwargs)
         return decorated_function
     return decorator
+
+
+def is_retryable_error(error):
+    """Lỗi do tranh chấp khóa giữa các transaction, chạy lại transaction là đủ"""
+    if isinstance(error, StaleDataError):
+        return True
+    if not isinstance(error, OperationalError):
+        return False
+    args = getattr(error.orig, "args", ())
+    if args and args[0] in RETRYABLE_MYSQL_ERRORS:
+        return True
+    # SQLite không có khóa theo dòng, ghi đồng thời trả về "database is locked"
+    return "database is locked" in str(error.orig)
+
+
+def retry_on_deadlock(max_attempts=5, base_delay=0.05):
+    """
+    Decorator chạy lại toàn bộ hàm khi transaction bị hủy do deadlock/lock timeout.
+
+    Hàm được bọc phải tự mở và commit transaction của mình (đọc lại dữ liệu ở mỗi
+    lần chạy), vì session được rollback trước khi thử lại.
+
+    Args:
+        max_attempts (int): Số lần chạy tối đa
+        base_delay (float): Thời gian chờ cơ sở (giây), tăng gấp đôi sau mỗi lần, có jitter
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    return f(*args, **kwargs)
+                except Exception as e:
+                    if attempt == max_attempts or not is_retryable_error(e):
+                        raise
+                    db.session.rollback()
+                    time.sleep(base_delay * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+        return decorated_function
+    return decorator
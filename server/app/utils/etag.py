@@ -0,0 +1,71 @@
+"""
+ETag và 304 Not Modified cho các endpoint GET.
+
+    @rooms_bp.route("/", methods=["GET"])
+    @jwt_required()
+    @etag("rooms", "buildings", "room_types")
+    def get_rooms(): ...
+
+ETag được tính trước khi chạy view, từ phiên bản (`table_versions`) của các bảng mà
+response phụ thuộc, URL (kèm query string), user và role của người gọi. Client gửi
+lại ETag trong `If-None-Match`: nếu chưa bảng nào bị ghi, server trả 304 không có
+body mà không truy vấn/serialize dữ liệu. Endpoint có dữ liệu phụ thuộc ngày hiện tại
+(hợp đồng còn hiệu lực, số ngày còn lại...) dùng `daily=True` để ETag đổi mỗi ngày.
+
+ETag là weak (`W/"..."`) vì body có `timestamp` thay đổi theo từng lần trả về.
+"""
+import hashlib
+from datetime import date
+from functools import wraps
+
+from flask import Response, current_app, g, make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+from app.services.table_version_service import TableVersionService
+from app.utils.auth import get_current_role
+
+
+def _table_versions(tables, daily):
+    versions = TableVersionService.get_versions(tables)
+    value = ",".join(f"{name}={version}" for name, version in sorted(versions.items()))
+    if daily:
+        value += f",date={date.today().isoformat()}"
+    return value
+
+
+def _etag_value(table_versions):
+    parts = (request.full_path, str(get_jwt_identity()), str(get_current_role()), table_versions)
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:20]
+
+
+def etag(*tables, daily=False):
+    """
+    Gắn ETag vào response 200 và trả 304 khi `If-None-Match` khớp
+    (đặt sau `jwt_required`/`require_role`, trước `cached`).
+
+    Args:
+        tables: Tên các bảng mà response phụ thuộc
+        daily (bool): Response phụ thuộc ngày hiện tại
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_app.config.get("ETAG_ENABLED", True):
+                return f(*args, **kwargs)
+
+            # Cache response (app.utils.cache) dùng phiên bản bảng làm một phần của key
+            g.table_versions = _table_versions(tables, daily)
+            value = _etag_value(g.table_versions)
+
+            if request.if_none_match.contains_weak(value):
+                response = Response(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(value, weak=True)
+            # Client luôn hỏi lại server (bằng If-None-Match) trước khi dùng bản đã lưu
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,62 @@
+"""
+JSON provider của Flask dùng orjson (`app.json`, cũng là thứ `jsonify` gọi tới).
+
+orjson serialize `datetime`/`date`/`time`/`UUID`/dataclass trực tiếp (ISO 8601,
+giống `.isoformat()`), `Decimal` được đổi sang float ngay trong encoder nên view
+không cần tự gọi `float(...)`/`.isoformat()` cho từng field. Response được ghi
+thẳng dạng bytes, không qua bước decode/encode chuỗi như provider mặc định.
+
+Lưu ý khác provider mặc định: `datetime`/`date` ra dạng ISO 8601 thay vì RFC 822,
+và chuỗi giữ nguyên UTF-8 thay vì escape `\\uXXXX`.
+"""
+from decimal import Decimal
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+def _default(obj):
+    """Kiểu orjson không hỗ trợ sẵn"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Provider JSON dùng orjson. Tôn trọng `sort_keys` và `compact` như
+    DefaultJSONProvider; lời gọi `dumps`/`loads` có tham số riêng của module
+    `json` (cls, separators...) được chuyển về provider mặc định.
+    """
+
+    def _option(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, indent=False):
+        """Serialize `obj` thành bytes UTF-8"""
+        return orjson.dumps(obj, default=_default, option=self._option(indent))
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.keys() - {"indent"}:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj, indent=bool(kwargs.get("indent"))).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        # orjson.JSONDecodeError là lớp con của ValueError: request.get_json() vẫn trả 400
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b"\n", mimetype=self.mimetype)
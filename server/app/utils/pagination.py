@@ -0,0 +1,172 @@
+"""
+Phân trang keyset (cursor) cho các endpoint danh sách.
+
+Thay vì OFFSET + COUNT(*), trang tiếp theo được lấy bằng điều kiện seek trên
+cặp (sort_key, id) của bản ghi cuối trang trước, nên chi phí mỗi trang không
+tăng theo độ sâu. Cursor trả về cho client là chuỗi base64 "mờ" (opaque);
+client chỉ việc gửi lại nguyên giá trị `next_cursor` qua `?cursor=`.
+
+Chế độ này là opt-in: request có tham số `cursor` (rỗng = trang đầu) mới dùng
+keyset, các request theo `page` giữ nguyên cấu trúc `pagination` cũ.
+Tổng số bản ghi chỉ được đếm khi có `?with_total=true`.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import request
+
+# Số bản ghi tối đa mỗi trang (cả chế độ page lẫn cursor)
+MAX_PER_PAGE = 100
+
+
+class CursorError(ValueError):
+    """Cursor không hợp lệ hoặc không khớp với kiểu sắp xếp hiện tại"""
+
+
+def cursor_requested():
+    """Request có yêu cầu phân trang theo cursor không"""
+    return "cursor" in request.args
+
+
+def with_total_requested():
+    """Client có yêu cầu đếm tổng số bản ghi không (?with_total=true)"""
+    return request.args.get("with_total", "").lower() in ("1", "true", "yes")
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _python_value(column, value):
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is Decimal:
+        return Decimal(value)
+    return python_type(value)
+
+
+def encode_cursor(sort_name, sort_value, id_value):
+    """Mã hóa vị trí (sort_key, id) thành cursor base64 url-safe"""
+    payload = json.dumps([sort_name, _json_value(sort_value), id_value], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort_name, sort_column):
+    """Giải mã cursor, trả về (sort_value, id_value)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        name, sort_value, id_value = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if name != sort_name or not isinstance(id_value, int):
+            raise CursorError("Cursor không khớp với kiểu sắp xếp hiện tại")
+        return _python_value(sort_column, sort_value), id_value
+    except CursorError:
+        raise
+    except (binascii.Error, TypeError, ValueError, UnicodeDecodeError):
+        raise CursorError("Cursor không hợp lệ")
+
+
+def _seek_condition(sort_column, id_column, sort_value, id_value, descending):
+    """
+    Điều kiện lấy các bản ghi đứng sau (sort_value, id_value) theo thứ tự sắp xếp.
+
+    NULL được coi là nhỏ nhất (giống MySQL và SQLite): đứng đầu khi ASC, cuối khi DESC.
+    """
+    if descending:
+        after_id = id_column < id_value
+        if sort_value is None:
+            return (sort_column.is_(None)) & after_id
+        return (
+            (sort_column < sort_value)
+            | ((sort_column == sort_value) & after_id)
+            | sort_column.is_(None)
+        )
+
+    after_id = id_column > id_value
+    if sort_value is None:
+        return ((sort_column.is_(None)) & after_id) | sort_column.isnot(None)
+    return (sort_column > sort_value) | ((sort_column == sort_value) & after_id)
+
+
+class KeysetPage:
+    """Kết quả một trang keyset"""
+
+    def __init__(self, items, per_page, next_cursor, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.has_next = next_cursor is not None
+        self.total = total
+
+    def to_dict(self):
+        pagination = {
+            "per_page": self.per_page,
+            "next_cursor": self.next_cursor,
+            "has_next": self.has_next,
+        }
+        if self.total is not None:
+            pagination["total"] = self.total
+        return pagination
+
+
+def keyset_paginate(query, sort_column, id_column, sort_name, cursor=None, per_page=20,
+                    descending=True, with_total=False, max_per_page=MAX_PER_PAGE):
+    """
+    Phân trang query theo keyset trên (sort_column, id_column).
+
+    Args:
+        query: SQLAlchemy query (chưa order_by)
+        sort_column: Cột/biểu thức sắp xếp chính
+        id_column: Khóa chính, dùng để phá hòa khi sort_column trùng giá trị
+        sort_name (str): Tên kiểu sắp xếp ghi vào cursor (không đưa SQL của biểu thức
+            vào cursor); cursor của kiểu sắp xếp khác bị từ chối
+        cursor (str): Giá trị next_cursor của trang trước; rỗng/None là trang đầu
+        per_page (int): Số bản ghi mỗi trang
+        descending (bool): Sắp xếp giảm dần (mặc định) hay tăng dần
+        with_total (bool): Có đếm tổng số bản ghi hay không
+
+    Returns:
+        KeysetPage
+
+    Raises:
+        CursorError: cursor không hợp lệ
+    """
+    per_page = max(1, min(per_page, max_per_page))
+
+    total = query.order_by(None).count() if with_total else None
+
+    if cursor:
+        sort_value, id_value = decode_cursor(cursor, sort_name, sort_column)
+        query = query.filter(_seek_condition(sort_column, id_column, sort_value, id_value, descending))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    # Lấy thêm một bản ghi để biết còn trang sau hay không
+    rows = query.add_columns(sort_column, id_column).limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    next_cursor = None
+    if has_next:
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_name, last[-2], last[-1])
+
+    items = [row[0] if len(row) == 3 else tuple(row[:-2]) for row in rows]
+    return KeysetPage(items, per_page, next_cursor, total)
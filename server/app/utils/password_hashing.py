@@ -0,0 +1,178 @@
+"""
+Băm/kiểm tra mật khẩu ngoài thread xử lý request.
+
+`generate_password_hash`/`check_password_hash` (scrypt) tốn ~100ms CPU mỗi lần.
+Chạy trực tiếp trong request, vài chục lượt đăng nhập cùng lúc chiếm hết CPU của
+worker và các request khác phải chờ. `hash_password`/`verify_password` gửi việc
+băm sang một process pool dùng chung, giới hạn số tiến trình
+(PASSWORD_HASH_WORKERS) và số việc đang chờ (PASSWORD_HASH_MAX_PENDING): khi pool
+quá tải, request chờ tối đa PASSWORD_HASH_QUEUE_TIMEOUT giây rồi nhận
+`PasswordHashingBusy` thay vì xếp hàng vô hạn.
+
+Thuật toán/chi phí băm lấy từ PASSWORD_HASH_METHOD ('scrypt:32768:8:1',
+'pbkdf2:sha256:600000'...). Hash tạo bằng tham số cũ vẫn kiểm tra được;
+`needs_rehash` cho biết khi nào nên băm lại (lúc đăng nhập thành công).
+
+`hash_many` băm một danh sách lớn mật khẩu (import tài khoản) theo từng nhóm trên
+cùng pool đó: mỗi nhóm đang chạy chiếm một chỗ trong PASSWORD_HASH_MAX_PENDING và
+một lần gọi không giữ quá số tiến trình của pool, nên import không chặn đăng nhập.
+"""
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+# Số mật khẩu tối đa mỗi việc gửi sang pool khi băm hàng loạt
+HASH_MANY_CHUNK_SIZE = 16
+
+# Tham số mặc định của werkzeug khi PASSWORD_HASH_METHOD không ghi đủ
+SCRYPT_DEFAULTS = ("32768", "8", "1")
+
+_executor = None
+_executor_pid = None
+_pending = None
+_lock = threading.Lock()
+
+
+class PasswordHashingBusy(RuntimeError):
+    """Pool băm mật khẩu đang quá tải"""
+
+
+def normalize_method(method):
+    """
+    Ghi đủ tham số của method theo định dạng werkzeug lưu trong hash:
+    'scrypt' -> 'scrypt:32768:8:1', 'pbkdf2' -> 'pbkdf2:sha256:1000000'
+    """
+    name, *params = method.split(":")
+    if name == "scrypt":
+        return ":".join([name, *params, *SCRYPT_DEFAULTS[len(params):]])
+    if name == "pbkdf2":
+        defaults = ("sha256", str(DEFAULT_PBKDF2_ITERATIONS))
+        return ":".join([name, *params, *defaults[len(params):]])
+    return method
+
+
+def password_hash_method():
+    """Method băm mật khẩu đang cấu hình (đã chuẩn hóa)"""
+    return normalize_method(current_app.config.get("PASSWORD_HASH_METHOD") or "scrypt")
+
+
+def _get_executor(config):
+    """Pool dùng chung của tiến trình hiện tại (tạo lại sau khi fork)"""
+    global _executor, _executor_pid, _pending
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            workers = _pool_workers(config)
+            _executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            _executor_pid = os.getpid()
+            _pending = threading.BoundedSemaphore(
+                config.get("PASSWORD_HASH_MAX_PENDING") or workers * 8
+            )
+        return _executor, _pending
+
+
+def _pool_workers(config):
+    return config.get("PASSWORD_HASH_WORKERS") or os.cpu_count() or 1
+
+
+def _submit(executor, pending, config, function, *args):
+    """Gửi một việc sang pool, giữ một chỗ trong `pending` tới khi việc xong"""
+    if not pending.acquire(timeout=config.get("PASSWORD_HASH_QUEUE_TIMEOUT", 10)):
+        raise PasswordHashingBusy("Hệ thống đang bận, vui lòng thử lại sau")
+    try:
+        future = executor.submit(function, *args)
+    except BaseException:
+        pending.release()
+        raise
+    future.add_done_callback(lambda _: pending.release())
+    return future
+
+
+def _run(function, *args):
+    config = current_app.config
+    if not config.get("PASSWORD_HASH_OFFLOAD", True):
+        return function(*args)
+
+    executor, pending = _get_executor(config)
+    try:
+        return _submit(executor, pending, config, function, *args).result()
+    except BrokenProcessPool:
+        # Tiến trình con bị kill: bỏ pool hỏng, lần gọi sau tạo pool mới
+        shutdown_pool()
+        raise
+
+
+def hash_password(password):
+    """Băm mật khẩu bằng method đang cấu hình"""
+    return _run(generate_password_hash, password, password_hash_method())
+
+
+def _hash_chunk(passwords, method):
+    return [generate_password_hash(password, method) for password in passwords]
+
+
+def hash_many(passwords, max_parallel=None):
+    """
+    Băm nhiều mật khẩu trên pool dùng chung, trả về hash theo đúng thứ tự `passwords`.
+
+    Args:
+        passwords (iterable[str]): Các mật khẩu cần băm
+        max_parallel (int): Số nhóm chạy song song tối đa (mặc định PASSWORD_HASH_WORKERS)
+
+    Raises:
+        PasswordHashingBusy: Pool quá tải quá PASSWORD_HASH_QUEUE_TIMEOUT giây
+    """
+    passwords = list(passwords)
+    method = password_hash_method()
+    config = current_app.config
+    if not config.get("PASSWORD_HASH_OFFLOAD", True):
+        return _hash_chunk(passwords, method)
+
+    executor, pending = _get_executor(config)
+    max_parallel = min(max_parallel or _pool_workers(config), _pool_workers(config))
+    hashes = []
+    running = deque()
+    try:
+        for start in range(0, len(passwords), HASH_MANY_CHUNK_SIZE):
+            if len(running) >= max_parallel:
+                hashes.extend(running.popleft().result())
+            chunk = passwords[start:start + HASH_MANY_CHUNK_SIZE]
+            running.append(_submit(executor, pending, config, _hash_chunk, chunk, method))
+        while running:
+            hashes.extend(running.popleft().result())
+    except BrokenProcessPool:
+        shutdown_pool()
+        raise
+    finally:
+        for future in running:
+            future.cancel()
+    return hashes
+
+
+def verify_password(password_hash, password):
+    """Kiểm tra mật khẩu với hash đã lưu (hash tạo bằng method cũ vẫn hợp lệ)"""
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """Hash được tạo bằng method/tham số khác với cấu hình hiện tại"""
+    return password_hash.split("$", 1)[0] != password_hash_method()
+
+
+def shutdown_pool():
+    """Đóng pool dùng chung (test/benchmark)"""
+    global _executor
+    with _lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=False)
+        _executor = None
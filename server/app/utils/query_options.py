@@ -0,0 +1,96 @@
+"""
+Loader options cho các truy vấn danh sách.
+
+Mỗi "shape" tương ứng với các quan hệ mà endpoint sẽ truy cập khi serialize,
+để một trang danh sách chỉ tốn một số truy vấn cố định, không phụ thuộc per_page.
+Quan hệ many-to-one dùng joinedload, collection dùng selectinload để LIMIT
+của phân trang không bị ảnh hưởng.
+"""
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.models import (
+    Contract,
+    MaintenanceRequest,
+    Payment,
+    Registration,
+    Room,
+    User,
+)
+
+
+def _contract_list():
+    registration = joinedload(Contract.registration)
+    room = registration.joinedload(Registration.room)
+    return (
+        registration.joinedload(Registration.student),
+        room.joinedload(Room.building),
+        room.joinedload(Room.room_type),
+        selectinload(Contract.payments),
+    )
+
+
+def _contract_detail():
+    return _contract_list() + (
+        selectinload(Contract.payments).joinedload(Payment.confirmed_by),
+    )
+
+
+def _payment_list():
+    registration = joinedload(Payment.contract).joinedload(Contract.registration)
+    return (
+        registration.joinedload(Registration.student),
+        registration.joinedload(Registration.room).joinedload(Room.building),
+        joinedload(Payment.confirmed_by),
+    )
+
+
+def _registration_list():
+    room = joinedload(Registration.room)
+    return (
+        joinedload(Registration.student),
+        room.joinedload(Room.building),
+        room.joinedload(Room.room_type),
+        joinedload(Registration.contract),
+    )
+
+
+def _maintenance_list():
+    return (
+        joinedload(MaintenanceRequest.student),
+        joinedload(MaintenanceRequest.room).joinedload(Room.building),
+        joinedload(MaintenanceRequest.assigned_to),
+    )
+
+
+def _room_list():
+    return (joinedload(Room.building), joinedload(Room.room_type))
+
+
+def _user_list():
+    return (joinedload(User.role),)
+
+
+# Registry: tên shape -> hàm tạo loader options (tạo lazy vì mapper cần được configure trước)
+LOADER_OPTIONS = {
+    "contract_list": _contract_list,
+    "contract_detail": _contract_detail,
+    "payment_list": _payment_list,
+    "registration_list": _registration_list,
+    "maintenance_list": _maintenance_list,
+    "room_list": _room_list,
+    "user_list": _user_list,
+}
+
+
+def with_loader_options(query, shape):
+    """
+    Áp dụng loader options đã đăng ký cho query.
+
+    Args:
+        query: SQLAlchemy query object
+        shape (str): Tên shape trong LOADER_OPTIONS
+
+    Returns:
+        Query đã gắn options eager-loading.
+    """
+    return query.options(*LOADER_OPTIONS[shape]())
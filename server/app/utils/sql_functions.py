@@ -0,0 +1,29 @@
+"""
+Các hàm SQL dùng chung, biên dịch theo từng dialect (MySQL là mặc định, SQLite cho môi trường local).
+"""
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Integer
+
+
+class days_between(FunctionElement):
+    """Số ngày từ `start` tới `end` (DATEDIFF(end, start))"""
+
+    type = Integer()
+    inherit_cache = True
+    name = "days_between"
+
+
+@compiles(days_between)
+def _compile_days_between(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return f"DATEDIFF({compiler.process(end, **kw)}, {compiler.process(start, **kw)})"
+
+
+@compiles(days_between, "sqlite")
+def _compile_days_between_sqlite(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return (
+        f"CAST(julianday({compiler.process(end, **kw)}) - "
+        f"julianday({compiler.process(start, **kw)}) AS INTEGER)"
+    )
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Đo thời gian tính phương án xếp phòng (`RoomAllocationService.plan`) trên database
+SQLite tạm: mặc định 20 000 đơn pending và 3 000 phòng trong 30 tòa nhà (nam, nữ,
+dùng chung), 5 loại phòng. Phòng được chọn lệch về một số phòng "hot" để phần lớn
+đơn phải xếp sang phòng khác.
+
+    python bench_allocation.py
+    python bench_allocation.py --students 40000 --rooms 6000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models import Building, Registration, Role, Room, RoomType, User
+from app.services.room_allocation_service import RoomAllocationService
+
+BUILDINGS = 30
+ROOM_TYPES = ((2, 2400000), (4, 1800000), (6, 1200000), (8, 900000), (10, 700000))
+
+
+def make_app(database_path):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///" + database_path
+
+    return create_app(BenchConfig)
+
+
+def seed(app, students, rooms):
+    random.seed(1)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        role = Role(role_name="student")
+        db.session.add(role)
+        db.session.flush()
+
+        genders = ("male", "female", "all")
+        db.session.execute(Building.__table__.insert(), [
+            {"building_name": f"Tòa {i}", "gender": genders[i % 3]} for i in range(BUILDINGS)
+        ])
+        db.session.execute(RoomType.__table__.insert(), [
+            {"type_name": f"Phòng {capacity}", "capacity": capacity, "price": price}
+            for capacity, price in ROOM_TYPES
+        ])
+        room_rows = []
+        for i in range(rooms):
+            type_index = random.randrange(len(ROOM_TYPES))
+            room_rows.append({
+                "room_number": f"P{i:05d}",
+                "building_id": 1 + i % BUILDINGS,
+                "room_type_id": 1 + type_index,
+                "status": "available",
+                "current_occupancy": random.randint(0, ROOM_TYPES[type_index][0]),
+            })
+        db.session.execute(Room.__table__.insert(), room_rows)
+
+        db.session.execute(User.__table__.insert(), [
+            {"role_id": role.role_id, "full_name": f"Sinh viên {i}", "email": f"sv{i}@bench",
+             "student_id": f"SV{i:06d}", "password_hash": "x", "gender": ("male", "female")[i % 2],
+             "is_active": True}
+            for i in range(students)
+        ])
+        # Mỗi sinh viên chọn một phòng đúng giới tính, 80% dồn vào 10% số phòng
+        allowed = {
+            gender: [i + 1 for i in range(rooms) if genders[i % BUILDINGS % 3] in (gender, "all")]
+            for gender in ("male", "female")
+        }
+        hot = {gender: room_ids[: max(1, len(room_ids) // 10)] for gender, room_ids in allowed.items()}
+        started = datetime(2024, 8, 1)
+        db.session.execute(Registration.__table__.insert(), [
+            {"student_id": i + 1, "status": "pending",
+             "room_id": random.choice(hot[gender] if random.random() < 0.8 else allowed[gender]),
+             "registration_date": started + timedelta(seconds=i)}
+            for i, gender in ((i, ("male", "female")[i % 2]) for i in range(students))
+        ])
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--rooms", type=int, default=3000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(os.path.join(directory, "bench.db"))
+        seed(app, args.students, args.rooms)
+        with app.app_context():
+            started = time.perf_counter()
+            plan = RoomAllocationService.plan()
+            elapsed = time.perf_counter() - started
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+    summary = plan["summary"]
+    print(f"{args.students} đơn, {args.rooms} phòng: {elapsed:.2f} giây")
+    print(f"xếp được {summary['assigned']}, không xếp được {summary['unassigned']}, "
+          f"mở mới {summary['rooms_opened']} phòng, lấp đầy {summary['rooms_filled']} phòng")
+    print("theo loại khớp:", summary["matches"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Đo kích thước và thời gian nén của các response JSON lớn theo từng encoding.
+
+Script tạo database SQLite tạm (một tòa nhà nhiều phòng, các hợp đồng kèm thanh
+toán), gọi `/api/contracts?per_page=100` và `/api/buildings/<id>/rooms` qua test
+client rồi so sánh kích thước body khi không nén và khi nén gzip/deflate/brotli,
+cùng thời gian nén trung bình của một response.
+
+    python bench_compression.py
+    python bench_compression.py --rooms 500 --contracts 300 --level 9
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models import Building, Contract, Payment, Registration, Role, Room, RoomType, User
+from app.utils.auth import build_token_claims
+from app.utils.compression import BROTLI_AVAILABLE, Compressor
+from flask_jwt_extended import create_access_token
+
+REPEAT = 20
+
+
+def make_app(database_path):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///" + database_path
+        COMPRESS_ENABLED = False
+        CACHE_ENABLED = False
+
+    return create_app(BenchConfig)
+
+
+def seed(app, rooms, contracts):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        roles = {name: Role(role_name=name) for name in ("admin", "student")}
+        building = Building(building_name="Tòa A - Khu ký túc xá trung tâm", gender="all")
+        room_types = [
+            RoomType(type_name=f"Phòng {capacity} người", capacity=capacity, price=600000 * capacity)
+            for capacity in (2, 4, 6, 8)
+        ]
+        db.session.add_all([*roles.values(), building, *room_types])
+        db.session.flush()
+
+        room_objects = [
+            Room(room_number=f"A{i:03d}", building_id=building.building_id,
+                 room_type_id=room_types[i % len(room_types)].room_type_id,
+                 status="available", current_occupancy=0)
+            for i in range(rooms)
+        ]
+        admin = User(role_id=roles["admin"].role_id, full_name="Admin", email="admin@bench",
+                     password_hash="x", gender="male")
+        students = [
+            User(role_id=roles["student"].role_id, full_name=f"Nguyễn Văn Sinh Viên {i}",
+                 email=f"sinhvien{i}@bench.edu.vn", student_id=f"SV{i:06d}", password_hash="x", gender="male")
+            for i in range(contracts)
+        ]
+        db.session.add_all([*room_objects, admin, *students])
+        db.session.flush()
+
+        today = date.today()
+        for i, student in enumerate(students):
+            registration = Registration(student_id=student.user_id, room_id=room_objects[i % rooms].room_id,
+                                        status="approved")
+            db.session.add(registration)
+            db.session.flush()
+            contract = Contract(registration_id=registration.registration_id, contract_code=f"HD{i:06d}",
+                                start_date=today - timedelta(days=30), end_date=today + timedelta(days=150))
+            db.session.add(contract)
+            db.session.flush()
+            db.session.add(Payment(contract_id=contract.contract_id, amount=1200000,
+                                   payment_method="bank_transfer", status="confirmed"))
+        db.session.commit()
+        return building.building_id, create_access_token(
+            identity=str(admin.user_id), additional_claims=build_token_claims(admin)
+        )
+
+
+def measure(body, encoding, config):
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        compressor = Compressor(encoding, config)
+        compressed = compressor.compress(body) + compressor.finish()
+    return len(compressed), (time.perf_counter() - started) / REPEAT * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=300)
+    parser.add_argument("--contracts", type=int, default=200)
+    parser.add_argument("--level", type=int, default=None, help="COMPRESS_LEVEL (gzip/deflate)")
+    parser.add_argument("--quality", type=int, default=None, help="COMPRESS_BROTLI_QUALITY")
+    args = parser.parse_args()
+
+    app = make_app(os.path.join(tempfile.mkdtemp(), "bench_compression.db"))
+    if args.level is not None:
+        app.config["COMPRESS_LEVEL"] = args.level
+    if args.quality is not None:
+        app.config["COMPRESS_BROTLI_QUALITY"] = args.quality
+    building_id, token = seed(app, args.rooms, args.contracts)
+
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    encodings = ("gzip", "deflate", "br") if BROTLI_AVAILABLE else ("gzip", "deflate")
+    if not BROTLI_AVAILABLE:
+        print("(brotli chưa được cài: pip install brotli)")
+
+    print(f"{'endpoint':<32}{'encoding':>10}{'bytes':>10}{'ratio':>8}{'nén (ms)':>10}")
+    for url in ("/api/contracts/?per_page=100", f"/api/buildings/{building_id}/rooms"):
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_data()
+        print(f"{url:<32}{'identity':>10}{len(body):>10}{1:>8.2f}{0:>10.2f}")
+        for encoding in encodings:
+            size, elapsed_ms = measure(body, encoding, app.config)
+            print(f"{'':<32}{encoding:>10}{size:>10}{len(body) / size:>8.2f}{elapsed_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+So sánh thời gian serialize một trang danh sách (mặc định 100 hợp đồng, cùng cấu
+trúc với `GET /api/contracts/`) giữa provider JSON mặc định của Flask (view tự đổi
+Decimal/date/datetime bằng float()/isoformat()) và provider orjson
+(app.utils.json_provider, nhận thẳng Decimal/date/datetime).
+
+    python bench_json.py
+    python bench_json.py --rows 500 --repeat 500
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.utils.json_provider import OrjsonProvider
+
+
+def make_rows(count):
+    today = date.today()
+    return [
+        {
+            "contract_id": i,
+            "contract_code": f"HD{i:06d}",
+            "student": {"user_id": i, "full_name": f"Nguyễn Văn Sinh Viên {i}", "student_id": f"SV{i:06d}",
+                        "email": f"sinhvien{i}@bench.edu.vn"},
+            "room": {"room_id": i % 50, "room_number": f"A{i % 50:03d}", "building_name": "Tòa A",
+                     "room_type": "Phòng 4 người", "price": Decimal("2400000.00")},
+            "start_date": today - timedelta(days=30),
+            "end_date": today + timedelta(days=150),
+            "created_at": datetime(2024, 9, 1, 8, 30) + timedelta(minutes=i),
+            "is_active": True,
+            "is_expired": False,
+            "days_remaining": 150,
+            "duration_months": 6,
+            "total_paid": Decimal("1200000.00"),
+            "payment_count": 1,
+            "pending_payments_count": 0,
+        }
+        for i in range(count)
+    ]
+
+
+def convert(row):
+    """Chuyển đổi từng field như view làm khi dùng provider mặc định"""
+    return {
+        **row,
+        "room": {**row["room"], "price": float(row["room"]["price"])},
+        "start_date": row["start_date"].isoformat(),
+        "end_date": row["end_date"].isoformat(),
+        "created_at": row["created_at"].isoformat(),
+        "total_paid": float(row["total_paid"]),
+    }
+
+
+def page(rows):
+    return {"success": True, "message": "Lấy danh sách hợp đồng thành công",
+            "data": {"contracts": rows, "pagination": {"page": 1, "per_page": len(rows)}},
+            "timestamp": datetime.utcnow().isoformat()}
+
+
+def measure(encode, repeat):
+    encode()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = encode()
+    return len(body), (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default, fast = DefaultJSONProvider(app), OrjsonProvider(app)
+    rows = make_rows(args.rows)
+
+    cases = {
+        "mặc định + float()/isoformat()": lambda: default.response(page([convert(row) for row in rows])).get_data(),
+        "orjson": lambda: fast.response(page(rows)).get_data(),
+    }
+    results = {name: measure(encode, args.repeat) for name, encode in cases.items()}
+
+    baseline = results["mặc định + float()/isoformat()"][1]
+    print(f"{args.rows} dòng, {args.repeat} lần")
+    print(f"{'provider':<34}{'bytes':>10}{'ms/lần':>10}{'nhanh hơn':>11}")
+    for name, (size, elapsed_ms) in results.items():
+        print(f"{name:<34}{size:>10}{elapsed_ms:>10.3f}{baseline / elapsed_ms:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Đo thông lượng đăng nhập khi băm mật khẩu trên thread request và khi gửi sang
+process pool (PASSWORD_HASH_OFFLOAD).
+
+Script tạo database SQLite tạm với một số user, chạy nhiều thread đăng nhập cùng
+lúc qua test client, đồng thời một thread khác liên tục gọi `GET /api/auth/me`
+(request nhẹ, không băm mật khẩu) để đo độ trễ của các request khác trong cùng
+worker trong lúc đăng nhập dồn dập.
+
+    python bench_login.py
+    python bench_login.py --logins 200 --concurrency 16 --method scrypt:16384:8:1
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models import Role, User
+from app.utils.auth import build_token_claims
+from app.utils.password_hashing import normalize_method, shutdown_pool
+from flask_jwt_extended import create_access_token
+from werkzeug.security import generate_password_hash
+
+PASSWORD = "benchmark-password"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def make_app(database_path, method, offload, workers):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///" + database_path
+        PASSWORD_HASH_METHOD = method
+        PASSWORD_HASH_OFFLOAD = offload
+        PASSWORD_HASH_WORKERS = workers
+
+    return create_app(BenchConfig)
+
+
+def seed(app, users, method):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        role = Role(role_name="student")
+        db.session.add(role)
+        db.session.flush()
+        password_hash = generate_password_hash(PASSWORD, method=normalize_method(method))
+        for i in range(users):
+            db.session.add(
+                User(
+                    role_id=role.role_id,
+                    full_name=f"Bench {i}",
+                    email=f"bench{i}@example.com",
+                    password_hash=password_hash,
+                    gender="other",
+                )
+            )
+        db.session.commit()
+        user = User.query.first()
+        return create_access_token(identity=str(user.user_id), additional_claims=build_token_claims(user))
+
+
+def run(app, token, users, logins, concurrency):
+    login_latencies = []
+    probe_latencies = []
+    done = threading.Event()
+
+    def login(i):
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.post(
+            "/api/auth/login",
+            json={"email": f"bench{i % users}@example.com", "password": PASSWORD},
+        )
+        login_latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.get_json()
+
+    def probe():
+        client = app.test_client()
+        headers = {"Authorization": f"Bearer {token}"}
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get("/api/auth/me", headers=headers)
+            probe_latencies.append(time.perf_counter() - started)
+            time.sleep(0.01)
+
+    # Khởi động pool (spawn) trước khi đo
+    login(0)
+    login_latencies.clear()
+
+    probe_thread = threading.Thread(target=probe)
+    probe_thread.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    probe_thread.join()
+
+    return {
+        "logins_per_second": logins / elapsed,
+        "login_p50_ms": statistics.median(login_latencies) * 1000,
+        "login_p95_ms": percentile(login_latencies, 95) * 1000,
+        "probe_p50_ms": statistics.median(probe_latencies) * 1000 if probe_latencies else 0.0,
+        "probe_p95_ms": percentile(probe_latencies, 95) * 1000,
+        "probe_requests": len(probe_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--method", default="scrypt", help="PASSWORD_HASH_METHOD")
+    parser.add_argument("--workers", type=int, default=None, help="PASSWORD_HASH_WORKERS (mặc định: số CPU)")
+    args = parser.parse_args()
+
+    database_path = os.path.join(tempfile.mkdtemp(), "bench_login.db")
+    print(
+        f"{args.logins} lượt đăng nhập, {args.concurrency} thread, method {normalize_method(args.method)}, "
+        f"{os.cpu_count()} CPU"
+    )
+    print(f"{'':<22}{'login/s':>9}{'login p50':>11}{'login p95':>11}{'probe p50':>11}{'probe p95':>11}")
+    for label, offload in (("request thread", False), ("process pool", True)):
+        app = make_app(database_path, args.method, offload, args.workers)
+        token = seed(app, args.users, args.method)
+        result = run(app, token, args.users, args.logins, args.concurrency)
+        shutdown_pool()
+        print(
+            f"{label:<22}{result['logins_per_second']:>9.1f}"
+            f"{result['login_p50_ms']:>9.0f}ms{result['login_p95_ms']:>9.0f}ms"
+            f"{result['probe_p50_ms']:>9.1f}ms{result['probe_p95_ms']:>9.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Fixture dùng chung cho các test pytest: app trên file SQLite trong `tmp_path`
+(pytest tự dọn), test client và header JWT theo role.
+
+    def test_rooms(client, auth_headers):
+        response = client.get("/api/rooms/", headers=auth_headers("admin"))
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models import Role, User
+from app.utils.auth import build_token_claims
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """
+    Factory tạo app với database `tmp_path/app.db` đã có bảng.
+    Tham số keyword ghi đè config, ví dụ `make_app(COMPRESS_ENABLED=False)`.
+    """
+    apps = []
+
+    def factory(**overrides):
+        config = type("Config", (TestingConfig,), {
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + str(tmp_path / "app.db"),
+            **overrides,
+        })
+        app = create_app(config)
+        with app.app_context():
+            db.create_all()
+        apps.append(app)
+        return app
+
+    yield factory
+
+    # Đóng kết nối để file SQLite trong tmp_path được giải phóng
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(app):
+    """
+    Factory `auth_headers(role_name="admin", **user_fields)`: tạo một user mới có role
+    đó (tạo role nếu chưa có) và trả về header Authorization kèm access token.
+    """
+    def factory(role_name="admin", **user_fields):
+        with app.app_context():
+            role = Role.query.filter_by(role_name=role_name).first()
+            if role is None:
+                role = Role(role_name=role_name)
+                db.session.add(role)
+                db.session.flush()
+            number = User.query.count() + 1
+            fields = {
+                "full_name": f"{role_name} {number}",
+                "email": f"{role_name}{number}@test",
+                "password_hash": "x",
+                "gender": "male",
+                **user_fields,
+            }
+            user = User(role_id=role.role_id, **fields)
+            db.session.add(user)
+            db.session.commit()
+            token = create_access_token(identity=str(user.user_id), additional_claims=build_token_claims(user))
+        return {"Authorization": f"Bearer {token}"}
+
+    return factory
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+In query plan (EXPLAIN) của các truy vấn mà những endpoint danh sách chính thực thi.
+
+Script gọi từng endpoint qua test client với token admin, ghi lại các câu SQL
+đã chạy rồi EXPLAIN lại từng câu trên cùng database. Dùng để so sánh plan
+trước/sau khi thêm index.
+
+    python explain_queries.py                 # dùng admin đầu tiên trong DB
+    python explain_queries.py admin@example.com
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.extensions import db
+from app.models import Role, User
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+LISTING_ENDPOINTS = [
+    "/api/registrations/",
+    "/api/registrations/?status=pending",
+    "/api/payments/",
+    "/api/payments/?status=pending",
+    "/api/contracts/",
+    "/api/contracts/?status=active",
+    "/api/contracts/?status=expiring&sort=days_remaining&order=asc",
+    "/api/contracts/expiring-soon",
+    "/api/maintenance/",
+    "/api/maintenance/?status=pending",
+    "/api/rooms/",
+    "/api/rooms/?building_id=1&status=available",
+    "/api/buildings/",
+    "/api/room-types/",
+    "/api/users/",
+]
+
+
+def explain_prefix(dialect_name):
+    return "EXPLAIN QUERY PLAN " if dialect_name == "sqlite" else "EXPLAIN "
+
+
+def main():
+    app = create_app()
+
+    with app.app_context():
+        email = sys.argv[1] if len(sys.argv) > 1 else None
+        query = User.query.join(Role).filter(Role.role_name == "admin")
+        if email:
+            query = query.filter(User.email == email)
+        admin = query.first()
+        if not admin:
+            print("Không tìm thấy tài khoản admin")
+            return 1
+
+        token = create_access_token(identity=str(admin.user_id))
+        prefix = explain_prefix(db.engine.dialect.name)
+
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append((statement, parameters))
+
+        event.listen(db.engine, "before_cursor_execute", capture)
+        client = app.test_client()
+
+        for url in LISTING_ENDPOINTS:
+            statements.clear()
+            response = client.get(url, headers={"Authorization": f"Bearer {token}"})
+            captured = list(statements)
+
+            print("=" * 80)
+            print(f"GET {url} -> {response.status_code} ({len(captured)} truy vấn)")
+
+            with db.engine.connect() as connection:
+                for statement, parameters in captured:
+                    print("-" * 80)
+                    print(" ".join(statement.split())[:300])
+                    rows = connection.exec_driver_sql(prefix + statement, parameters).all()
+                    for row in rows:
+                        print("    ", tuple(row))
+
+        event.remove(db.engine, "before_cursor_execute", capture)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""add indexes for listing filters and sorts
+
+Các bảng gốc được tạo bằng schema.sql nên đây là revision đầu tiên; trên database
+có sẵn chỉ cần chạy `flask db upgrade`.
+
+Revision ID: 3f1c2a7d9b10
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a7d9b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (tên index, bảng, các cột) - giữ đồng bộ với __table_args__ của model
+INDEXES = [
+    # GET /registrations: student lọc theo student_id (+ status khi kiểm tra đơn đang mở),
+    # admin lọc theo status, cả hai sắp xếp theo registration_date
+    ('ix_registrations_student_id_status', 'registrations', ['student_id', 'status']),
+    ('ix_registrations_status_registration_date', 'registrations', ['status', 'registration_date']),
+    ('ix_registrations_registration_date', 'registrations', ['registration_date']),
+    # GET /payments: lọc theo status, sắp xếp theo payment_date;
+    # payments của hợp đồng (selectinload, total_paid) tra theo contract_id + status
+    ('ix_payments_contract_id_status', 'payments', ['contract_id', 'status']),
+    ('ix_payments_status_payment_date', 'payments', ['status', 'payment_date']),
+    ('ix_payments_payment_date', 'payments', ['payment_date']),
+    # GET /contracts: hết hạn / sắp hết hạn theo end_date, đang hiệu lực theo khoảng start/end,
+    # mặc định sắp xếp theo created_at
+    ('ix_contracts_end_date', 'contracts', ['end_date']),
+    ('ix_contracts_start_date_end_date', 'contracts', ['start_date', 'end_date']),
+    ('ix_contracts_created_at', 'contracts', ['created_at']),
+    # GET /maintenance: lọc theo status / nhân viên được giao, sắp xếp theo request_date
+    ('ix_maintenance_requests_status_request_date', 'maintenance_requests', ['status', 'request_date']),
+    ('ix_maintenance_requests_assigned_to_user_id_request_date', 'maintenance_requests',
+     ['assigned_to_user_id', 'request_date']),
+    ('ix_maintenance_requests_request_date', 'maintenance_requests', ['request_date']),
+    # GET /rooms, /buildings/<id>/rooms: lọc theo building_id + status hoặc chỉ status
+    ('ix_rooms_building_id_status', 'rooms', ['building_id', 'status']),
+    ('ix_rooms_status', 'rooms', ['status']),
+]
+
+# Trên MySQL, index tự sinh cho foreign key có thể bị bỏ khi đã có index composite
+# bắt đầu bằng cột đó; khi downgrade phải tạo lại index đơn trước khi drop composite.
+FOREIGN_KEY_INDEXES = {
+    'ix_registrations_student_id_status': ('ix_registrations_student_id', 'registrations', ['student_id']),
+    'ix_payments_contract_id_status': ('ix_payments_contract_id', 'payments', ['contract_id']),
+    'ix_maintenance_requests_assigned_to_user_id_request_date': (
+        'ix_maintenance_requests_assigned_to_user_id', 'maintenance_requests', ['assigned_to_user_id']),
+    'ix_rooms_building_id_status': ('ix_rooms_building_id', 'rooms', ['building_id']),
+}
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    is_mysql = op.get_bind().dialect.name == 'mysql'
+    for name, table, columns in reversed(INDEXES):
+        if is_mysql and name in FOREIGN_KEY_INDEXES:
+            fk_name, fk_table, fk_columns = FOREIGN_KEY_INDEXES[name]
+            op.create_index(fk_name, fk_table, fk_columns, unique=False)
+        op.drop_index(name, table_name=table)
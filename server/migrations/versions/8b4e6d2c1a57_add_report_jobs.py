@@ -0,0 +1,46 @@
+"""add report_jobs table
+
+Revision ID: 8b4e6d2c1a57
+Revises: 3f1c2a7d9b10
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4e6d2c1a57'
+down_revision = '3f1c2a7d9b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'report_jobs',
+        sa.Column('job_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('report_type', sa.String(length=50), nullable=False),
+        sa.Column('params', sa.Text(), nullable=True),
+        sa.Column('params_hash', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('progress', sa.Integer(), nullable=True),
+        sa.Column('total', sa.Integer(), nullable=True),
+        sa.Column('file_path', sa.String(length=255), nullable=True),
+        sa.Column('file_name', sa.String(length=255), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('requested_by_user_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['requested_by_user_id'], ['users.user_id']),
+        sa.PrimaryKeyConstraint('job_id'),
+    )
+    op.create_index('ix_report_jobs_status_created_at', 'report_jobs', ['status', 'created_at'], unique=False)
+    op.create_index('ix_report_jobs_report_type_params_hash', 'report_jobs', ['report_type', 'params_hash'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_report_jobs_report_type_params_hash', table_name='report_jobs')
+    op.drop_index('ix_report_jobs_status_created_at', table_name='report_jobs')
+    op.drop_table('report_jobs')
@@ -0,0 +1,113 @@
+"""add dashboard_counters table
+
+Revision ID: a4c8e2f6b9d3
+Revises: d7a2f4b8c6e1
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e2f6b9d3'
+down_revision = 'd7a2f4b8c6e1'
+branch_labels = None
+depends_on = None
+
+REGISTRATION_STATUSES = ('pending', 'approved', 'rejected')
+PAYMENT_STATUSES = ('pending', 'confirmed', 'failed')
+MAINTENANCE_STATUSES = ('pending', 'assigned', 'in_progress', 'completed', 'cancelled')
+
+# Các bảng nguồn theo schema tại revision này (không import model của ứng dụng)
+rooms = sa.table('rooms', sa.column('room_id'), sa.column('status'), sa.column('current_occupancy'))
+contracts = sa.table('contracts', sa.column('contract_id'))
+roles = sa.table('roles', sa.column('role_id'), sa.column('role_name'))
+users = sa.table('users', sa.column('user_id'), sa.column('role_id'))
+registrations = sa.table('registrations', sa.column('registration_id'), sa.column('status'))
+payments = sa.table('payments', sa.column('payment_id'), sa.column('status'), sa.column('amount'))
+maintenance_requests = sa.table('maintenance_requests', sa.column('request_id'), sa.column('status'))
+
+
+def _count_if(condition):
+    return sa.func.coalesce(sa.func.sum(sa.case((condition, 1), else_=0)), 0)
+
+
+def _compute_counters(connection):
+    """Tính counter từ bảng nguồn, cùng quy tắc với CounterService.compute_counters()"""
+    counters = {}
+
+    total, occupied, available, maintenance = connection.execute(sa.select(
+        sa.func.count(rooms.c.room_id),
+        _count_if(rooms.c.current_occupancy > 0),
+        _count_if(rooms.c.status == 'available'),
+        _count_if(rooms.c.status == 'maintenance'),
+    )).one()
+    counters['rooms.total'] = total
+    counters['rooms.available'] = available
+    counters['rooms.maintenance'] = maintenance
+    counters['rooms.occupied'] = occupied
+
+    counters['contracts.total'] = connection.execute(sa.select(sa.func.count(contracts.c.contract_id))).scalar()
+
+    for role_name, count in connection.execute(
+        sa.select(roles.c.role_name, sa.func.count(users.c.user_id))
+        .select_from(roles.outerjoin(users, users.c.role_id == roles.c.role_id))
+        .group_by(roles.c.role_name)
+    ):
+        counters[f'users.role.{role_name}'] = count
+
+    registration_counts = dict(connection.execute(
+        sa.select(registrations.c.status, sa.func.count(registrations.c.registration_id))
+        .group_by(registrations.c.status)
+    ).all())
+    for status in set(REGISTRATION_STATUSES) | set(registration_counts):
+        counters[f'registrations.{status}'] = registration_counts.get(status, 0)
+
+    payment_totals = {
+        status: (count, amount)
+        for status, count, amount in connection.execute(
+            sa.select(payments.c.status, sa.func.count(payments.c.payment_id),
+                      sa.func.coalesce(sa.func.sum(payments.c.amount), 0))
+            .group_by(payments.c.status)
+        )
+    }
+    counters['payments.total'] = sum(count for count, _ in payment_totals.values())
+    for status in set(PAYMENT_STATUSES) | set(payment_totals):
+        count, amount = payment_totals.get(status, (0, 0))
+        counters[f'payments.{status}.count'] = count
+        counters[f'payments.{status}.amount'] = amount or 0
+
+    maintenance_counts = dict(connection.execute(
+        sa.select(maintenance_requests.c.status, sa.func.count(maintenance_requests.c.request_id))
+        .group_by(maintenance_requests.c.status)
+    ).all())
+    counters['maintenance.total'] = sum(maintenance_counts.values())
+    for status in set(MAINTENANCE_STATUSES) | set(maintenance_counts):
+        counters[f'maintenance.{status}'] = maintenance_counts.get(status, 0)
+
+    return counters
+
+
+def upgrade():
+    dashboard_counters = op.create_table(
+        'dashboard_counters',
+        sa.Column('counter_key', sa.String(length=100), nullable=False),
+        sa.Column('value', sa.Numeric(precision=15, scale=2), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('counter_key'),
+    )
+
+    # Khởi tạo counter từ dữ liệu hiện có (tương đương `flask counters rebuild`)
+    counters = _compute_counters(op.get_bind())
+    now = datetime.utcnow()
+    op.bulk_insert(
+        dashboard_counters,
+        [{'counter_key': key, 'value': value or 0, 'updated_at': now} for key, value in counters.items()],
+    )
+
+
+def downgrade():
+    op.drop_table('dashboard_counters')
@@ -0,0 +1,41 @@
+"""add registration_tickets table
+
+Revision ID: c5d1e9f0a3b2
+Revises: 8b4e6d2c1a57
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d1e9f0a3b2'
+down_revision = '8b4e6d2c1a57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'registration_tickets',
+        sa.Column('ticket_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('room_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('message', sa.String(length=255), nullable=True),
+        sa.Column('registration_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['student_id'], ['users.user_id']),
+        sa.ForeignKeyConstraint(['registration_id'], ['registrations.registration_id']),
+        sa.PrimaryKeyConstraint('ticket_id'),
+    )
+    op.create_index('ix_registration_tickets_status_ticket_id', 'registration_tickets', ['status', 'ticket_id'], unique=False)
+    op.create_index('ix_registration_tickets_student_id_status', 'registration_tickets', ['student_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_registration_tickets_student_id_status', table_name='registration_tickets')
+    op.drop_index('ix_registration_tickets_status_ticket_id', table_name='registration_tickets')
+    op.drop_table('registration_tickets')
@@ -0,0 +1,43 @@
+"""add payments.billing_period
+
+Revision ID: d7a2f4b8c6e1
+Revises: c5d1e9f0a3b2
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a2f4b8c6e1'
+down_revision = 'c5d1e9f0a3b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payments') as batch_op:
+        batch_op.add_column(sa.Column('billing_period', sa.String(length=7), nullable=True))
+
+    # Khoản thanh toán đầu tiên của mỗi hợp đồng (tạo khi duyệt đơn) là tiền tháng bắt đầu
+    connection = op.get_bind()
+    first_payments = connection.execute(sa.text(
+        "SELECT MIN(p.payment_id), c.start_date FROM payments p "
+        "JOIN contracts c ON c.contract_id = p.contract_id "
+        "GROUP BY p.contract_id, c.start_date"
+    )).all()
+    if first_payments:
+        connection.execute(
+            sa.text("UPDATE payments SET billing_period = :period WHERE payment_id = :payment_id"),
+            [{"payment_id": payment_id, "period": str(start_date)[:7]} for payment_id, start_date in first_payments],
+        )
+
+    with op.batch_alter_table('payments') as batch_op:
+        batch_op.create_unique_constraint('uq_payments_contract_id_billing_period', ['contract_id', 'billing_period'])
+
+
+def downgrade():
+    with op.batch_alter_table('payments') as batch_op:
+        batch_op.drop_constraint('uq_payments_contract_id_billing_period', type_='unique')
+        batch_op.drop_column('billing_period')
@@ -0,0 +1,36 @@
+"""add table_versions table
+
+Revision ID: e3b9c1d5a7f2
+Revises: a4c8e2f6b9d3
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b9c1d5a7f2'
+down_revision = 'a4c8e2f6b9d3'
+branch_labels = None
+depends_on = None
+
+TABLES = (
+    'roles', 'users', 'buildings', 'room_types', 'rooms', 'registrations',
+    'contracts', 'payments', 'maintenance_requests', 'report_jobs', 'registration_tickets',
+)
+
+
+def upgrade():
+    table_versions = op.create_table(
+        'table_versions',
+        sa.Column('table_name', sa.String(length=64), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('table_name'),
+    )
+    op.bulk_insert(table_versions, [{'table_name': name, 'version': 0} for name in TABLES])
+
+
+def downgrade():
+    op.drop_table('table_versions')
@@ -0,0 +1,29 @@
+"""add replica_heartbeat table
+
+Revision ID: f2c6e8a4d1b5
+Revises: e3b9c1d5a7f2
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6e8a4d1b5'
+down_revision = 'e3b9c1d5a7f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'replica_heartbeat',
+        sa.Column('heartbeat_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('beat_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('heartbeat_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('replica_heartbeat')
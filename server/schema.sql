@@ -4,6 +4,10 @@ CREATE DATABASE IF NOT EXISTS qlktx;
 
 USE qlktx;
 
+-- Các index trong file này trùng với migration đầu tiên trong migrations/versions.
+-- Sau khi tạo database bằng file này, chạy `flask --app application db stamp head`
+-- để Flask-Migrate không tạo lại chúng.
+
 -- =================================================================
 -- 1. BẢNG QUẢN LÝ NGƯỜI DÙNG VÀ PHÂN QUYỀN
 -- =================================================================
@@ -57,7 +61,9 @@ CREATE TABLE rooms (
     status VARCHAR(50) DEFAULT 'available', -- 'available', 'occupied', 'pending_approval', 'maintenance'
     current_occupancy INT DEFAULT 0,
     FOREIGN KEY (building_id) REFERENCES buildings (building_id),
-    FOREIGN KEY (room_type_id) REFERENCES room_types (room_type_id)
+    FOREIGN KEY (room_type_id) REFERENCES room_types (room_type_id),
+    INDEX ix_rooms_building_id_status (building_id, status),
+    INDEX ix_rooms_status (status)
 );
 
 -- =================================================================
@@ -72,7 +78,10 @@ CREATE TABLE registrations (
     status VARCHAR(50) DEFAULT 'pending', -- 'pending', 'approved', 'rejected'
     registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (student_id) REFERENCES users (user_id),
-    FOREIGN KEY (room_id) REFERENCES rooms (room_id)
+    FOREIGN KEY (room_id) REFERENCES rooms (room_id),
+    INDEX ix_registrations_student_id_status (student_id, status),
+    INDEX ix_registrations_status_registration_date (status, registration_date),
+    INDEX ix_registrations_registration_date (registration_date)
 );
 
 -- Bảng lưu hợp đồng
@@ -83,7 +92,10 @@ CREATE TABLE contracts (
     start_date DATE NOT NULL,
     end_date DATE NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (registration_id) REFERENCES registrations (registration_id)
+    FOREIGN KEY (registration_id) REFERENCES registrations (registration_id),
+    INDEX ix_contracts_end_date (end_date),
+    INDEX ix_contracts_start_date_end_date (start_date, end_date),
+    INDEX ix_contracts_created_at (created_at)
 );
 
 -- Bảng lưu thông tin thanh toán
@@ -96,8 +108,13 @@ CREATE TABLE payments (
     status VARCHAR(50) DEFAULT 'pending', -- 'pending', 'confirmed', 'failed'
     proof_image_url VARCHAR(255), -- URL ảnh chụp màn hình giao dịch
     confirmed_by_user_id INT, -- ID người xác nhận
+    billing_period VARCHAR(7), -- Kỳ thu 'YYYY-MM' (NULL: thanh toán không theo kỳ)
     FOREIGN KEY (contract_id) REFERENCES contracts (contract_id),
-    FOREIGN KEY (confirmed_by_user_id) REFERENCES users (user_id)
+    FOREIGN KEY (confirmed_by_user_id) REFERENCES users (user_id),
+    UNIQUE KEY uq_payments_contract_id_billing_period (contract_id, billing_period),
+    INDEX ix_payments_contract_id_status (contract_id, status),
+    INDEX ix_payments_status_payment_date (status, payment_date),
+    INDEX ix_payments_payment_date (payment_date)
 );
 
 -- =================================================================
@@ -117,5 +134,78 @@ CREATE TABLE maintenance_requests (
     completed_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (student_id) REFERENCES users (user_id),
     FOREIGN KEY (room_id) REFERENCES rooms (room_id),
-    FOREIGN KEY (assigned_to_user_id) REFERENCES users (user_id)
+    FOREIGN KEY (assigned_to_user_id) REFERENCES users (user_id),
+    INDEX ix_maintenance_requests_status_request_date (status, request_date),
+    INDEX ix_maintenance_requests_assigned_to_user_id_request_date (assigned_to_user_id, request_date),
+    INDEX ix_maintenance_requests_request_date (request_date)
+);
+
+-- =================================================================
+-- 5. BẢNG THỐNG KÊ
+-- =================================================================
+
+-- Bộ đếm dashboard được cập nhật tăng dần bởi các thao tác ghi
+-- (tính lại bằng: flask --app application counters rebuild)
+CREATE TABLE dashboard_counters (
+    counter_key VARCHAR(100) PRIMARY KEY, -- 'registrations.pending', 'payments.confirmed.amount', ...
+    value DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Phiên bản của từng bảng, tăng mỗi lần bảng bị ghi (ETag của các endpoint GET)
+CREATE TABLE table_versions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+INSERT INTO table_versions (table_name) VALUES
+    ('roles'), ('users'), ('buildings'), ('room_types'), ('rooms'), ('registrations'),
+    ('contracts'), ('payments'), ('maintenance_requests'), ('report_jobs'), ('registration_tickets');
+
+-- Thời điểm ghi định kỳ trên primary; replica trễ bao lâu thì giá trị đọc từ replica cũ bấy nhiêu
+CREATE TABLE replica_heartbeat (
+    heartbeat_id INT PRIMARY KEY,
+    beat_at DATETIME NOT NULL -- UTC
+);
+
+-- =================================================================
+-- 6. BẢNG XỬ LÝ NỀN
+-- =================================================================
+
+-- Report job chạy nền (worker: flask --app application reports worker)
+CREATE TABLE report_jobs (
+    job_id INT PRIMARY KEY AUTO_INCREMENT,
+    report_type VARCHAR(50) NOT NULL, -- 'contracts_excel'
+    params TEXT, -- JSON tham số của báo cáo
+    params_hash VARCHAR(64) NOT NULL, -- sha256(report_type + params), dùng để tái sử dụng kết quả
+    status VARCHAR(50) NOT NULL DEFAULT 'pending', -- 'pending', 'running', 'completed', 'failed'
+    progress INT DEFAULT 0,
+    total INT,
+    file_path VARCHAR(255),
+    file_name VARCHAR(255),
+    error_message TEXT,
+    requested_by_user_id INT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP NULL,
+    finished_at TIMESTAMP NULL,
+    FOREIGN KEY (requested_by_user_id) REFERENCES users (user_id),
+    INDEX ix_report_jobs_status_created_at (status, created_at),
+    INDEX ix_report_jobs_report_type_params_hash (report_type, params_hash)
+);
+
+-- Hàng đợi đăng ký phòng giờ cao điểm (allocator: flask --app application registrations allocate)
+CREATE TABLE registration_tickets (
+    ticket_id INT PRIMARY KEY AUTO_INCREMENT, -- Thứ tự đến
+    student_id INT NOT NULL,
+    room_id INT NOT NULL, -- Chưa kiểm tra khi xếp hàng
+    status VARCHAR(50) NOT NULL DEFAULT 'queued', -- 'queued', 'accepted', 'rejected'
+    message VARCHAR(255), -- Lý do từ chối
+    registration_id INT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP NULL,
+    FOREIGN KEY (student_id) REFERENCES users (user_id),
+    FOREIGN KEY (registration_id) REFERENCES registrations (registration_id),
+    INDEX ix_registration_tickets_status_ticket_id (status, ticket_id),
+    INDEX ix_registration_tickets_student_id_status (student_id, status)
 );
@@ -0,0 +1,31 @@
+"""
+Kiểm tra phân quyền theo claim trong JWT (app.utils.auth): khóa tài khoản hoặc đổi
+role có hiệu lực trước khi token hết hạn.
+    python -m pytest -q test_auth_state.py
+"""
+from app.extensions import db
+from app.models import User
+
+
+def test_deactivation_applies_after_recheck_interval(app, client, auth_headers):
+    headers = auth_headers("admin")
+    assert client.get("/api/users/", headers=headers).status_code == 200
+
+    # Ghi thẳng vào database (worker khác, CLI): token vẫn dùng được tới lần đối chiếu sau
+    with app.app_context():
+        db.session.get(User, 1).is_active = False
+        db.session.commit()
+    assert client.get("/api/users/", headers=headers).status_code == 200
+
+    app.config["AUTH_RECHECK_SECONDS"] = 0
+    assert client.get("/api/users/", headers=headers).status_code == 403
+
+
+def test_role_change_through_api_applies_immediately(client, auth_headers):
+    admin, other = auth_headers("admin"), auth_headers("admin")
+    assert client.get("/api/users/", headers=other).status_code == 200
+
+    auth_headers("student")
+    response = client.put("/api/users/2", json={"role_name": "student"}, headers=admin)
+    assert response.status_code == 200, response.get_json()
+    assert client.get("/api/users/", headers=other).status_code == 403
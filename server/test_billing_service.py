@@ -0,0 +1,129 @@
+"""
+Kiểm tra tạo khoản tiền phòng theo kỳ (app.services.billing_service): tính theo tỷ lệ
+ngày hiệu lực, chạy lại không tạo trùng, bỏ qua hợp đồng đã chấm dứt/hết hạn,
+dry_run và bộ đếm thanh toán pending.
+    python -m pytest -q test_billing_service.py
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.extensions import db
+from app.models import Building, Contract, Payment, Registration, Role, Room, RoomType, User
+from app.services.billing_service import BillingService
+from app.services.counter_service import CounterService
+
+PERIOD = "2024-09"
+
+# Mã hợp đồng: (ngày bắt đầu, ngày kết thúc). Kỳ 2024-09 có 30 ngày, giá phòng 3 000 000.
+CONTRACTS = {
+    "FULL": (date(2024, 8, 1), date(2025, 1, 31)),
+    "MID_START": (date(2024, 9, 16), date(2025, 1, 31)),
+    # Chấm dứt trước hạn (POST /contracts/<id>/terminate dời end_date về ngày chấm dứt)
+    "TERMINATED_MID": (date(2024, 8, 1), date(2024, 9, 10)),
+    "TERMINATED": (date(2024, 8, 1), date(2024, 8, 20)),
+    "EXPIRED": (date(2024, 1, 1), date(2024, 6, 30)),
+    "NOT_STARTED": (date(2024, 10, 1), date(2025, 3, 31)),
+}
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        role = Role(role_name="student")
+        building = Building(building_name="Tòa A", gender="all")
+        room_type = RoomType(type_name="Phòng 8", capacity=8, price=Decimal("3000000"))
+        db.session.add_all([role, building, room_type])
+        db.session.flush()
+        room = Room(room_number="101", building_id=building.building_id, room_type_id=room_type.room_type_id,
+                    status="available", current_occupancy=len(CONTRACTS))
+        db.session.add(room)
+        db.session.flush()
+        for i, (code, (start_date, end_date)) in enumerate(CONTRACTS.items()):
+            student = User(role_id=role.role_id, full_name=f"Sinh viên {i}", email=f"sv{i}@test",
+                           password_hash="x", gender="male")
+            db.session.add(student)
+            db.session.flush()
+            registration = Registration(student_id=student.user_id, room_id=room.room_id, status="approved")
+            db.session.add(registration)
+            db.session.flush()
+            contract = Contract(registration_id=registration.registration_id, contract_code=code,
+                                start_date=start_date, end_date=end_date)
+            db.session.add(contract)
+            db.session.flush()
+            if code == "FULL":
+                # Khoản thu lẻ không theo kỳ, có sẵn trước khi chạy
+                db.session.add(Payment(contract_id=contract.contract_id, amount=Decimal("500000"),
+                                       status="pending"))
+        db.session.commit()
+        CounterService.rebuild()
+    return app
+
+
+def billed_amounts():
+    return {
+        code: float(amount)
+        for code, amount in db.session.query(Contract.contract_code, Payment.amount)
+        .join(Payment, Payment.contract_id == Contract.contract_id)
+        .filter(Payment.billing_period == PERIOD)
+    }
+
+
+def test_prorates_partial_months_and_skips_inactive_contracts(app):
+    with app.app_context():
+        result = BillingService.run(PERIOD)
+
+        assert result == {"period": PERIOD, "payments": 3, "amount": 5500000.0, "dry_run": False}
+        assert billed_amounts() == {"FULL": 3000000.0, "MID_START": 1500000.0, "TERMINATED_MID": 1000000.0}
+        assert {p.status for p in Payment.query.filter_by(billing_period=PERIOD)} == {"pending"}
+
+
+def test_second_run_creates_nothing(app):
+    with app.app_context():
+        BillingService.run(PERIOD)
+        result = BillingService.run(PERIOD)
+
+        assert result["payments"] == 0 and result["amount"] == 0.0
+        assert Payment.query.filter_by(billing_period=PERIOD).count() == 3
+        assert Payment.query.count() == 4
+
+
+def test_dry_run_writes_nothing(app):
+    with app.app_context():
+        before = CounterService.get_counters()
+        result = BillingService.run(PERIOD, dry_run=True)
+
+        assert result == {"period": PERIOD, "payments": 3, "amount": 5500000.0, "dry_run": True}
+        assert Payment.query.count() == 1
+        assert CounterService.get_counters() == before
+
+
+def test_pending_counters_match_source(app):
+    with app.app_context():
+        BillingService.run(PERIOD)
+        stored = CounterService.get_counters()
+        expected = CounterService.compute_counters()
+
+        for key in ("payments.total", "payments.pending.count", "payments.pending.amount"):
+            assert float(stored[key]) == float(expected[key]), key
+        assert stored.count("payments.pending.count") == 4
+        assert stored.amount("payments.pending.amount") == 6000000.0
+
+
+@pytest.mark.parametrize("period", ["2024-9", "2024-13", "09-2024"])
+def test_invalid_period(app, period):
+    with app.app_context():
+        with pytest.raises(ValueError, match="YYYY-MM"):
+            BillingService.run(period)
+
+
+def test_endpoint(client, auth_headers):
+    headers = auth_headers("admin")
+    response = client.post("/api/payments/billing-run", json={"period": PERIOD, "dry_run": True}, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["data"]["billing_run"]["payments"] == 3
+
+    response = client.post("/api/payments/billing-run", json={"period": "2024/09"}, headers=headers)
+    assert response.status_code == 400
@@ -0,0 +1,81 @@
+"""
+Kiểm tra nén response (app.utils.compression): chọn encoding theo Accept-Encoding,
+ngưỡng kích thước và response streaming.
+    python -m pytest -q test_compression.py
+"""
+import gzip
+import json
+import zlib
+
+import pytest
+from flask import Response
+
+from app.extensions import db
+from app.models import Building, Room, RoomType
+
+ROOMS = 200
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+
+    @app.route("/test/stream.csv")
+    def stream_csv():
+        return Response((f"{i},Phòng {i}\n" for i in range(5000)), mimetype="text/csv")
+
+    with app.app_context():
+        building = Building(building_name="Tòa A", gender="all")
+        room_type = RoomType(type_name="Phòng 4", capacity=4, price=1000000)
+        db.session.add_all([building, room_type])
+        db.session.flush()
+        db.session.add_all(
+            Room(room_number=f"{i:03d}", building_id=building.building_id, room_type_id=room_type.room_type_id,
+                 status="available", current_occupancy=0)
+            for i in range(ROOMS)
+        )
+        db.session.commit()
+    return app
+
+
+def rooms(data):
+    return json.loads(data)["data"]["rooms"]
+
+
+def test_negotiated_compression(client, auth_headers):
+    headers = auth_headers("admin")
+
+    plain = client.get("/api/buildings/1/rooms", headers=headers)
+    assert "Content-Encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["Vary"]
+    assert len(rooms(plain.data)) == ROOMS
+
+    response = client.get("/api/buildings/1/rooms", headers={**headers, "Accept-Encoding": "gzip, deflate"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert int(response.headers["Content-Length"]) == len(response.data) < len(plain.data) / 5
+    assert rooms(gzip.decompress(response.data)) == rooms(plain.data)
+
+    # Tôn trọng q của client
+    response = client.get("/api/buildings/1/rooms", headers={**headers, "Accept-Encoding": "gzip;q=0.5, deflate"})
+    assert response.headers["Content-Encoding"] == "deflate"
+    assert rooms(zlib.decompress(response.data)) == rooms(plain.data)
+    response = client.get("/api/buildings/1/rooms", headers={**headers, "Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in response.headers
+
+    # Response nhỏ hơn ngưỡng và 304 không nén
+    response = client.get("/api/buildings/dropdown", headers={**headers, "Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    response = client.get(
+        "/api/buildings/1/rooms",
+        headers={**headers, "Accept-Encoding": "gzip", "If-None-Match": plain.headers["ETag"]},
+    )
+    assert response.status_code == 304 and "Content-Encoding" not in response.headers
+
+
+def test_streamed_response_is_compressed_incrementally(client):
+    response = client.get("/test/stream.csv", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    lines = gzip.decompress(response.data).decode("utf-8").splitlines()
+    assert len(lines) == 5000 and lines[-1] == "4999,Phòng 4999"
+
@@ -0,0 +1,129 @@
+"""
+Stress test: nhiều admin duyệt đơn / sinh viên đăng ký đồng thời.
+
+Mặc định chạy trên file SQLite trong `tmp_path`. SQLite bỏ qua SELECT ... FOR UPDATE
+nên phần kiểm tra khóa dòng chỉ chạy trên MySQL; chỉ định database MySQL riêng cho
+test này bằng CONCURRENT_TEST_DATABASE_URI (toàn bộ bảng trong database đó bị xóa và
+tạo lại):
+    python -m pytest -q test_concurrent_allocation.py
+    CONCURRENT_TEST_DATABASE_URI=mysql+pymysql://.../qlktx_concurrency python -m pytest -q test_concurrent_allocation.py
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app.extensions import db
+from app.models import Building, Contract, Registration, Role, Room, RoomType, User
+from app.services.counter_service import CounterService
+from app.utils.auth import build_token_claims
+
+ROOMS = 5
+CAPACITY = 3
+REGISTRATIONS_PER_ROOM = 12
+THREADS = 8
+
+
+@pytest.fixture
+def app(make_app):
+    uri = os.getenv("CONCURRENT_TEST_DATABASE_URI")
+    if not uri:
+        return make_app()
+    app = make_app(SQLALCHEMY_DATABASE_URI=uri)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+
+def setup_database(app):
+    """Tạo dữ liệu: mỗi phòng có nhiều đơn pending hơn sức chứa"""
+    with app.app_context():
+        roles = {name: Role(role_name=name) for name in ("admin", "management", "student", "staff")}
+        db.session.add_all(roles.values())
+        db.session.flush()
+
+        admin = User(role_id=roles["admin"].role_id, full_name="Admin", email="admin@test",
+                     password_hash="x", gender="male")
+        room_type = RoomType(type_name="Phòng test", capacity=CAPACITY, price=1000000)
+        building = Building(building_name="Tòa test", gender="all")
+        db.session.add_all([admin, room_type, building])
+        db.session.flush()
+
+        rooms = [Room(room_number=f"T{i:02d}", building_id=building.building_id,
+                      room_type_id=room_type.room_type_id, status="available", current_occupancy=0)
+                 for i in range(ROOMS)]
+        students = [User(role_id=roles["student"].role_id, full_name=f"Sinh viên {i}",
+                         email=f"sv{i}@test", student_id=f"SV{i:04d}", password_hash="x", gender="male")
+                    for i in range(ROOMS * REGISTRATIONS_PER_ROOM + THREADS)]
+        db.session.add_all(rooms + students)
+        db.session.flush()
+
+        for i, student in enumerate(students[: ROOMS * REGISTRATIONS_PER_ROOM]):
+            db.session.add(Registration(student_id=student.user_id, room_id=rooms[i % ROOMS].room_id,
+                                        status="pending"))
+        db.session.commit()
+        CounterService.rebuild()
+
+        return (
+            create_access_token(identity=str(admin.user_id), additional_claims=build_token_claims(admin)),
+            [r.registration_id for r in Registration.query.order_by(Registration.registration_id)],
+            rooms[0].room_id,
+            students[-1],
+        )
+
+
+def post(app, url, token, json):
+    response = app.test_client().post(url, json=json, headers={"Authorization": f"Bearer {token}"})
+    return response.status_code, response.get_json()
+
+
+def check_rooms(app):
+    with app.app_context():
+        for room in Room.query.all():
+            assert room.current_occupancy <= CAPACITY, f"{room} vượt sức chứa"
+            assert room.current_occupancy == room.actual_occupancy, f"{room} lệch số đơn đã duyệt"
+            assert Contract.query.join(Registration).filter(Registration.room_id == room.room_id).count() \
+                == room.current_occupancy
+
+        stored = CounterService.get_counters()
+        for key, value in CounterService.compute_counters().items():
+            assert float(stored.get(key) or 0) == float(value or 0), f"counter {key} bị lệch"
+
+
+def test_concurrent_approvals_never_exceed_capacity(app):
+    token, registration_ids, _, _ = setup_database(app)
+
+    # Mỗi đơn được duyệt hai lần song song, xen kẽ với các lô duyệt hàng loạt
+    jobs = [("/api/registrations/%d/approve" % i, None) for i in registration_ids * 2]
+    jobs += [("/api/registrations/approve-batch", {"registration_ids": registration_ids[k::4]})
+             for k in range(4)]
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        results = list(pool.map(lambda job: post(app, job[0], token, job[1]), jobs))
+
+    assert all(status in (200, 400) for status, _ in results), results
+    check_rooms(app)
+    with app.app_context():
+        assert Registration.query.filter_by(status="approved").count() == ROOMS * CAPACITY
+
+
+def test_concurrent_registrations_one_per_student(app):
+    _, _, room_id, student = setup_database(app)
+
+    with app.app_context():
+        if db.engine.dialect.name == "sqlite":
+            # SQLite bỏ qua SELECT ... FOR UPDATE, cần MySQL để kiểm tra khóa dòng
+            pytest.skip("requires MySQL CONCURRENT_TEST_DATABASE_URI")
+        student = db.session.get(User, student.user_id)
+        token = create_access_token(identity=str(student.user_id), additional_claims=build_token_claims(student))
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        results = list(pool.map(lambda _: post(app, "/api/registrations/", token, {"room_id": room_id}),
+                                range(THREADS)))
+
+    assert sum(status == 201 for status, _ in results) == 1, results
+    with app.app_context():
+        assert Registration.query.filter_by(student_id=student.user_id).count() == 1
+
@@ -0,0 +1,96 @@
+"""
+Kiểm tra bộ đếm dashboard (app.services.counter_service): cộng dồn theo flush, tạo
+dòng cho key mới và luôn khớp với giá trị tính lại từ bảng nguồn.
+    python -m pytest -q test_counter_service.py
+"""
+import importlib.util
+import os
+
+from app.extensions import db
+from app.models import Building, DashboardCounter, Role, Room, RoomType, User
+from app.services.counter_service import CounterService
+
+
+def stored_counters():
+    return {key: float(value) for key, value in db.session.query(DashboardCounter.counter_key, DashboardCounter.value)}
+
+
+def assert_in_sync():
+    stored = stored_counters()
+    for key, value in CounterService.compute_counters().items():
+        assert stored.get(key) == float(value or 0), f"counter {key} bị lệch"
+
+
+def test_new_key_starts_from_delta(app, monkeypatch):
+    with app.app_context():
+        CounterService.rebuild()
+        compute_counters = CounterService.compute_counters
+        # Flush không được quét lại bảng nguồn khi gặp key mới
+        monkeypatch.setattr(CounterService, "compute_counters", None)
+        role = Role(role_name="auditor")
+        db.session.add(role)
+        db.session.flush()
+        for i in range(2):
+            db.session.add(User(role_id=role.role_id, full_name=f"Kiểm toán {i}", email=f"audit{i}@test",
+                                password_hash="x", gender="male"))
+            db.session.commit()
+            assert stored_counters()["users.role.auditor"] == i + 1
+        monkeypatch.setattr(CounterService, "compute_counters", compute_counters)
+        assert_in_sync()
+
+
+def test_get_counters_does_not_write(app):
+    with app.app_context():
+        db.session.add(Role(role_name="admin"))
+        db.session.commit()
+        counters = CounterService.get_counters()
+        assert counters.count("users.role.admin") == 0 and counters.count("rooms.total") == 0
+        assert db.session.query(DashboardCounter).count() == 0
+
+
+def test_unloaded_attribute_decrements_old_bucket(app):
+    with app.app_context():
+        building = Building(building_name="Tòa A", gender="all")
+        room_type = RoomType(type_name="Phòng 4", capacity=4, price=1000000)
+        db.session.add_all([building, room_type])
+        db.session.flush()
+        db.session.add(Room(room_number="101", building_id=building.building_id,
+                            room_type_id=room_type.room_type_id, status="available", current_occupancy=0))
+        db.session.commit()
+        CounterService.rebuild()
+
+        # Gán trạng thái mới khi giá trị cũ chưa được nạp (sau commit, hoặc đã expire)
+        room = db.session.get(Room, 1)
+        db.session.expire(room, ["status"])
+        room.status = "maintenance"
+        db.session.commit()
+        assert_in_sync()
+
+
+def test_migration_seed_matches_compute_counters(app):
+    path = os.path.join(os.path.dirname(__file__), "migrations", "versions", "a4c8e2f6b9d3_add_dashboard_counters.py")
+    spec = importlib.util.spec_from_file_location("add_dashboard_counters", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with app.app_context():
+        student = Role(role_name="student")
+        db.session.add_all([student, Role(role_name="admin")])
+        db.session.flush()
+        db.session.add(User(role_id=student.role_id, full_name="Sinh viên", email="sv@test",
+                            password_hash="x", gender="male"))
+        building = Building(building_name="Tòa A", gender="all")
+        room_type = RoomType(type_name="Phòng 4", capacity=4, price=1000000)
+        db.session.add_all([building, room_type])
+        db.session.flush()
+        db.session.add_all([
+            Room(room_number=str(number), building_id=building.building_id, room_type_id=room_type.room_type_id,
+                 status=status, current_occupancy=occupancy)
+            for number, (status, occupancy) in enumerate([("available", 0), ("available", 2), ("maintenance", 0)])
+        ])
+        db.session.commit()
+
+        seeded = migration._compute_counters(db.session.connection())
+        expected = CounterService.compute_counters()
+        assert {key: float(value) for key, value in seeded.items()} == {
+            key: float(value or 0) for key, value in expected.items()
+        }
@@ -0,0 +1,135 @@
+"""
+Kiểm tra ETag/304 (app.utils.etag) và phiên bản bảng (table_versions) được tăng
+cho cả thao tác ORM lẫn câu lệnh Core.
+    python -m pytest -q test_etag.py
+"""
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.extensions import db
+from app.models import Building, Room, RoomType, TableVersion, User
+from app.services import table_version_service
+from app.services.table_version_service import TableVersionService
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        building = Building(building_name="Tòa A", gender="all")
+        room_type = RoomType(type_name="Phòng 4", capacity=4, price=1000000)
+        db.session.add_all([building, room_type])
+        db.session.flush()
+        db.session.add(Room(room_number="101", building_id=building.building_id,
+                            room_type_id=room_type.room_type_id, status="available", current_occupancy=0))
+        db.session.commit()
+    return app
+
+
+def get(client, headers, etag=None):
+    if etag:
+        headers = {**headers, "If-None-Match": etag}
+    return client.get("/api/rooms/", headers=headers)
+
+
+def test_not_modified_until_table_changes(app, client, auth_headers):
+    admin, other_admin = auth_headers("admin"), auth_headers("admin")
+
+    response = get(client, admin)
+    etag = response.headers["ETag"]
+    assert response.status_code == 200 and etag.startswith('W/"')
+
+    response = get(client, admin, etag)
+    assert response.status_code == 304 and response.data == b""
+    assert response.headers["ETag"] == etag
+
+    # ETag gắn với user và query string
+    assert get(client, other_admin, etag).status_code == 200
+    assert client.get("/api/rooms/?status=available", headers={**admin, "If-None-Match": etag}).status_code == 200
+
+    # Ghi bằng ORM (flush) trên bảng phụ thuộc
+    with app.app_context():
+        db.session.get(Building, 1).building_name = "Tòa A1"
+        db.session.commit()
+    response = get(client, admin, etag)
+    assert response.status_code == 200
+    assert response.get_json()["data"]["rooms"][0]["building"]["building_name"] == "Tòa A1"
+    etag = response.headers["ETag"]
+
+    # Ghi bằng câu lệnh Core (bulk) qua session
+    with app.app_context():
+        db.session.execute(Room.__table__.update().values(status="maintenance"))
+        db.session.commit()
+    response = get(client, admin, etag)
+    assert response.status_code == 200
+    assert response.get_json()["data"]["rooms"][0]["status"] == "maintenance"
+    etag = response.headers["ETag"]
+
+    # Bảng không liên quan không làm đổi ETag
+    with app.app_context():
+        db.session.get(User, 1).full_name = "Admin mới"
+        db.session.commit()
+    assert get(client, admin, etag).status_code == 304
+
+
+def test_versions_bumped_once_per_commit(app):
+    with app.app_context():
+        before = TableVersionService.get_versions(["rooms", "buildings"])
+        room = db.session.get(Room, 1)
+        room.current_occupancy = 1
+        db.session.flush()
+        room.current_occupancy = 2
+        db.session.commit()
+        after = TableVersionService.get_versions(["rooms", "buildings"])
+        assert after["rooms"] == before["rooms"] + 1
+        assert after["buildings"] == before["buildings"]
+
+        # Rollback cả transaction: không tăng
+        db.session.get(Room, 1).current_occupancy = 3
+        db.session.flush()
+        db.session.rollback()
+        assert TableVersionService.get_versions(["rooms"])["rooms"] == after["rooms"]
+
+        # Savepoint bị rollback không làm mất bảng đã ghi trước đó trong transaction
+        db.session.get(Room, 1).current_occupancy = 4
+        db.session.flush()
+        savepoint = db.session.begin_nested()
+        db.session.get(Building, 1).building_name = "Tòa tạm"
+        db.session.flush()
+        savepoint.rollback()
+        db.session.commit()
+        assert TableVersionService.get_versions(["rooms"])["rooms"] == after["rooms"] + 1
+
+
+def test_failed_bump_rolls_back_the_write(app, monkeypatch):
+    def failing_bump(session, tables):
+        raise OperationalError("UPDATE table_versions", {}, Exception("mất kết nối"))
+
+    monkeypatch.setattr(table_version_service, "_bump", failing_bump)
+    with app.app_context():
+        before = TableVersionService.get_versions(["rooms"])
+        db.session.get(Room, 1).current_occupancy = 3
+        with pytest.raises(OperationalError):
+            db.session.commit()
+        db.session.rollback()
+        # Dữ liệu và phiên bản cùng không đổi: không có dữ liệu mới đi kèm ETag cũ
+        assert db.session.get(Room, 1).current_occupancy == 0
+        assert TableVersionService.get_versions(["rooms"]) == before
+
+
+def test_missing_rows_read_as_zero_and_created_on_write(app):
+    with app.app_context():
+        # create_all đã tạo sẵn dòng cho mọi bảng
+        assert db.session.get(TableVersion, "rooms") is not None
+        db.session.execute(TableVersion.__table__.delete().where(TableVersion.table_name == "rooms"))
+        db.session.commit()
+
+        # Đọc không ghi gì
+        assert TableVersionService.get_versions(["rooms"]) == {"rooms": 0}
+        db.session.rollback()
+        assert db.session.get(TableVersion, "rooms") is None
+
+        db.session.get(Room, 1).current_occupancy = 1
+        db.session.commit()
+        assert TableVersionService.get_versions(["rooms"]) == {"rooms": 1}
+
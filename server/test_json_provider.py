@@ -0,0 +1,56 @@
+"""
+Kiểm tra JSON provider orjson (app.utils.json_provider): Decimal/date/datetime
+được serialize giống cách view tự đổi trước đây (float, isoformat).
+    python -m pytest -q test_json_provider.py
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from flask import jsonify, request
+
+from app.extensions import db
+from app.models import User
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+
+    @app.route("/test/echo", methods=["POST"])
+    def echo():
+        return jsonify(request.get_json())
+
+    return app
+
+
+def test_native_types_match_manual_conversion(app):
+    created_at = datetime(2024, 9, 1, 8, 30, 15, 123456)
+    row = {"price": Decimal("1200000.00"), "start_date": date(2024, 9, 1), "created_at": created_at,
+           "full_name": "Nguyễn Văn A", 1: "khóa số"}
+    manual = {"price": 1200000.0, "start_date": "2024-09-01", "created_at": created_at.isoformat(),
+              "full_name": "Nguyễn Văn A", "1": "khóa số"}
+
+    with app.app_context():
+        body = app.json.response(row).get_data()
+        assert json.loads(body) == manual
+        assert "Nguyễn".encode("utf-8") in body
+        assert app.json.loads(app.json.dumps(row)) == manual
+        # Tham số riêng của module json vẫn dùng được
+        assert app.json.dumps({"b": 1, "a": 2}, separators=(",", ":")) == '{"a":2,"b":1}'
+
+
+def test_request_body(client):
+    response = client.post("/test/echo", json={"amount": 1.5, "items": [1, 2]})
+    assert response.get_json() == {"amount": 1.5, "items": [1, 2]}
+    response = client.post("/test/echo", data="{bad", content_type="application/json")
+    assert response.status_code == 400
+
+
+
+def test_view_returns_native_datetime(app, client, auth_headers):
+    response = client.get("/api/users/1", headers=auth_headers("admin"))
+    created_at = response.get_json()["data"]["user"]["created_at"]
+    with app.app_context():
+        assert created_at == db.session.get(User, 1).created_at.isoformat()
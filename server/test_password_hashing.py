@@ -0,0 +1,48 @@
+"""
+Kiểm tra băm mật khẩu trên process pool dùng chung (app.utils.password_hashing).
+    python -m pytest -q test_password_hashing.py
+"""
+import pytest
+from werkzeug.security import check_password_hash
+
+from app.utils import password_hashing
+from app.utils.password_hashing import PasswordHashingBusy, hash_many, verify_password
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(PASSWORD_HASH_OFFLOAD=True, PASSWORD_HASH_WORKERS=2, PASSWORD_HASH_MAX_PENDING=3,
+                   PASSWORD_HASH_QUEUE_TIMEOUT=0.1, PASSWORD_HASH_METHOD="pbkdf2:sha256:1000")
+    password_hashing.shutdown_pool()
+    yield app
+    password_hashing.shutdown_pool()
+
+
+def test_hash_many_uses_shared_pool(app):
+    passwords = [f"matkhau{i}" for i in range(50)]
+    with app.app_context():
+        hashes = hash_many(passwords)
+        executor, pending = password_hashing._get_executor(app.config)
+
+        assert len(hashes) == len(passwords)
+        assert all(check_password_hash(h, p) for h, p in zip(hashes, passwords))
+        assert all(h.startswith("pbkdf2:sha256:1000$") for h in hashes)
+        # Pool của login được dùng lại, mọi chỗ chờ đã được trả
+        assert password_hashing._executor is executor
+        assert verify_password(hashes[0], passwords[0])
+        assert all(pending.acquire(timeout=1) for _ in range(3))
+        for _ in range(3):
+            pending.release()
+
+
+def test_hash_many_busy_when_pool_full(app):
+    with app.app_context():
+        _, pending = password_hashing._get_executor(app.config)
+        for _ in range(3):
+            pending.acquire()
+        try:
+            with pytest.raises(PasswordHashingBusy):
+                hash_many(["matkhau1"])
+        finally:
+            for _ in range(3):
+                pending.release()
@@ -0,0 +1,180 @@
+"""
+Kiểm tra đối soát sao kê (app.services.reconciliation_service): các mức khớp, lý do
+không khớp, đọc số tiền/ngày và xác nhận từng phần khi một lô bị lỗi.
+    python -m pytest -q test_reconciliation_service.py
+"""
+import io
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.extensions import db
+from app.models import Contract, Payment
+from app.services.payment_service import PaymentService
+from app.services.reconciliation_service import ReconciliationService, parse_amount, parse_date
+
+# (mã hợp đồng, số tiền, ngày thanh toán)
+PENDING = [
+    ("HD000001", "1500000", datetime(2024, 9, 5)),
+    ("HD000002", "2000000", datetime(2024, 6, 1)),
+    ("HD000123", "1800000", datetime(2024, 9, 5)),
+    ("HD000004", "900000", datetime(2024, 9, 8)),
+    ("HD000005", "700000", datetime(2024, 9, 5)),
+    ("HD000006", "700000", datetime(2024, 9, 6)),
+]
+
+STATEMENT = """Ngày giao dịch;Số tiền;Nội dung;Số CT
+2024-09-06;1.500.000;Thanh toan HD000001;FT001
+2024-09-06;2.000.000;HD2 tien phong;FT002
+2024-09-07;1.800.000;Nop tien HD000132;FT003
+09/09/2024;900.000;chuyen tien phong;FT004
+2024-09-06;1.500.000;Thanh toan HD000001;FT001
+2024-09-06;1.500.000;Thanh toan HD000999;FT005
+2024-09-06;700.000;tien phong thang 9;FT006
+2024-09-06;123.456;tien dien;FT007
+2024-09-06;abc;loi so tien;FT008
+31/02/2024;500.000;loi ngay;FT009
+2024-09-06;-500.000;phi dich vu;FT010
+"""
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        for number, (code, amount, payment_date) in enumerate(PENDING, start=1):
+            contract = Contract(registration_id=number, contract_code=code,
+                                start_date=date(2024, 9, 1), end_date=date(2025, 1, 31))
+            db.session.add(contract)
+            db.session.flush()
+            db.session.add(Payment(contract_id=contract.contract_id, amount=Decimal(amount),
+                                   payment_date=payment_date, status="pending"))
+        db.session.commit()
+    return app
+
+
+def reconcile(**kwargs):
+    return ReconciliationService.reconcile(io.BytesIO(STATEMENT.encode("utf-8")), **kwargs)
+
+
+def payment_codes(report):
+    return {item["contract_code"]: item["match"] for item in report["matched"]}
+
+
+def test_match_tiers_and_reasons(app):
+    with app.app_context():
+        report = reconcile()
+
+    assert payment_codes(report) == {
+        "HD000001": "exact",
+        "HD000002": "fuzzy_date",
+        "HD000123": "fuzzy_code",
+        "HD000004": "fuzzy_amount",
+    }
+    assert report["confirmation"] is None
+    summary = report["summary"]
+    assert (summary["lines"], summary["debits"], summary["matched"]) == (11, 1, 4)
+    assert summary["matched_amount"] == 6200000.0
+    assert summary["pending_payments_unmatched"] == 2
+    assert summary["unmatched_reasons"] == {
+        "Giao dịch trùng mã tham chiếu": 1,
+        "Không có thanh toán pending khớp mã hợp đồng và số tiền": 1,
+        "Nhiều thanh toán cùng số tiền, nội dung không có mã hợp đồng": 1,
+        "Không có thanh toán pending cùng số tiền": 1,
+        "Số tiền không hợp lệ: 'abc'": 1,
+        "Ngày không hợp lệ: '31/02/2024'": 1,
+    }
+    assert [item["line"] for item in report["unmatched"]] == [6, 7, 8, 9, 10, 11]
+
+
+def test_confirm_exact_only(app):
+    with app.app_context():
+        report = reconcile(confirm=True)
+        statuses = dict(db.session.query(Payment.payment_id, Payment.status))
+
+    assert report["confirmation"] == {"confirmed": 1, "skipped": [], "failed": [], "complete": True}
+    assert [item["confirmed"] for item in report["matched"]] == [True, False, False, False]
+    assert list(statuses.values()).count("confirmed") == 1
+    assert statuses[report["matched"][0]["payment_id"]] == "confirmed"
+
+
+def test_failed_batch_reports_partial_confirmation(app, monkeypatch):
+    confirm_batch = PaymentService.confirm_batch
+    calls = []
+
+    def flaky_confirm_batch(payment_ids, confirmed_by_user_id):
+        calls.append(payment_ids)
+        if len(calls) == 2:
+            raise StaleDataError("Thanh toán đã bị thay đổi bởi giao dịch khác")
+        return confirm_batch(payment_ids, confirmed_by_user_id)
+
+    monkeypatch.setattr(PaymentService, "MAX_BATCH_SIZE", 1)
+    monkeypatch.setattr(PaymentService, "confirm_batch", staticmethod(flaky_confirm_batch))
+
+    with app.app_context():
+        report = reconcile(confirm=True, include_fuzzy=True)
+        confirmed = {
+            payment_id for payment_id, in
+            db.session.query(Payment.payment_id).filter(Payment.status == "confirmed")
+        }
+
+    confirmation = report["confirmation"]
+    failed_id = calls[1][0]
+    assert len(calls) == 4
+    assert confirmation["confirmed"] == 3
+    assert confirmation["complete"] is False
+    assert [item["payment_id"] for item in confirmation["failed"]] == [failed_id]
+    assert confirmed == {item["payment_id"] for item in report["matched"] if item["confirmed"]}
+    assert failed_id not in confirmed
+
+
+def test_endpoint_reports_failed_payments(client, auth_headers, monkeypatch):
+    def failing_confirm_batch(payment_ids, confirmed_by_user_id):
+        raise StaleDataError("Thanh toán đã bị thay đổi bởi giao dịch khác")
+
+    monkeypatch.setattr(PaymentService, "confirm_batch", staticmethod(failing_confirm_batch))
+    response = client.post("/api/payments/reconcile?confirm=true", data=STATEMENT.encode("utf-8"),
+                           content_type="text/csv", headers=auth_headers("admin"))
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["data"]["confirmation"]["confirmed"] == 0
+    assert len(body["data"]["confirmation"]["failed"]) == 1
+    assert "1 thanh toán chưa xác nhận được do lỗi" in body["message"]
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1,000,000", "1000000.00"),
+    ("1.000.000", "1000000.00"),
+    ("1000000.00", "1000000.00"),
+    ("1 000 000 VND", "1000000.00"),
+    ("1.234,50", "1234.50"),
+    ("12,5", "12.50"),
+    ("-500.000", "-500000.00"),
+])
+def test_parse_amount(value, expected):
+    assert parse_amount(value) == Decimal(expected)
+
+
+@pytest.mark.parametrize("value", ["", "VND", "1-2"])
+def test_parse_amount_invalid(value):
+    with pytest.raises(ValueError):
+        parse_amount(value)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-09-06", date(2024, 9, 6)),
+    ("2024-09-06 10:22:01", date(2024, 9, 6)),
+    ("06/09/2024", date(2024, 9, 6)),
+    ("6.9.2024", date(2024, 9, 6)),
+])
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "31/02/2024", "09/2024"])
+def test_parse_date_invalid(value):
+    with pytest.raises(ValueError):
+        parse_date(value)
@@ -0,0 +1,151 @@
+"""
+Kiểm tra hàng đợi đăng ký giờ cao điểm (app.services.registration_queue_service):
+xếp hàng, xử lý theo thứ tự đến, các lý do từ chối, liên kết phiếu với đơn đăng ký
+và bộ đếm registrations.pending.
+    python -m pytest -q test_registration_queue_service.py
+"""
+import pytest
+
+from app.extensions import db
+from app.models import Building, Registration, RegistrationTicket, Role, Room, RoomType, User
+from app.services.counter_service import CounterService
+from app.services.registration_queue_service import RegistrationQueueService
+
+# Số phòng: (tòa nhà, số người đang ở); mọi phòng sức chứa 2
+ROOMS = {"N1": ("Nam", 0), "N2": ("Nam", 1), "FULL": ("Nam", 2), "F1": ("Nữ", 0)}
+# Mã sinh viên: giới tính
+STUDENTS = {"SV1": "male", "SV2": "male", "SV3": "male", "SV4": "female", "SV5": "male"}
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        role = Role(role_name="student")
+        buildings = {"Nam": Building(building_name="Nam", gender="male"),
+                     "Nữ": Building(building_name="Nữ", gender="female")}
+        room_type = RoomType(type_name="Phòng 2", capacity=2, price=1000000)
+        db.session.add_all([role, room_type, *buildings.values()])
+        db.session.flush()
+        db.session.add_all([
+            Room(room_number=number, building_id=buildings[building].building_id,
+                 room_type_id=room_type.room_type_id, status="available", current_occupancy=occupancy)
+            for number, (building, occupancy) in ROOMS.items()
+        ])
+        db.session.add_all([
+            User(role_id=role.role_id, full_name=f"Sinh viên {code}", email=f"{code.lower()}@test",
+                 student_id=code, password_hash="x", gender=gender)
+            for code, gender in STUDENTS.items()
+        ])
+        db.session.flush()
+        # SV5 đã có đơn được duyệt từ trước
+        db.session.add(Registration(student_id=student_ids()["SV5"], room_id=room_ids()["N2"], status="approved"))
+        db.session.commit()
+        CounterService.rebuild()
+    return app
+
+
+def student_ids():
+    return dict(db.session.query(User.student_id, User.user_id))
+
+
+def room_ids():
+    return dict(db.session.query(Room.room_number, Room.room_id))
+
+
+def queue(*requests):
+    """Xếp hàng các yêu cầu (mã sinh viên, số phòng) theo thứ tự, trả về ticket_id"""
+    students, rooms = student_ids(), room_ids()
+    return [RegistrationQueueService.enqueue(students[code], rooms[number]).ticket_id for code, number in requests]
+
+
+def test_enqueue_reuses_queued_ticket(app):
+    with app.app_context():
+        first, second = queue(("SV1", "N1"), ("SV2", "N1"))
+        again, = queue(("SV1", "F1"))
+
+        assert again == first
+        assert RegistrationTicket.query.count() == 2
+        tickets = [db.session.get(RegistrationTicket, ticket_id) for ticket_id in (first, second)]
+        assert [RegistrationQueueService.queue_position(ticket) for ticket in tickets] == [1, 2]
+
+
+def test_batches_processed_in_arrival_order(app):
+    with app.app_context():
+        first, second, third = queue(("SV1", "N1"), ("SV2", "N1"), ("SV3", "N2"))
+
+        assert RegistrationQueueService.allocate_batch(batch_size=2) == (2, 2)
+        tickets = {t.ticket_id: t for t in RegistrationTicket.query}
+        assert [tickets[i].status for i in (first, second, third)] == ["accepted", "accepted", "queued"]
+        assert RegistrationQueueService.queue_position(tickets[third]) == 1
+        assert RegistrationQueueService.queue_position(tickets[first]) is None
+
+        assert RegistrationQueueService.allocate_batch() == (1, 1)
+        assert RegistrationQueueService.allocate_batch() == (0, 0)
+        # Ngày đăng ký là lúc xếp hàng nên thứ tự đơn giữ đúng thứ tự phiếu
+        registrations = Registration.query.filter_by(status="pending").order_by(Registration.registration_date)
+        assert [r.registration_id for r in registrations] == [
+            db.session.get(RegistrationTicket, i).registration_id for i in (first, second, third)
+        ]
+
+
+def test_rejections_and_registration_links(app):
+    with app.app_context():
+        students, rooms = student_ids(), room_ids()
+        accepted, full, wrong_gender, existing = queue(("SV1", "N1"), ("SV2", "FULL"), ("SV3", "F1"), ("SV5", "N1"))
+        # Phiếu trùng sinh viên trong cùng lô (hai request xếp hàng đồng thời)
+        duplicate = RegistrationTicket(student_id=students["SV1"], room_id=rooms["N2"], status="queued")
+        missing_room = RegistrationTicket(student_id=students["SV4"], room_id=9999, status="queued")
+        db.session.add_all([duplicate, missing_room])
+        db.session.commit()
+
+        assert RegistrationQueueService.allocate_batch() == (6, 1)
+        tickets = {t.ticket_id: t for t in RegistrationTicket.query}
+        assert {ticket_id: (t.status, t.message) for ticket_id, t in tickets.items()} == {
+            accepted: ("accepted", None),
+            full: ("rejected", "Phòng đã đầy hoặc không khả dụng"),
+            wrong_gender: ("rejected", "Bạn chỉ được đăng ký phòng ở tòa nhà dành cho giới tính 'male'"),
+            existing: ("rejected", "Bạn đã có đơn đăng ký đang chờ xử lý hoặc đã được duyệt"),
+            duplicate.ticket_id: ("rejected", "Bạn đã có đơn đăng ký đang chờ xử lý hoặc đã được duyệt"),
+            missing_room.ticket_id: ("rejected", "Phòng không tồn tại"),
+        }
+        assert all(t.processed_at is not None for t in tickets.values())
+        assert [t.ticket_id for t in tickets.values() if t.registration_id] == [accepted]
+
+        registration = tickets[accepted].registration
+        assert (registration.student_id, registration.room_id, registration.status) == (
+            students["SV1"], rooms["N1"], "pending",
+        )
+        assert registration.registration_date == tickets[accepted].created_at
+        assert Registration.query.count() == 2
+
+
+def test_pending_counter_delta(app):
+    with app.app_context():
+        before = CounterService.get_counters().count("registrations.pending")
+        queue(("SV1", "N1"), ("SV2", "N2"), ("SV3", "FULL"))
+
+        assert RegistrationQueueService.allocate_batch() == (3, 2)
+        stored = CounterService.get_counters()
+        assert stored.count("registrations.pending") == before + 2
+        for key, value in CounterService.compute_counters().items():
+            assert float(stored.get(key) or 0) == float(value or 0), key
+
+
+def test_endpoint_queues_in_rush_mode(app, client, auth_headers):
+    app.config["REGISTRATION_RUSH_MODE"] = True
+    headers = auth_headers("student", gender="male")
+    with app.app_context():
+        room_id = room_ids()["N1"]
+
+    response = client.post("/api/registrations/", json={"room_id": room_id}, headers=headers)
+    assert response.status_code == 202
+    ticket = response.get_json()["data"]["ticket"]
+    assert ticket["status"] == "queued" and response.get_json()["data"]["queue_position"] == 1
+
+    with app.app_context():
+        assert RegistrationQueueService.allocate_batch() == (1, 1)
+    response = client.get(f"/api/registrations/tickets/{ticket['ticket_id']}", headers=headers)
+    data = response.get_json()["data"]
+    assert data["ticket"]["status"] == "accepted"
+    assert data["registration"]["room_number"] == "N1"
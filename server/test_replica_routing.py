@@ -0,0 +1,132 @@
+"""
+Kiểm tra định tuyến đọc sang replica (SQLALCHEMY_REPLICA_URI).
+
+Primary và replica là hai file SQLite riêng: replica có thêm một tòa nhà mà primary
+không có, nhờ đó biết được request đã đọc từ database nào.
+    python -m pytest -q test_replica_routing.py
+"""
+import shutil
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select, update
+
+from app.db_routing import (
+    PRIMARY_UNTIL_HEADER,
+    REPLICA_BIND_KEY,
+    replica_lag,
+    reset_replica_state,
+    write_heartbeat,
+)
+from app.extensions import db
+from app.models import Building, ReplicaHeartbeat, ReportJob
+from app.services.counter_service import CounterService
+
+REPLICA_ONLY = "Tòa chỉ có trên replica"
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    reset_replica_state()
+    return make_app(
+        SQLALCHEMY_REPLICA_URI="sqlite:///" + str(tmp_path / "replica.db"),
+        REPLICA_LAG_CHECK_SECONDS=0,
+        # Heartbeat được ghi trực tiếp trong test thay vì bằng thread nền
+        REPLICA_HEARTBEAT_SECONDS=0,
+    )
+
+
+@pytest.fixture
+def headers(app, auth_headers, tmp_path):
+    """Replica = bản sao của primary + một tòa nhà chỉ có trên replica, không có report job"""
+    headers = auth_headers("admin")
+    with app.app_context():
+        db.session.add(ReportJob(report_type="contracts_excel", params_hash="x", status="running"))
+        db.session.commit()
+        CounterService.rebuild()
+        write_heartbeat(db.engine)
+
+        db.engines[REPLICA_BIND_KEY].dispose()
+        shutil.copy(tmp_path / "app.db", tmp_path / "replica.db")
+        with db.engines[REPLICA_BIND_KEY].begin() as connection:
+            connection.execute(insert(Building.__table__).values(building_name=REPLICA_ONLY, gender="all"))
+            connection.execute(ReportJob.__table__.delete())
+    return headers
+
+
+def building_names(response):
+    assert response.status_code == 200, response.get_json()
+    return {building["building_name"] for building in response.get_json()["data"]["buildings"]}
+
+
+def test_reads_go_to_replica_and_writes_to_primary(client, headers):
+    assert REPLICA_ONLY in building_names(client.get("/api/buildings/", headers=headers))
+
+    response = client.post("/api/buildings/", json={"building_name": "Tòa mới"}, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    sticky = response.headers[PRIMARY_UNTIL_HEADER]
+
+    # Client gửi lại header sau khi ghi: đọc primary, thấy ngay tòa vừa tạo
+    names = building_names(
+        client.get("/api/buildings/", headers={**headers, PRIMARY_UNTIL_HEADER: sticky})
+    )
+    assert "Tòa mới" in names and REPLICA_ONLY not in names
+
+    # Không có header: đọc replica (chưa nhận tòa mới)
+    names = building_names(client.get("/api/buildings/", headers=headers))
+    assert "Tòa mới" not in names and REPLICA_ONLY in names
+
+    # Header đã hết hạn thì không còn tác dụng
+    names = building_names(
+        client.get("/api/buildings/", headers={**headers, PRIMARY_UNTIL_HEADER: "1"})
+    )
+    assert REPLICA_ONLY in names
+
+
+def test_use_primary_views_read_primary(app, client, headers):
+    with app.app_context():
+        job_id = db.session.query(ReportJob.job_id).scalar()
+
+    response = client.get(f"/api/reports/{job_id}", headers=headers)
+    assert response.status_code == 200, response.get_json()
+
+
+def set_replica_heartbeat(beat_at):
+    with db.engines[REPLICA_BIND_KEY].begin() as connection:
+        connection.execute(update(ReplicaHeartbeat.__table__).values(beat_at=beat_at))
+
+
+def test_lagging_replica_falls_back_to_primary(app, client, headers):
+    app.config["REPLICA_MAX_LAG_SECONDS"] = 10
+    with app.app_context():
+        set_replica_heartbeat(datetime.utcnow() - timedelta(minutes=1))
+
+    names = building_names(client.get("/api/buildings/", headers=headers))
+    assert REPLICA_ONLY not in names
+
+    # Tắt kiểm tra độ trễ: lại đọc replica
+    app.config["REPLICA_MAX_LAG_SECONDS"] = -1
+    names = building_names(client.get("/api/buildings/", headers=headers))
+    assert REPLICA_ONLY in names
+
+
+def test_lag_measured_against_current_time(app, headers):
+    with app.app_context():
+        # Không có thao tác ghi nào trên primary từ lúc sao chép: replica vẫn bị coi là trễ
+        set_replica_heartbeat(datetime.utcnow() - timedelta(seconds=30))
+        assert 29 < replica_lag(db) < 60
+
+        with db.engines[REPLICA_BIND_KEY].begin() as connection:
+            connection.execute(ReplicaHeartbeat.__table__.delete())
+        assert replica_lag(db) is None
+
+
+def test_write_heartbeat_creates_and_updates_row(app):
+    with app.app_context():
+        write_heartbeat(db.engine)
+        first = db.session.execute(select(ReplicaHeartbeat.beat_at)).scalars().all()
+        write_heartbeat(db.engine)
+        second = db.session.execute(select(ReplicaHeartbeat.beat_at)).scalars().all()
+
+    assert len(first) == len(second) == 1
+    assert second[0] >= first[0]
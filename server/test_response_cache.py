@@ -0,0 +1,116 @@
+"""
+Kiểm tra cache response (app.utils.cache): hit/miss, invalidate theo tag, key theo
+role và single-flight khi nhiều request cùng trượt cache.
+    python -m pytest -q test_response_cache.py
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.extensions import db
+from app.models import Building
+from app.utils.cache import MemoryBackend, response_cache
+
+
+@pytest.fixture
+def tokens(app, auth_headers):
+    tokens = {name: auth_headers(name) for name in ("admin", "student")}
+    with app.app_context():
+        db.session.add(Building(building_name="Tòa A", gender="all"))
+        db.session.commit()
+    return tokens
+
+
+def test_cached_until_write_invalidates(app, client, tokens):
+    first = client.get("/api/buildings/dropdown", headers=tokens["admin"])
+    second = client.get("/api/buildings/dropdown", headers=tokens["admin"])
+    assert first.headers["X-Cache"] == "MISS" and second.headers["X-Cache"] == "HIT"
+    assert first.get_json() == second.get_json()
+
+    # Role khác: key khác
+    assert client.get("/api/buildings/dropdown", headers=tokens["student"]).headers["X-Cache"] == "MISS"
+
+    # Ghi ngoài endpoint (CLI, worker khác): phiên bản bảng đổi nên cache trượt ngay
+    with app.app_context():
+        db.session.add(Building(building_name="Tòa B", gender="all"))
+        db.session.commit()
+    response = client.get("/api/buildings/dropdown", headers=tokens["admin"])
+    assert response.headers["X-Cache"] == "MISS"
+    assert "Tòa B" in {b["building_name"] for b in response.get_json()["data"]["buildings"]}
+
+    # Tắt ETag: chỉ còn invalidate theo tag, ghi ngoài endpoint không làm cache trượt
+    app.config["ETAG_ENABLED"] = False
+    client.get("/api/buildings/dropdown", headers=tokens["admin"])
+    with app.app_context():
+        db.session.add(Building(building_name="Tòa D", gender="all"))
+        db.session.commit()
+    response = client.get("/api/buildings/dropdown", headers=tokens["admin"])
+    assert response.headers["X-Cache"] == "HIT"
+    assert "Tòa D" not in {b["building_name"] for b in response.get_json()["data"]["buildings"]}
+
+    # Endpoint ghi invalidate tag 'buildings' (cả /api/rooms/simple)
+    client.get("/api/rooms/simple", headers=tokens["admin"])
+    response = client.post("/api/buildings/", json={"building_name": "Tòa C"}, headers=tokens["admin"])
+    assert response.status_code == 201
+    response = client.get("/api/buildings/dropdown", headers=tokens["admin"])
+    assert response.headers["X-Cache"] == "MISS"
+    assert {"Tòa A", "Tòa B", "Tòa C", "Tòa D"} <= {b["building_name"] for b in response.get_json()["data"]["buildings"]}
+    assert client.get("/api/rooms/simple", headers=tokens["admin"]).headers["X-Cache"] == "MISS"
+
+    # Request ghi lỗi không invalidate
+    client.get("/api/buildings/dropdown", headers=tokens["admin"])
+    assert client.post("/api/buildings/", json={"building_name": ""}, headers=tokens["admin"]).status_code == 400
+    assert client.get("/api/buildings/dropdown", headers=tokens["admin"]).headers["X-Cache"] == "HIT"
+
+
+def test_single_flight_and_lru(app):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return "value"
+
+    def get(_):
+        with app.app_context():
+            return response_cache.get_or_set("key", compute, tags=("rooms",))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(get, range(8)))
+    assert len(calls) == 1
+    assert all(value == "value" for value, _ in results)
+    assert sum(not hit for _, hit in results) == 1
+
+    # Invalidate trong lúc đang tính: kết quả không được dùng lại
+    started = threading.Event()
+
+    def slow_compute():
+        started.set()
+        time.sleep(0.2)
+        return "old"
+
+    def fill():
+        with app.app_context():
+            response_cache.get_or_set("key", slow_compute, tags=("rooms",))
+
+    with app.app_context():
+        response_cache.invalidate("rooms")
+        thread = threading.Thread(target=fill)
+        thread.start()
+        started.wait()
+        response_cache.invalidate("rooms")
+        thread.join()
+        assert response_cache.get_or_set("key", lambda: "new", tags=("rooms",)) == ("new", False)
+
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1)
+    backend.set("b", 2)
+    backend.get("a")
+    backend.set("c", 3)
+    assert backend.get("b") is None and backend.get("a") == 1
+    backend.set("d", 4, timeout=0.01)
+    time.sleep(0.02)
+    assert backend.get("d") is None
+
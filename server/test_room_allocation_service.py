@@ -0,0 +1,173 @@
+"""
+Kiểm tra xếp phòng hàng loạt (app.services.room_allocation_service): số đơn được xếp
+lớn nhất, quy tắc giới tính/giá, lấp đầy phòng và áp dụng phương án.
+    python -m pytest -q test_room_allocation_service.py
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models import Building, Contract, Registration, Role, Room, RoomType, User
+from app.services.counter_service import CounterService
+from app.services.room_allocation_service import RoomAllocationService
+
+
+@pytest.fixture
+def seed(app):
+    """
+    Factory `seed(buildings, room_types, rooms, registrations)`:
+    - buildings: {tên: giới tính}
+    - room_types: {tên: (sức chứa, giá)}
+    - rooms: {số phòng: (tòa nhà, loại phòng, số người đang ở)}
+    - registrations: [(giới tính sinh viên, số phòng đã chọn)] theo thứ tự đăng ký
+    Trả về (room_id theo số phòng, danh sách registration_id).
+    """
+    def factory(buildings, room_types, rooms, registrations):
+        with app.app_context():
+            role = Role(role_name="student")
+            db.session.add(role)
+            buildings = {name: Building(building_name=name, gender=gender) for name, gender in buildings.items()}
+            room_types = {
+                name: RoomType(type_name=name, capacity=capacity, price=price)
+                for name, (capacity, price) in room_types.items()
+            }
+            db.session.add_all([*buildings.values(), *room_types.values()])
+            db.session.flush()
+            rooms = {
+                number: Room(room_number=number, building_id=buildings[building].building_id,
+                             room_type_id=room_types[room_type].room_type_id, status="available",
+                             current_occupancy=occupancy)
+                for number, (building, room_type, occupancy) in rooms.items()
+            }
+            students = [
+                User(role_id=role.role_id, full_name=f"Sinh viên {i}", email=f"sv{i}@test",
+                     student_id=f"SV{i:04d}", password_hash="x", gender=gender)
+                for i, (gender, _) in enumerate(registrations)
+            ]
+            db.session.add_all([*rooms.values(), *students])
+            db.session.flush()
+            started = datetime(2024, 8, 1)
+            added = [
+                Registration(student_id=student.user_id, room_id=rooms[number].room_id, status="pending",
+                             registration_date=started + timedelta(minutes=i))
+                for i, (student, (_, number)) in enumerate(zip(students, registrations))
+            ]
+            db.session.add_all(added)
+            db.session.commit()
+            CounterService.rebuild()
+            return (
+                {number: room.room_id for number, room in rooms.items()},
+                [registration.registration_id for registration in added],
+            )
+
+    return factory
+
+
+def placements(plan):
+    return {item["registration_id"]: (item["room_id"], item["match"]) for item in plan["assignments"]}
+
+
+def test_requested_room_given_up_to_place_more_students(app, seed):
+    room_ids, (x, y) = seed(
+        buildings={"Chung": "all", "Nam": "male", "Nữ": "female"},
+        room_types={"Phòng 2": (2, 1000000)},
+        rooms={"A": ("Chung", "Phòng 2", 1), "C": ("Nam", "Phòng 2", 1), "B": ("Nữ", "Phòng 2", 2)},
+        registrations=[("male", "A"), ("female", "B")],
+    )
+    with app.app_context():
+        plan = RoomAllocationService.plan()
+
+    assert placements(plan) == {x: (room_ids["C"], "same_type"), y: (room_ids["A"], "same_type")}
+    assert plan["summary"]["unassigned"] == 0
+
+
+def test_requested_rooms_first_in_registration_order(app, seed):
+    room_ids, registration_ids = seed(
+        buildings={"Nam": "male"},
+        room_types={"Phòng 2": (2, 1000000)},
+        rooms={"A": ("Nam", "Phòng 2", 0), "B": ("Nam", "Phòng 2", 0)},
+        registrations=[("male", "A"), ("male", "A"), ("male", "A"), ("male", "B")],
+    )
+    with app.app_context():
+        plan = RoomAllocationService.plan()
+
+    first, second, third, fourth = registration_ids
+    assert placements(plan) == {
+        first: (room_ids["A"], "requested_room"),
+        second: (room_ids["A"], "requested_room"),
+        third: (room_ids["B"], "same_building"),
+        fourth: (room_ids["B"], "requested_room"),
+    }
+
+
+def test_gender_rules(app, seed):
+    room_ids, (male, female) = seed(
+        buildings={"Nam": "male", "Nữ": "female"},
+        room_types={"Phòng 2": (2, 1000000)},
+        rooms={"N1": ("Nam", "Phòng 2", 2), "N2": ("Nam", "Phòng 2", 0), "F1": ("Nữ", "Phòng 2", 2)},
+        registrations=[("male", "N1"), ("female", "F1")],
+    )
+    with app.app_context():
+        plan = RoomAllocationService.plan()
+
+    assert placements(plan) == {male: (room_ids["N2"], "same_building")}
+    assert [item["registration_id"] for item in plan["unassigned"]] == [female]
+
+
+def test_never_more_expensive_than_requested(app, seed):
+    room_ids, (cheap, expensive) = seed(
+        buildings={"Nam": "male"},
+        room_types={"Phòng 8": (8, 500000), "Phòng 4": (4, 900000), "Phòng 2": (2, 1500000)},
+        rooms={"P8": ("Nam", "Phòng 8", 8), "P4": ("Nam", "Phòng 4", 4), "P2": ("Nam", "Phòng 2", 0),
+               "Q8": ("Nam", "Phòng 8", 7)},
+        registrations=[("male", "P4"), ("male", "P2")],
+    )
+    with app.app_context():
+        plan = RoomAllocationService.plan()
+
+    # Đơn chọn Phòng 4 (đã đầy) chỉ được xếp vào loại rẻ hơn, không lên Phòng 2
+    assert placements(plan) == {
+        cheap: (room_ids["Q8"], "cheaper_type"),
+        expensive: (room_ids["P2"], "requested_room"),
+    }
+
+
+def test_fills_occupied_rooms_before_opening_new_ones(app, seed):
+    room_ids, registration_ids = seed(
+        buildings={"Nam": "male"},
+        room_types={"Phòng 4": (4, 900000)},
+        rooms={"FULL": ("Nam", "Phòng 4", 4), "E1": ("Nam", "Phòng 4", 0), "HALF": ("Nam", "Phòng 4", 2),
+               "E2": ("Nam", "Phòng 4", 0), "ONE": ("Nam", "Phòng 4", 1)},
+        registrations=[("male", "FULL")] * 6,
+    )
+    with app.app_context():
+        plan = RoomAllocationService.plan()
+
+    rooms = [room_id for room_id, _ in (placements(plan)[i] for i in registration_ids)]
+    assert rooms == [room_ids["HALF"]] * 2 + [room_ids["ONE"]] * 3 + [room_ids["E1"]]
+    assert plan["summary"]["rooms_opened"] == 1
+    assert plan["summary"]["rooms_filled"] == 2
+
+
+def test_apply_moves_and_approves(app, seed):
+    room_ids, (moved, kept, left) = seed(
+        buildings={"Nam": "male"},
+        room_types={"Phòng 2": (2, 1000000)},
+        rooms={"A": ("Nam", "Phòng 2", 1), "B": ("Nam", "Phòng 2", 1)},
+        registrations=[("male", "A"), ("male", "A"), ("male", "A")],
+    )
+    with app.app_context():
+        plan = RoomAllocationService.apply()
+
+        assert plan["approval"] == {"approved": 2, "failed": []}
+        assert db.session.get(Registration, moved).room_id == room_ids["A"]
+        assert db.session.get(Registration, kept).room_id == room_ids["B"]
+        assert {r.registration_id: r.status for r in Registration.query} == {
+            moved: "approved", kept: "approved", left: "pending",
+        }
+        assert [room.current_occupancy for room in Room.query.order_by(Room.room_id)] == [2, 2]
+        assert Contract.query.count() == 2
+        stored = CounterService.get_counters()
+        for key, value in CounterService.compute_counters().items():
+            assert float(stored.get(key) or 0) == float(value or 0), key
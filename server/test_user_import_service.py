@@ -0,0 +1,134 @@
+"""
+Kiểm tra import tài khoản từ CSV (app.services.user_import_service): kiểm tra dữ liệu,
+trùng trong file, ghi từng dòng khi lô bị IntegrityError, dry_run và báo lỗi theo dòng.
+    python -m pytest -q test_user_import_service.py
+"""
+import io
+
+import pytest
+from werkzeug.security import check_password_hash
+
+from app.extensions import db
+from app.models import Role, User
+from app.services import user_import_service
+from app.services.counter_service import CounterService
+from app.services.user_import_service import UserImportError, UserImportService
+
+CSV = """full_name,email,password,role_name,phone_number,student_id,gender
+Nguyễn Văn A,a@test.vn,matkhau1,,0901,SV001,male
+Trần Thị B,b@test.vn,,,,SV002,female
+,c@test.vn,,,,,
+Lê Văn D,khong-phai-email,,,,,
+Phạm Văn E,cu@test.vn,,,,,
+Hồ Văn F,f@test.vn,,,,SV000,
+Vũ Văn G,g@test.vn,,giang_vien,,,
+Đỗ Văn H,h@test.vn,,,,,robot
+Mai Văn I,i@test.vn,123,,,,
+Ngô Văn K,A@TEST.VN,,,,,
+Đinh Văn L,l@test.vn,,,,sv001,
+Lý Văn M,m@test.vn,,admin,,,
+"""
+
+ERRORS = {
+    4: "full_name là bắt buộc",
+    5: "Email không hợp lệ",
+    6: "Email đã được sử dụng",
+    7: "Mã sinh viên đã được sử dụng",
+    8: "Role không tồn tại",
+    9: "Giới tính phải là 'male', 'female' hoặc 'other'",
+    10: "Mật khẩu phải có ít nhất 6 ký tự",
+    11: "Email đã được sử dụng",
+    12: "Mã sinh viên đã được sử dụng",
+}
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        student = Role(role_name="student")
+        db.session.add_all([student, Role(role_name="admin")])
+        db.session.flush()
+        db.session.add(User(role_id=student.role_id, full_name="Cũ", email="cu@test.vn",
+                            password_hash="x", student_id="SV000", gender="male"))
+        db.session.commit()
+    return app
+
+
+def import_csv(text=CSV, **kwargs):
+    return UserImportService.import_csv(io.BytesIO(text.encode("utf-8")), **kwargs)
+
+
+def test_import_reports_errors_per_row(app):
+    with app.app_context():
+        report = import_csv(batch_size=2)
+        users = {user.email: user for user in User.query}
+
+        assert report["summary"] == {"rows": 12, "created": 3, "failed": 9}
+        assert {error["line"]: error["error"] for error in report["errors"]} == ERRORS
+        assert [item["email"] for item in report["created"]] == ["a@test.vn", "b@test.vn", "m@test.vn"]
+        created = {item["email"]: item for item in report["created"]}
+
+        assert check_password_hash(users["a@test.vn"].password_hash, "matkhau1")
+        assert "initial_password" not in created["a@test.vn"]
+        assert check_password_hash(users["b@test.vn"].password_hash, created["b@test.vn"]["initial_password"])
+        assert created["b@test.vn"]["user_id"] == users["b@test.vn"].user_id
+        assert users["b@test.vn"].gender == "female" and users["b@test.vn"].student_id == "SV002"
+        assert users["m@test.vn"].role.role_name == "admin"
+        assert users["a@test.vn"].phone_number == "0901"
+        counters = CounterService.get_counters()
+        assert counters["users.role.student"] == 3
+        assert counters["users.role.admin"] == 1
+
+
+def test_dry_run_writes_nothing(app):
+    with app.app_context():
+        report = import_csv(dry_run=True)
+
+        assert report["dry_run"] is True
+        assert report["summary"] == {"rows": 12, "created": 3, "failed": 9}
+        assert all("user_id" not in item for item in report["created"])
+        assert User.query.count() == 1
+
+
+def test_batch_conflict_falls_back_to_single_rows(app, monkeypatch):
+    hash_many = user_import_service.hash_many
+
+    def hash_many_with_concurrent_insert(passwords, max_parallel=None):
+        # Request khác tạo b@test.vn sau khi file đã được kiểm tra
+        db.session.add(User(role_id=1, full_name="Khác", email="b@test.vn", password_hash="x", gender="other"))
+        db.session.commit()
+        return hash_many(passwords, max_parallel)
+
+    monkeypatch.setattr(user_import_service, "hash_many", hash_many_with_concurrent_insert)
+    text = "full_name,email\nA,a@test.vn\nB,b@test.vn\nC,c@test.vn\n"
+    with app.app_context():
+        report = import_csv(text)
+
+        assert [item["email"] for item in report["created"]] == ["a@test.vn", "c@test.vn"]
+        assert report["errors"] == [
+            {"line": 3, "email": "b@test.vn", "error": "Email hoặc mã sinh viên đã được sử dụng"}
+        ]
+        assert User.query.filter_by(email="b@test.vn").one().full_name == "Khác"
+        assert User.query.count() == 4
+
+
+@pytest.mark.parametrize("text, message", [
+    ("", "File import rỗng"),
+    ("full_name,phone_number\nA,0901\n", "File import thiếu cột: email"),
+])
+def test_invalid_file(app, text, message):
+    with app.app_context():
+        with pytest.raises(UserImportError, match=message):
+            import_csv(text)
+
+
+def test_endpoint(client, auth_headers):
+    headers = auth_headers("admin")
+    response = client.post("/api/users/import?dry_run=true", data=CSV.encode("utf-8"),
+                           content_type="text/csv", headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["data"]["summary"]["created"] == 3
+
+    response = client.post("/api/users/import", data=b"full_name\nA\n", content_type="text/csv", headers=headers)
+    assert response.status_code == 400